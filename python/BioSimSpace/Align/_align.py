@@ -34,13 +34,16 @@ __all__ = [
 ]
 
 import csv as _csv
+import hashlib as _hashlib
+import json as _json
+import numpy as _np
 import os as _os
 import subprocess as _subprocess
 import sys as _sys
 from typing import Any, Collection, Optional
 from itertools import chain
 
-from .._Utils import _try_import, _have_imported, _assert_imported
+from .._Utils import _try_import, _lazy_import, _have_imported, _assert_imported
 
 import warnings as _warnings
 
@@ -83,7 +86,7 @@ from .. import _Utils
 _networkx = _try_import("networkx")
 
 if _have_imported(_rdkit) and _have_imported(_networkx):
-    import lomap as _lomap
+    _lomap = _lazy_import("lomap")
 elif _have_imported(_rdkit):
     _lomap = _networkx
 elif _have_imported(_networkx):
@@ -95,6 +98,22 @@ else:
 
 from ._merge import merge as _merge
 
+# The version of the LOMAP score cache format. Increment this when the way
+# that scores are computed or stored changes.
+_lomap_cache_version = 1
+
+# LOMAP keyword arguments that don't affect the similarity scores.
+_lomap_output_kwargs = [
+    "name",
+    "links_file",
+    "output",
+    "output_no_graph",
+    "output_no_images",
+    "parallel",
+    "verbose",
+    "display",
+]
+
 try:
     _fkcombu_exe = _SireBase.findExe("fkcombu_bss").absoluteFilePath()
 except:
@@ -117,6 +136,14 @@ def generateNetwork(
     """
     Generate a perturbation network using Lead Optimisation Mappper (LOMAP).
 
+    The similarity score for each pair of ligands is cached on disk, keyed
+    on the contents of the ligand files and the LOMAP options, so that only
+    pairs involving new ligands are scored on later runs. Only pairs whose
+    strict and loose scores agree are cached, so re-using the cache doesn't
+    change the network. The location of the cache can be set using the
+    BSS_LOMAP_CACHE environment variable, which can be set to an empty
+    string to disable caching.
+
     Parameters
     ----------
 
@@ -386,44 +413,93 @@ def generateNetwork(
                         property_map=property_map,
                     )
 
+    # Hash the contents of each input file so that the scores for pairs of
+    # ligands can be cached across runs.
+    file_hashes = {}
+    for file_name in _os.listdir(work_dir + "/inputs"):
+        if file_name.endswith((".sdf", ".mol2")):
+            with open(f"{work_dir}/inputs/{file_name}", "rb") as f:
+                file_hashes[file_name] = _hashlib.sha256(f.read()).hexdigest()
+
     # Create a local copy of the links file in the working directory,
     # replacing the original ligand names with their actual file names.
+    new_lines = []
+    user_links = set()
     if links_file:
         # Read the old file and map the ligand names to their file names.
-        new_lines = []
         with open(links_file, "r") as lf:
             for line in lf:
                 records = line.split()
-                new_line = f"{links_names[records[0]]} {links_names[records[1]]}"
+                file0 = links_names[records[0]]
+                file1 = links_names[records[1]]
+                new_line = f"{file0} {file1}"
                 if len(records) > 2:
                     new_line += " " + " ".join(records[2:])
-
-        # Store the path to the new file.
-        lf = f"{work_dir}/inputs/lomap_links_file.txt"
-
-        # Write the updated lomap links file.
-        with open(lf, "w") as f:
-            for line in new_lines:
-                f.write(line)
-    else:
-        lf = None
+                new_lines.append(new_line + "\n")
+                user_links.add(frozenset((file0, file1)))
 
     # Create a dictionary of default keyword arguments.
     default_kwargs = {
         "name": f"{work_dir}/outputs/lomap",
-        "links_file": lf,
         "output": True,
         "output_no_graph": True,
         "output_no_images": True,
         "threed": True,
         "max3d": 3.0,
         "time": 3,
-        "parallel": 10,
     }
 
     # Combine with **kwargs, with those taking precendence.
     total_kwargs = {**default_kwargs, **kwargs}
 
+    # Pass the scores for any pairs of ligands that are in the cache to LOMAP
+    # via the links file. A positive score is used in place of computing the
+    # MCS, but the link is otherwise treated as normal. Pairs in the user's
+    # links file are left untouched.
+    # The cache is only used when BioSimSpace writes the links file.
+    if "links_file" in kwargs:
+        cache_file = None
+    else:
+        cache_file = _Utils._cache_file("BSS_LOMAP_CACHE", "lomap.json")
+    if cache_file is not None:
+        options_key = _lomap_options_key(total_kwargs)
+        cache = _Utils._load_cache(cache_file)
+    else:
+        cache = {}
+
+    file_names = sorted(file_hashes)
+    num_missing = 0
+    for x, file0 in enumerate(file_names):
+        for file1 in file_names[x + 1 :]:
+            if frozenset((file0, file1)) in user_links:
+                continue
+            score = None
+            if cache_file is not None:
+                score = cache.get(
+                    _lomap_pair_key(options_key, file_hashes[file0], file_hashes[file1])
+                )
+            if score is None:
+                num_missing += 1
+            else:
+                new_lines.append(f"{file0} {file1} {score}\n")
+
+    if new_lines:
+        # Store the path to the new file.
+        lf = f"{work_dir}/inputs/lomap_links_file.txt"
+
+        # Write the updated lomap links file.
+        with open(lf, "w") as f:
+            for line in new_lines:
+                f.write(line)
+    else:
+        lf = None
+
+    total_kwargs.setdefault("links_file", lf)
+
+    # Only run as many LOMAP processes as are needed to score the missing
+    # pairs, up to the number of available cores.
+    total_kwargs.setdefault("parallel", max(1, min(_os.cpu_count() or 1, num_missing)))
+
     # Create the DBMolecules object.
     db_mol = _lomap.DBMolecules(f"{work_dir}/inputs", **total_kwargs)
 
@@ -448,12 +524,36 @@ def generateNetwork(
 
     edges_excluded = []
 
+    new_scores = {}
+
     with open(lomap_file, "r") as csv_file:
         # Load as a CSV file.
         csv_reader = _csv.reader(csv_file)
 
         # Loop over all rows of the CSV file.
         for row in csv_reader:
+            # Record the score for each pair of ligands so that it can be
+            # re-used by later runs. Scores from the user's links file
+            # aren't cached. A cached score is passed back to LOMAP as both
+            # the strict and loose similarity, so pairs where these differ
+            # are always re-scored.
+            if (
+                cache_file is not None
+                and row[7].strip() in ["Yes", "No"]
+                and len(set(float(x) for x in row[4:7])) == 1
+            ):
+                file0 = _os.path.basename(row[2].strip())
+                file1 = _os.path.basename(row[3].strip())
+                if (
+                    file0 in file_hashes
+                    and file1 in file_hashes
+                    and not frozenset((file0, file1)) in user_links
+                ):
+                    key = _lomap_pair_key(
+                        options_key, file_hashes[file0], file_hashes[file1]
+                    )
+                    new_scores[key] = float(row[4])
+
             # If the file contains all possible edges, then only take edges
             # that LOMAP indicates should be drawn.
             if row[7].strip() == "Yes":
@@ -484,6 +584,10 @@ def generateNetwork(
                 if not (mol1, mol0) in edges:
                     edges_excluded.append((mol0, mol1, score))
 
+    # Update the score cache.
+    if new_scores:
+        _Utils._save_cache(cache_file, new_scores)
+
     # If the user has specified a forced number of edges, adjust the network
     # to match the query. We have three situations to deal with.
     if n_edges_forced:
@@ -994,6 +1098,7 @@ def _matchAtoms(
         max_scoring_matches,
         property_map0,
         property_map1,
+        num_mappings=matches,
     )
 
     # Sometimes RDKit fails to generate a mapping that includes the prematch.
@@ -2453,6 +2558,7 @@ def _score_rdkit_mappings(
     max_scoring_matches,
     property_map0,
     property_map1,
+    num_mappings=None,
 ):
     """
     Internal function to score atom mappings based on the root mean squared
@@ -2501,6 +2607,10 @@ def _score_rdkit_mappings(
         A dictionary that maps "properties" in molecule1 to their user
         defined values.
 
+    num_mappings : int
+        The number of top ranked mappings to return. If None, then all
+        mappings are returned.
+
     Returns
     -------
 
@@ -2540,155 +2650,217 @@ def _score_rdkit_mappings(
         mcs_smarts, uniquify=False, maxMatches=max_scoring_matches, useChirality=False
     )
 
-    # Swap the order of the matches.
-    if len(matches0) < len(matches1):
-        matches0, matches1 = matches1, matches0
-        is_swapped = True
+    # Convert the matches to arrays of atom indices.
+    if len(matches0) > 0 and len(matches1) > 0:
+        matches0 = _np.array(matches0, dtype=int)
+        matches1 = _np.array(matches1, dtype=int)
+    else:
+        matches0 = _np.empty((0, 0), dtype=int)
+        matches1 = _np.empty((0, 0), dtype=int)
+
+    # Loop over the larger set of matches in the outer loop.
+    is_swapped = len(matches0) < len(matches1)
+    if is_swapped:
+        outer, inner = matches1, matches0
     else:
-        is_swapped = False
+        outer, inner = matches0, matches1
 
     # Initialise a list to hold the mappings.
     mappings = []
 
-    # Initialise a list of to hold the score for each mapping.
-    scores = []
-
-    # Whether there was a GSL alignment error.
-    is_gsl_error = False
-
-    # Loop over all matches from mol0.
-    for x in range(len(matches0)):
-        match0 = matches0[x]
-
-        # Loop over all matches from mol1.
-        for y in range(len(matches1)):
-            match1 = matches1[y]
+    # Initialise lists to hold the atom indices for each mapping.
+    indices0 = []
+    indices1 = []
 
-            # Initialise the mapping for this match.
-            mapping = {}
+    # A set of the mappings that have been seen, used to remove duplicates.
+    seen = set()
 
-            # Loop over all atoms in the match.
-            for i, idx0 in enumerate(match0):
-                idx1 = match1[i]
-
-                # Add to the mapping.
-                if is_swapped:
-                    mapping[idx1] = idx0
-                else:
-                    mapping[idx0] = idx1
+    # Loop over all matches in the outer set, pairing each with all matches
+    # in the inner set at once.
+    for match in outer:
+        # Get the molecule0 and molecule1 atom indices for each pairing.
+        if is_swapped:
+            keys = inner
+            values = _np.broadcast_to(match, inner.shape)
+        else:
+            keys = _np.broadcast_to(match, inner.shape)
+            values = inner
 
-            mapping = dict(sorted(mapping.items()))
-            sire_mapping = {
-                _SireMol.AtomIdx(idx0): _SireMol.AtomIdx(idx1)
-                for idx0, idx1 in mapping.items()
-            }
+        # Sort each mapping by the molecule0 atom index.
+        order = _np.argsort(keys, axis=1)
+        keys = _np.take_along_axis(keys, order, axis=1)
+        values = _np.take_along_axis(values, order, axis=1)
 
-            # This is a new mapping:
-            if not mapping in mappings:
-                # Check that the mapping contains the pre-match.
-                is_valid = True
-                for idx0, idx1 in prematch.items():
-                    # Pre-match isn't found, return to top of loop.
-                    if idx0 not in mapping or mapping[idx0] != idx1:
-                        is_valid = False
-                        break
-
-                if is_valid:
-                    # If there is only a single atom in the mapping and one molecule
-                    # has one atom, e.g. an ion, then skip the alignment.
-                    if len(mapping) == 1:
-                        mappings.append(mapping)
-                        scores.append(0.0)
+        # Check that the mappings contain the pre-match.
+        is_valid = _np.ones(len(keys), dtype=bool)
+        for idx0, idx1 in prematch.items():
+            is_valid &= ((keys == idx0) & (values == idx1)).any(axis=1)
+
+        for key, value in zip(keys[is_valid], values[is_valid]):
+            # Skip duplicate mappings.
+            mapping_key = key.tobytes() + value.tobytes()
+            if mapping_key in seen:
+                continue
+            seen.add(mapping_key)
+
+            mappings.append(dict(zip(key.tolist(), value.tolist())))
+            indices0.append(key)
+            indices1.append(value)
+
+    # Compute the scores.
+    if len(mappings) > 0:
+        indices0 = _np.array(indices0)
+        indices1 = _np.array(indices1)
+
+        # Extract the coordinates of both molecules.
+        coords0 = _get_coordinates(molecule0)
+        coords1 = _get_coordinates(molecule1)
+
+        # If there is only a single atom in the mapping, e.g. an ion, then
+        # skip the alignment.
+        if indices0.shape[1] == 1:
+            scores = _np.zeros(len(mappings))
+
+        # Flexibly align molecule0 to molecule1 based on each mapping. This
+        # can't be batched, so the coordinates are updated for each mapping.
+        elif scoring_function == "RMSDFLEXALIGN":
+            scores = []
+            for mapping, idx0, idx1 in zip(mappings, indices0, indices1):
+                molecule0 = flexAlign(
+                    _Molecule(molecule0),
+                    _Molecule(molecule1),
+                    mapping,
+                    property_map0=property_map0,
+                    property_map1=property_map1,
+                )._sire_object
+                coords0 = _get_coordinates(molecule0)
+                scores.append(_rmsd(coords0[idx0][None], coords1[idx1][None])[0])
+            scores = _np.array(scores)
+
+        # Compute the RMSD between the mapped atoms, optionally following
+        # rigid alignment, in batches to limit the memory usage.
+        else:
+            is_align = scoring_function == "RMSDALIGN"
+            batch_size = 10000
+            scores = _np.empty(len(mappings))
+            for x in range(0, len(mappings), batch_size):
+                c0 = coords0[indices0[x : x + batch_size]]
+                c1 = coords1[indices1[x : x + batch_size]]
+                try:
+                    scores[x : x + batch_size] = _rmsd(c0, c1, align=is_align)
+                except _np.linalg.LinAlgError as e:
+                    msg = (
+                        "Failed to align molecules when scoring. "
+                        "Try minimising your molecular coordinates prior calling matchAtoms."
+                    )
+                    if _isVerbose():
+                        raise _AlignmentError(msg) from e
                     else:
-                        # Rigidly align molecule0 to molecule1 based on the mapping.
-                        if scoring_function == "RMSDALIGN":
-                            try:
-                                molecule0 = (
-                                    molecule0.move()
-                                    .align(
-                                        molecule1,
-                                        _SireMol.AtomResultMatcher(sire_mapping),
-                                    )
-                                    .molecule()
-                                )
-                            except Exception as e:
-                                if (
-                                    "Could not calculate the single value decomposition"
-                                    in str(e)
-                                ):
-                                    is_gsl_error = True
-                                    gsl_exception = e
-                                else:
-                                    msg = (
-                                        "Failed to align molecules when scoring based on mapping: %r"
-                                        % mapping
-                                    )
-                                    if _isVerbose():
-                                        raise _AlignmentError(msg) from e
-                                    else:
-                                        raise _AlignmentError(msg) from None
-                        # Flexibly align molecule0 to molecule1 based on the mapping.
-                        elif scoring_function == "RMSDFLEXALIGN":
-                            molecule0 = flexAlign(
-                                _Molecule(molecule0),
-                                _Molecule(molecule1),
-                                mapping,
-                                property_map0=property_map0,
-                                property_map1=property_map1,
-                            )._sire_object
-
-                        # Append the mapping to the list.
-                        mappings.append(mapping)
-
-                        # We now compute the RMSD between the coordinates of the matched atoms
-                        # in molecule0 and molecule1.
-
-                        # Initialise lists to hold the coordinates.
-                        c0 = []
-                        c1 = []
-
-                        # Loop over each atom index in the map.
-                        for idx0, idx1 in sire_mapping.items():
-                            # Append the coordinates of the matched atom in molecule0.
-                            c0.append(molecule0.atom(idx0).property("coordinates"))
-                            # Append the coordinates of atom in molecule1 to which it maps.
-                            c1.append(molecule1.atom(idx1).property("coordinates"))
-
-                        # Compute the RMSD between the two sets of coordinates.
-                        scores.append(_SireMaths.getRMSD(c0, c1))
+                        raise _AlignmentError(msg) from None
 
     # No mappings were found.
     if len(mappings) == 0:
-        # We failed to align mappings during scoring due to convergence issues
-        # during the GSL single value decomposition routine.
-        if is_gsl_error:
-            msg = (
-                "Failed to align molecules when scoring. "
-                "Try minimising your molecular coordinates prior calling matchAtoms."
-            )
-            if _isVerbose():
-                raise _AlignmentError(msg) from gsl_exception
-            else:
-                raise _AlignmentError(msg) from None
-
         if len(prematch) == 0:
             return ([{}], [])
         else:
             return ([prematch], [])
 
-    # Sort the scores and return the sorted keys. (Smaller RMSD is best)
-    keys = sorted(range(len(scores)), key=lambda k: scores[k])
+    # Select the top ranked mappings using a partial sort, then sort these.
+    # Ties are broken by the order in which the mappings were generated.
+    # (Smaller RMSD is best)
+    keys = _np.arange(len(scores))
+    if num_mappings is not None and num_mappings < len(scores):
+        keys = _np.argpartition(scores, num_mappings - 1)[:num_mappings]
+    keys = keys[_np.lexsort((keys, scores[keys]))]
 
     # Sort the mappings.
     mappings = [mappings[x] for x in keys]
 
     # Sort the scores and convert to Angstroms.
-    scores = [scores[x] * _Units.Length.angstrom for x in keys]
+    scores = [float(scores[x]) * _Units.Length.angstrom for x in keys]
 
     # Return the sorted mappings and their scores.
     return (mappings, scores)
 
 
+def _get_coordinates(molecule):
+    """
+    Internal function to return the coordinates of a molecule as an array,
+    in atom index order.
+
+    Parameters
+    ----------
+
+    molecule : Sire.Molecule.Molecule
+        The molecule (Sire representation).
+
+    Returns
+    -------
+
+    coordinates : numpy.ndarray
+        The (atoms, 3) array of coordinates in Angstrom.
+    """
+    coordinates = []
+    for idx in range(molecule.nAtoms()):
+        c = molecule.atom(_SireMol.AtomIdx(idx)).property("coordinates")
+        coordinates.append((c.x(), c.y(), c.z()))
+    return _np.array(coordinates)
+
+
+def _rmsd(coordinates0, coordinates1, align=False):
+    """
+    Internal function to compute the root mean squared displacement (RMSD)
+    between batches of paired coordinates. Optionally, each set of
+    coordinates0 is first optimally aligned to coordinates1 using the Kabsch
+    algorithm.
+
+    Parameters
+    ----------
+
+    coordinates0 : numpy.ndarray
+        A (batch, atoms, 3) array of coordinates.
+
+    coordinates1 : numpy.ndarray
+        A (batch, atoms, 3) array of coordinates.
+
+    align : bool
+        Whether to align the coordinates before computing the RMSD.
+
+    Returns
+    -------
+
+    rmsd : numpy.ndarray
+        The RMSD for each item in the batch.
+    """
+
+    num_atoms = coordinates0.shape[1]
+
+    if not align:
+        return _np.sqrt(
+            ((coordinates0 - coordinates1) ** 2).sum(axis=(1, 2)) / num_atoms
+        )
+
+    # Remove the centre of geometry.
+    coordinates0 = coordinates0 - coordinates0.mean(axis=1, keepdims=True)
+    coordinates1 = coordinates1 - coordinates1.mean(axis=1, keepdims=True)
+
+    # Compute the covariance matrix for each item and its singular values.
+    covariance = _np.einsum("bai,baj->bij", coordinates0, coordinates1)
+    u, sigma, vt = _np.linalg.svd(covariance)
+
+    # Correct for improper rotations, i.e. reflections.
+    sigma[:, -1] *= _np.sign(_np.linalg.det(u) * _np.linalg.det(vt))
+
+    # The minimum residual for each item.
+    residual = (
+        (coordinates0**2).sum(axis=(1, 2))
+        + (coordinates1**2).sum(axis=(1, 2))
+        - 2 * sigma.sum(axis=1)
+    )
+
+    return _np.sqrt(_np.maximum(residual, 0) / num_atoms)
+
+
 def _score_sire_mappings(
     molecule0,
     molecule1,
@@ -2852,6 +3024,63 @@ def _score_sire_mappings(
     return (mappings, scores)
 
 
+def _lomap_options_key(kwargs):
+    """
+    Return a key for the LOMAP options that affect the similarity scores.
+
+    Parameters
+    ----------
+
+    kwargs : dict
+        The keyword arguments passed to LOMAP.
+
+    Returns
+    -------
+
+    key : str
+        The options key.
+    """
+    try:
+        version = _lomap.__version__
+    except:
+        version = None
+
+    options = {k: v for k, v in kwargs.items() if not k in _lomap_output_kwargs}
+
+    return _hashlib.sha256(
+        _json.dumps(
+            [_lomap_cache_version, version, options], sort_keys=True, default=str
+        ).encode()
+    ).hexdigest()
+
+
+def _lomap_pair_key(options_key, hash0, hash1):
+    """
+    Return the cache key for a pair of ligands. This doesn't depend on the
+    order of the ligands.
+
+    Parameters
+    ----------
+
+    options_key : str
+        The key for the LOMAP options.
+
+    hash0 : str
+        The hash of the file for the first ligand.
+
+    hash1 : str
+        The hash of the file for the second ligand.
+
+    Returns
+    -------
+
+    key : str
+        The cache key.
+    """
+    hash0, hash1 = sorted([hash0, hash1])
+    return _hashlib.sha256(f"{options_key}:{hash0}:{hash1}".encode()).hexdigest()
+
+
 def _validate_mapping(molecule0, molecule1, mapping, name):
     """
     Internal function to validate that a mapping contains key:value pairs
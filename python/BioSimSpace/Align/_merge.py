@@ -35,6 +35,9 @@ from sire.legacy import Units as _SireUnits
 from .._Exceptions import IncompatibleError as _IncompatibleError
 from .._SireWrappers import Molecule as _Molecule
 
+# The maximum size of what is considered to be a ring.
+_max_ring_size = 12
+
 
 def merge(
     molecule0,
@@ -1049,119 +1052,129 @@ def merge(
 
     # The checking was blocked when merging a protein
     if roi is None:
+        # Only pairs of atoms whose ring status, or shortest path, has changed
+        # can fail the checks below, so these are found up front, rather than
+        # checking all pairs. The adjacency of the merged molecule uses the
+        # bonds that are present in both end states.
+        adjacency = _adjacency(conn, edit_mol.info().nAtoms())
+
         # molecule0
-        for x in range(0, molecule0.nAtoms()):
-            # Convert to an AtomIdx.
+        for x, y in _connectivity_candidates(
+            _adjacency(c0, molecule0.nAtoms()),
+            adjacency,
+            [
+                mol0_merged_mapping[_SireMol.AtomIdx(i)].value()
+                for i in range(molecule0.nAtoms())
+            ],
+        ):
+            # Convert to AtomIdx objects.
             idx = _SireMol.AtomIdx(x)
+            idy = _SireMol.AtomIdx(y)
 
-            # Map the index to its position in the merged molecule.
+            # Map the indices to their positions in the merged molecule.
             idx_map = mol0_merged_mapping[idx]
+            idy_map = mol0_merged_mapping[idy]
 
-            for y in range(x + 1, molecule0.nAtoms()):
-                # Convert to an AtomIdx.
-                idy = _SireMol.AtomIdx(y)
-
-                # Map the index to its position in the merged molecule.
-                idy_map = mol0_merged_mapping[idy]
+            # Was a ring opened/closed?
+            is_ring_broken = _is_ring_broken(c0, conn, idx, idy, idx_map, idy_map)
 
-                # Was a ring opened/closed?
-                is_ring_broken = _is_ring_broken(c0, conn, idx, idy, idx_map, idy_map)
+            # A ring was broken and it is not allowed.
+            if is_ring_broken and not allow_ring_breaking:
+                raise _IncompatibleError(
+                    "The merge has opened/closed a ring. To allow this "
+                    "perturbation, set the 'allow_ring_breaking' option "
+                    "to 'True'."
+                )
 
-                # A ring was broken and it is not allowed.
-                if is_ring_broken and not allow_ring_breaking:
-                    raise _IncompatibleError(
-                        "The merge has opened/closed a ring. To allow this "
-                        "perturbation, set the 'allow_ring_breaking' option "
-                        "to 'True'."
-                    )
+            # Did a ring change size?
+            is_ring_size_change = _is_ring_size_changed(
+                c0, conn, idx, idy, idx_map, idy_map
+            )
 
-                # Did a ring change size?
-                is_ring_size_change = _is_ring_size_changed(
-                    c0, conn, idx, idy, idx_map, idy_map
+            # A ring changed size and it is not allowed.
+            if (
+                not is_ring_broken
+                and is_ring_size_change
+                and not allow_ring_size_change
+            ):
+                raise _IncompatibleError(
+                    "The merge has changed the size of a ring. To allow this "
+                    "perturbation, set the 'allow_ring_size_change' option "
+                    "to 'True'. Be aware that this perturbation may not work "
+                    "and a transition through an intermediate state may be "
+                    "preferable."
                 )
 
-                # A ring changed size and it is not allowed.
-                if (
-                    not is_ring_broken
-                    and is_ring_size_change
-                    and not allow_ring_size_change
-                ):
+            # The connectivity has changed.
+            if c0.connectionType(idx, idy) != conn.connectionType(idx_map, idy_map):
+                # The connectivity changed for an unknown reason.
+                if not (is_ring_broken or is_ring_size_change) and not force:
                     raise _IncompatibleError(
-                        "The merge has changed the size of a ring. To allow this "
-                        "perturbation, set the 'allow_ring_size_change' option "
-                        "to 'True'. Be aware that this perturbation may not work "
-                        "and a transition through an intermediate state may be "
-                        "preferable."
+                        "The merge has changed the molecular connectivity "
+                        "but a ring didn't open/close or change size. "
+                        "If you want to proceed with this mapping pass "
+                        "'force=True'. You are warned that the resulting "
+                        "perturbation will likely be unstable."
                     )
-
-                # The connectivity has changed.
-                if c0.connectionType(idx, idy) != conn.connectionType(idx_map, idy_map):
-                    # The connectivity changed for an unknown reason.
-                    if not (is_ring_broken or is_ring_size_change) and not force:
-                        raise _IncompatibleError(
-                            "The merge has changed the molecular connectivity "
-                            "but a ring didn't open/close or change size. "
-                            "If you want to proceed with this mapping pass "
-                            "'force=True'. You are warned that the resulting "
-                            "perturbation will likely be unstable."
-                        )
         # molecule1
-        for x in range(0, molecule1.nAtoms()):
-            # Convert to an AtomIdx.
+        for x, y in _connectivity_candidates(
+            _adjacency(c1, molecule1.nAtoms()),
+            adjacency,
+            [
+                mol1_merged_mapping[_SireMol.AtomIdx(i)].value()
+                for i in range(molecule1.nAtoms())
+            ],
+        ):
+            # Convert to AtomIdx objects.
             idx = _SireMol.AtomIdx(x)
+            idy = _SireMol.AtomIdx(y)
 
-            # Map the index to its position in the merged molecule.
+            # Map the indices to their positions in the merged molecule.
             idx_map = mol1_merged_mapping[idx]
+            idy_map = mol1_merged_mapping[idy]
 
-            for y in range(x + 1, molecule1.nAtoms()):
-                # Convert to an AtomIdx.
-                idy = _SireMol.AtomIdx(y)
-
-                # Map the index to its position in the merged molecule.
-                idy_map = mol1_merged_mapping[idy]
+            # Was a ring opened/closed?
+            is_ring_broken = _is_ring_broken(c1, conn, idx, idy, idx_map, idy_map)
 
-                # Was a ring opened/closed?
-                is_ring_broken = _is_ring_broken(c1, conn, idx, idy, idx_map, idy_map)
+            # A ring was broken and it is not allowed.
+            if is_ring_broken and not allow_ring_breaking:
+                raise _IncompatibleError(
+                    "The merge has opened/closed a ring. To allow this "
+                    "perturbation, set the 'allow_ring_breaking' option "
+                    "to 'True'."
+                )
 
-                # A ring was broken and it is not allowed.
-                if is_ring_broken and not allow_ring_breaking:
-                    raise _IncompatibleError(
-                        "The merge has opened/closed a ring. To allow this "
-                        "perturbation, set the 'allow_ring_breaking' option "
-                        "to 'True'."
-                    )
+            # Did a ring change size?
+            is_ring_size_change = _is_ring_size_changed(
+                c1, conn, idx, idy, idx_map, idy_map
+            )
 
-                # Did a ring change size?
-                is_ring_size_change = _is_ring_size_changed(
-                    c1, conn, idx, idy, idx_map, idy_map
+            # A ring changed size and it is not allowed.
+            if (
+                not is_ring_broken
+                and is_ring_size_change
+                and not allow_ring_size_change
+            ):
+                raise _IncompatibleError(
+                    "The merge has changed the size of a ring. To allow this "
+                    "perturbation, set the 'allow_ring_size_change' option "
+                    "to 'True'. Be aware that this perturbation may not work "
+                    "and a transition through an intermediate state may be "
+                    "preferable."
                 )
 
-                # A ring changed size and it is not allowed.
-                if (
-                    not is_ring_broken
-                    and is_ring_size_change
-                    and not allow_ring_size_change
-                ):
+            # The connectivity has changed.
+            if c1.connectionType(idx, idy) != conn.connectionType(idx_map, idy_map):
+                # The connectivity changed for an unknown reason.
+                if not (is_ring_broken or is_ring_size_change) and not force:
                     raise _IncompatibleError(
-                        "The merge has changed the size of a ring. To allow this "
-                        "perturbation, set the 'allow_ring_size_change' option "
-                        "to 'True'. Be aware that this perturbation may not work "
-                        "and a transition through an intermediate state may be "
-                        "preferable."
+                        "The merge has changed the molecular connectivity "
+                        "but a ring didn't open/close or change size. "
+                        "If you want to proceed with this mapping pass "
+                        "'force=True'. You are warned that the resulting "
+                        "perturbation will likely be unstable."
                     )
 
-                # The connectivity has changed.
-                if c1.connectionType(idx, idy) != conn.connectionType(idx_map, idy_map):
-                    # The connectivity changed for an unknown reason.
-                    if not (is_ring_broken or is_ring_size_change) and not force:
-                        raise _IncompatibleError(
-                            "The merge has changed the molecular connectivity "
-                            "but a ring didn't open/close or change size. "
-                            "If you want to proceed with this mapping pass "
-                            "'force=True'. You are warned that the resulting "
-                            "perturbation will likely be unstable."
-                        )
-
     # Set the "connectivity" property. If the end state connectivity is the same,
     # then we can just set the "connectivity" property.
     if conn0 == conn1:
@@ -1494,7 +1507,9 @@ def _is_ring_broken(conn0, conn1, idx0, idy0, idx1, idy1):
     return False
 
 
-def _is_ring_size_changed(conn0, conn1, idx0, idy0, idx1, idy1, max_ring_size=12):
+def _is_ring_size_changed(
+    conn0, conn1, idx0, idy0, idx1, idy1, max_ring_size=_max_ring_size
+):
     """
     Internal function to test whether a perturbation changes the connectivity
     around two atoms such that a ring changes size.
@@ -1589,6 +1604,245 @@ def _is_on_ring(idx, conn):
     return False
 
 
+def _adjacency(conn, num_atoms):
+    """
+    Internal function to convert a connectivity object to adjacency lists.
+
+    Parameters
+    ----------
+
+    conn : Sire.Mol.Connectivity
+        The connectivity object.
+
+    num_atoms : int
+        The number of atoms in the molecule.
+
+    Returns
+    -------
+
+    adjacency : [[int]]
+        The indices of the atoms bonded to each atom.
+    """
+    return [
+        [y.value() for y in conn.connectionsTo(_SireMol.AtomIdx(x))]
+        for x in range(num_atoms)
+    ]
+
+
+def _connectivity_candidates(
+    adjacency0, adjacency1, mapping, max_ring_size=_max_ring_size
+):
+    """
+    Internal function to find the pairs of atoms in an original molecule
+    whose connectivity could have been changed by a merge, i.e. the only pairs
+    for which the ring and connectivity checks can fail. A pair can only
+    fail if the ring status of one of its atoms has changed, or the shortest
+    path between the atoms has changed. The latter requires both atoms to
+    be within 'max_ring_size' bonds of an atom whose bonds have changed, so
+    distances only need to be computed within that region.
+
+    Parameters
+    ----------
+
+    adjacency0 : [[int]]
+        The indices of the atoms bonded to each atom in the original molecule.
+
+    adjacency1 : [[int]]
+        The indices of the atoms bonded to each atom in the merged molecule.
+
+    mapping : [int]
+        The index in the merged molecule of each atom in the original molecule.
+
+    max_ring_size : int
+        The maximum size of what is considered to be a ring.
+
+    Returns
+    -------
+
+    pairs : [(int, int)]
+        The sorted pairs of atom indices in the original molecule.
+    """
+
+    num_atoms = len(adjacency0)
+
+    # Paths longer than this don't affect the checks.
+    cutoff = max_ring_size + 1
+
+    # Find the atoms whose ring status has changed.
+    status0 = _ring_status(adjacency0)
+    status1 = _ring_status(adjacency1)
+    changed = [x for x in range(num_atoms) if status0[x] != status1[mapping[x]]]
+
+    # Find the atoms whose bonds have changed.
+    perturbed = [
+        x
+        for x in range(num_atoms)
+        if {mapping[y] for y in adjacency0[x]} != set(adjacency1[mapping[x]])
+    ]
+
+    pairs = set()
+
+    # Every pair containing an atom whose ring status has changed.
+    for x in changed:
+        for y in range(num_atoms):
+            if x != y:
+                pairs.add((min(x, y), max(x, y)))
+
+    # Work out the region that is within range of the perturbed atoms in
+    # either state.
+    inverse = {y: x for x, y in enumerate(mapping)}
+    region = set()
+    for x in perturbed:
+        region.update(_bfs_distances(adjacency0, x, cutoff))
+        region.update(
+            inverse[y]
+            for y in _bfs_distances(adjacency1, mapping[x], cutoff)
+            if y in inverse
+        )
+    region = sorted(region)
+
+    # Pairs within the region whose shortest path has changed.
+    for i, x in enumerate(region):
+        dist0 = _bfs_distances(adjacency0, x, cutoff)
+        dist1 = _bfs_distances(adjacency1, mapping[x], cutoff)
+        for y in region[i + 1 :]:
+            if dist0.get(y) != dist1.get(mapping[y]):
+                pairs.add((x, y))
+
+    return sorted(pairs)
+
+
+def _ring_status(adjacency):
+    """
+    Internal function to work out whether each atom is in, or adjacent to, a
+    ring. This matches "_is_on_ring" and the "inRing" method of
+    Sire.Mol.Connectivity, but is computed for all atoms at once.
+
+    Parameters
+    ----------
+
+    adjacency : [[int]]
+        The indices of the atoms bonded to each atom.
+
+    Returns
+    -------
+
+    status : [(bool, bool)]
+        Whether each atom is in a ring, and whether it is on a ring.
+    """
+
+    # Bonds that aren't bridges are part of a ring.
+    bridges = _find_bridges(adjacency)
+
+    in_ring = [
+        any(frozenset((x, y)) not in bridges for y in bonded)
+        for x, bonded in enumerate(adjacency)
+    ]
+    on_ring = [
+        any(in_ring[y] and frozenset((x, y)) in bridges for y in bonded)
+        for x, bonded in enumerate(adjacency)
+    ]
+
+    return list(zip(in_ring, on_ring))
+
+
+def _find_bridges(adjacency):
+    """
+    Internal function to find the bridges in a molecular graph, i.e. the bonds
+    that aren't part of any ring. This uses an iterative version of Tarjan's
+    algorithm, so is linear in the number of atoms.
+
+    Parameters
+    ----------
+
+    adjacency : [[int]]
+        The indices of the atoms bonded to each atom.
+
+    Returns
+    -------
+
+    bridges : set(frozenset)
+        The bridging bonds.
+    """
+
+    num_atoms = len(adjacency)
+    order = [-1] * num_atoms
+    low = [0] * num_atoms
+    bridges = set()
+    counter = 0
+
+    for root in range(num_atoms):
+        if order[root] != -1:
+            continue
+
+        order[root] = low[root] = counter
+        counter += 1
+
+        # Each entry is the atom, its parent, and an iterator over its bonds.
+        stack = [(root, -1, iter(adjacency[root]))]
+
+        while stack:
+            x, parent, bonded = stack[-1]
+            for y in bonded:
+                if order[y] == -1:
+                    order[y] = low[y] = counter
+                    counter += 1
+                    stack.append((y, x, iter(adjacency[y])))
+                    break
+                elif y != parent:
+                    low[x] = min(low[x], order[y])
+            else:
+                stack.pop()
+                if parent != -1:
+                    low[parent] = min(low[parent], low[x])
+                    if low[x] > order[parent]:
+                        bridges.add(frozenset((x, parent)))
+
+    return bridges
+
+
+def _bfs_distances(adjacency, source, cutoff):
+    """
+    Internal function to compute the shortest path lengths from an atom to
+    all atoms within a given number of bonds.
+
+    Parameters
+    ----------
+
+    adjacency : [[int]]
+        The indices of the atoms bonded to each atom.
+
+    source : int
+        The index of the source atom.
+
+    cutoff : int
+        The maximum number of bonds.
+
+    Returns
+    -------
+
+    distances : dict
+        A dictionary mapping atom indices to the number of bonds from the
+        source atom.
+    """
+
+    distances = {source: 0}
+    frontier = [source]
+    distance = 0
+
+    while frontier and distance < cutoff:
+        distance += 1
+        new_frontier = []
+        for x in frontier:
+            for y in adjacency[x]:
+                if y not in distances:
+                    distances[y] = distance
+                    new_frontier.append(y)
+        frontier = new_frontier
+
+    return distances
+
+
 def _removeDummies(molecule, is_lambda1):
     """
     Internal function which removes the dummy atoms from one of the endstates of a merged molecule.
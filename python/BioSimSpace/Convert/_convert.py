@@ -34,9 +34,9 @@ __all__ = [
     "toSire",
 ]
 
-from .._Utils import _try_import, _have_imported
+from .._Utils import _lazy_import, _have_imported
 
-_openmm = _try_import("openmm")
+_openmm = _lazy_import("openmm")
 
 import os as _os
 
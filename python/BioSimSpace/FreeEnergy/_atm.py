@@ -1492,6 +1492,7 @@ class ATM:
         ignore_lower=0,
         ignore_upper=None,
         inflex_indices=None,
+        num_bootstrap=0,
     ):
         """Analyse the ATM simulation.
 
@@ -1512,6 +1513,10 @@ class ATM:
             then inflex_indices=[1,2].
             If None, the inflexion point will be found automatically.
 
+        num_bootstrap : int
+            The number of bootstrap replicates used to estimate the error
+            when using UWHAM. If zero, the analytical error estimate is used.
+
         Returns
         -------
 
@@ -1541,9 +1546,13 @@ class ATM:
                 raise TypeError("'inflex_indices' must be a list of integers.")
             if not len(inflex_indices) == 2:
                 raise ValueError("'inflex_indices' must have length 2.")
+        if not isinstance(num_bootstrap, int):
+            raise TypeError("'num_bootstrap' must be an integer.")
+        if num_bootstrap < 0:
+            raise ValueError("'num_bootstrap' must be a positive integer.")
         if method == "UWHAM":
             total_ddg, total_ddg_err = ATM._analyse_UWHAM(
-                work_dir, ignore_lower, ignore_upper, inflex_indices
+                work_dir, ignore_lower, ignore_upper, inflex_indices, num_bootstrap
             )
             return total_ddg, total_ddg_err
         if method == "MBAR":
@@ -1558,14 +1567,20 @@ class ATM:
             raise ValueError(f"Method {method} is not supported for analysis.")
 
     @staticmethod
-    def _analyse_UWHAM(work_dir, ignore_lower, ignore_upper, inflex_indices=None):
+    def _analyse_UWHAM(
+        work_dir, ignore_lower, ignore_upper, inflex_indices=None, num_bootstrap=0
+    ):
         """
         Analyse the UWHAM results from the ATM simulation.
         """
         from ._ddg import analyse_UWHAM as _UWHAM
 
         total_ddg, total_ddg_err = _UWHAM(
-            work_dir, ignore_lower, ignore_upper, inflection_indices=inflex_indices
+            work_dir,
+            ignore_lower,
+            ignore_upper,
+            inflection_indices=inflex_indices,
+            num_bootstrap=num_bootstrap,
         )
         return total_ddg, total_ddg_err
 
@@ -26,38 +26,106 @@
 __all__ = ["analyse_UWHAM", "analyse_MBAR"]
 
 
-import functools as _functools
 import numpy as _numpy
 import os as _os
 import pandas as _pd
 import pathlib as _pathlib
 import scipy.optimize as _optimize
-import scipy.special as _special
 import warnings as _warnings
 
+# The approximate memory budget, in bytes, for the work arrays used when
+# bootstrapping replicates concurrently.
+_bootstrap_memory = 2e9
 
-def _compute_weights(ln_z, ln_q, factor):
-    q_ij = _numpy.exp(ln_q - ln_z)
-    return q_ij / (factor * q_ij).sum(axis=-1, keepdims=True)
 
+class _UWHAMObjective:
+    """
+    The UWHAM objective function, along with its gradient and Hessian. The
+    normalised weights are computed once for each set of free energies and
+    are shared between the three evaluations.
+    """
 
-def _compute_kappa_hessian(ln_z, ln_q, factor, n):
-    ln_z = _numpy.insert(ln_z, 0, 0.0)
-
-    w = (factor * _compute_weights(ln_z, ln_q, factor))[:, 1:]
-    return -w.T @ w / n + _numpy.diag(w.sum(axis=0) / n)
+    def __init__(self, ln_q, factor, counts=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+
+        ln_q : numpy.ndarray
+            Negative reduced potentials with shape (n_samples, n_states),
+            shifted so that the first state is zero.
+
+        factor : numpy.ndarray
+            The fraction of samples drawn from each state.
+
+        counts : numpy.ndarray
+            The number of times that each sample is counted, e.g. for a
+            bootstrap replicate. If None, then each sample is counted once.
+        """
+        self._ln_q = ln_q
+        self._factor = factor
+        self._counts = counts
+        self._n = ln_q.shape[0] if counts is None else counts.sum()
+        self._buffer = _numpy.empty_like(ln_q)
+        self._ln_z = None
+        self._weights = None
+        self._ln_sum = None
+
+    def _update(self, ln_z):
+        """Compute the weights for the given free energies."""
+        if self._ln_z is not None and _numpy.array_equal(ln_z, self._ln_z):
+            return
+
+        # Evaluate exp(ln_q - ln_z) / sum(factor * exp(ln_q - ln_z)) for all
+        # samples and states in place, using the maximum for stability.
+        w = self._buffer
+        _numpy.subtract(self._ln_q, _numpy.insert(ln_z, 0, 0.0), out=w)
+        w_max = w.max(axis=1, keepdims=True)
+        w -= w_max
+        _numpy.exp(w, out=w)
+        w_sum = w @ self._factor
+        w /= w_sum[:, None]
+
+        self._ln_sum = w_max[:, 0] + _numpy.log(w_sum)
+        self._weights = w
+        self._ln_z = _numpy.array(ln_z, copy=True)
+
+    def weights(self, ln_z):
+        """Return the normalised weights for the given free energies."""
+        self._update(ln_z)
+        return self._weights
+
+    def kappa(self, ln_z):
+        """Return the objective function and its gradient."""
+        self._update(ln_z)
+
+        if self._counts is None:
+            ln_sum = self._ln_sum.sum()
+            w_sum = self._weights[:, 1:].sum(axis=0)
+        else:
+            ln_sum = self._ln_sum @ self._counts
+            w_sum = self._counts @ self._weights[:, 1:]
 
+        kappa = ln_sum / self._n + (self._factor[1:] * ln_z).sum()
+        grad = self._factor[1:] * (1.0 - w_sum / self._n)
 
-def _compute_kappa(ln_z, ln_q, factor, n):
-    ln_z = _numpy.insert(ln_z, 0, 0.0)
+        return kappa, grad
 
-    ln_q_ij_sum = _special.logsumexp(a=ln_q - ln_z, b=factor, axis=1)
-    kappa = ln_q_ij_sum.sum() / n + (factor * ln_z).sum()
+    def hessian(self, ln_z):
+        """Return the Hessian of the objective function."""
+        self._update(ln_z)
 
-    w = factor * _compute_weights(ln_z, ln_q, factor)
-    grad = -w[:, 1:].sum(axis=0) / n + factor[1:]
+        if self._counts is None:
+            w_sum = self._weights.sum(axis=0)
+            o = self._weights.T @ self._weights
+        else:
+            w_sum = self._counts @ self._weights
+            o = (self._weights.T * self._counts) @ self._weights
+        hess = -(self._factor[:, None] * o * self._factor[None, :]) / self._n
+        hess += _numpy.diag(self._factor * w_sum / self._n)
 
-    return kappa, grad
+        return hess[1:, 1:]
 
 
 def _compute_variance(ln_z, w, factor, n):
@@ -91,20 +159,106 @@ def _npot_fcn(e0, epert, bet, lam1, lam2, alpha, u0, w0):
     return -bet * (e0 + _bias_fcn(epert, lam1, lam2, alpha, u0, w0))
 
 
-def _estimate_f_i(ln_q, n_k):
+def _compute_ln_q(e0, epert, bet, lam1, lam2, alpha, u0, w0):
+    """
+    Compute the negative reduced energy of all samples in all states with a
+    single batched operation. This is the vectorised equivalent of calling
+    _npot_fcn for each state.
+
+    Parameters
+    ----------
+
+    e0 : numpy.ndarray
+        The potential energy of each sample.
+
+    epert : numpy.ndarray
+        The perturbation energy of each sample.
+
+    bet, lam1, lam2, alpha, u0, w0 : numpy.ndarray
+        The parameters of each state.
+
+    Returns
+    -------
+
+    ln_q : numpy.ndarray
+        The negative reduced energies with shape (n_samples, n_states).
+    """
+    epert = _numpy.asarray(epert, dtype=_numpy.float64)[:, None]
+
+    ln_q = epert * lam2
+    ln_q += w0
+    ln_q += _numpy.asarray(e0, dtype=_numpy.float64)[:, None]
+
+    # Add the softplus bias for states with a positive alpha.
+    mask = alpha > 0
+    if mask.any():
+        a = alpha[mask]
+        ln_q[:, mask] += (
+            (lam2[mask] - lam1[mask])
+            * _numpy.logaddexp(0.0, -a * (epert - u0[mask]))
+            / a
+        )
+
+    ln_q *= -bet
+
+    return ln_q
+
+
+def _estimate_f_i(ln_q, n_k, initial_f_i=None):
     """Estimates the free energies of a set of *sampled* states.
 
 
     Args:
         n_k: The number of samples at state ``k``.
         ln_q: array of netgative potentials with ``shape=(n_states,n_samples)``.
+        initial_f_i: An initial guess for the free energies, e.g. from a
+            previous solution.
 
     Returns:
         The estimated reduced free energies and their estimated variance.
     """
-    n_k = _numpy.array(n_k)
+    ln_q = _numpy.ascontiguousarray(_numpy.array(ln_q, dtype=_numpy.float64).T)
+    return _solve_f_i(ln_q, n_k, initial_f_i=initial_f_i)
+
+
+def _solve_f_i(ln_q, n_k, initial_f_i=None, compute_variance=True, counts=None):
+    """
+    Estimates the free energies of a set of *sampled* states.
+
+    Parameters
+    ----------
+
+    ln_q : numpy.ndarray
+        The negative potentials with shape (n_samples, n_states). This is
+        modified in place.
+
+    n_k : [int]
+        The number of samples at each state.
 
-    ln_q = _numpy.array(ln_q).T
+    initial_f_i : numpy.ndarray
+        An initial guess for the free energies, e.g. from a previous solution.
+
+    compute_variance : bool
+        Whether to compute the variance and weights.
+
+    counts : numpy.ndarray
+        The number of times that each sample is counted, e.g. for a
+        bootstrap replicate. If None, then each sample is counted once.
+        The variance can't be computed when counts are used.
+
+    Returns
+    -------
+
+    f_i : numpy.ndarray
+        The estimated reduced free energies.
+
+    df_i : numpy.ndarray
+        The estimated variance, or None.
+
+    weights : numpy.ndarray
+        The weights, or None.
+    """
+    n_k = _numpy.array(n_k)
 
     n_samples, n_states = ln_q.shape
 
@@ -112,32 +266,52 @@ def _estimate_f_i(ln_q, n_k):
         raise RuntimeError(
             "The number of states do not match: %d != %d" % (n_states, len(n_k))
         )
+    if counts is not None:
+        if compute_variance:
+            raise ValueError("The variance can't be computed when using 'counts'.")
+        if len(counts) != n_samples:
+            raise RuntimeError(
+                "The number of counts do not match: %d != %d" % (len(counts), n_samples)
+            )
     if n_samples != n_k.sum():
         raise RuntimeError(
             "The number of samples do not match: %d != %d" % (n_samples, n_k.sum())
         )
 
-    ln_z = _numpy.zeros(len(n_k) - 1)  # ln_z_0 is always fixed at 0.0
-    ln_q -= ln_q[:, :1]
+    # ln_z_0 is always fixed at 0.0
+    if initial_f_i is not None and len(initial_f_i) == n_states:
+        ln_z = -_numpy.array(initial_f_i[1:], dtype=_numpy.float64)
+    else:
+        ln_z = _numpy.zeros(len(n_k) - 1)
+    # Only shift the potentials if needed, so that an array that is shared
+    # between threads isn't written to.
+    if _numpy.any(ln_q[:, 0] != 0.0):
+        ln_q -= ln_q[:, :1]
 
     n = n_k.sum()
     factor = n_k / n
 
+    objective = _UWHAMObjective(ln_q, factor, counts=counts)
+
     result = _optimize.minimize(
-        _functools.partial(_compute_kappa, ln_q=ln_q, n=n, factor=factor),
+        objective.kappa,
         ln_z,
         method="trust-ncg",
         jac=True,
-        hess=_functools.partial(_compute_kappa_hessian, ln_q=ln_q, n=n, factor=factor),
+        hess=objective.hessian,
     )
 
     if not result.success:
         raise RuntimeError("The UWHAM minimization failed to converge.")
 
     f_i = _numpy.insert(-result.x, 0, 0.0)
+
+    if not compute_variance:
+        return f_i, None, None
+
     ln_z = _numpy.insert(result.x, 0, 0.0)
 
-    weights = _compute_weights(ln_z, ln_q, factor)
+    weights = objective.weights(result.x)
 
     if not _numpy.allclose(weights.sum(axis=0) / n, 1.0, atol=1e-2):
         w = weights.sum(axis=0) / n
@@ -148,6 +322,81 @@ def _estimate_f_i(ln_q, n_k):
     return f_i, df_i, weights / n
 
 
+def _bootstrap_f_i(ln_q, n_k, f_i, num_bootstrap, max_workers=None, seed=None):
+    """
+    Estimate the variance of the free-energy difference between the first
+    and last states by bootstrapping. Samples are drawn with replacement
+    from each state, and each replicate is warm-started from the solution
+    for the full data set. Rather than copying the resampled potentials,
+    each replicate counts the number of times that each sample was drawn,
+    so the potentials are shared between replicates.
+
+    Parameters
+    ----------
+
+    ln_q : numpy.ndarray
+        The negative potentials with shape (n_samples, n_states). These
+        are shared between the replicates, so should already be shifted
+        so that the first state is zero, as is done by _solve_f_i.
+        Otherwise, a shifted copy is made.
+
+    n_k : [int]
+        The number of samples at each state.
+
+    f_i : numpy.ndarray
+        The free energies estimated from the full data set.
+
+    num_bootstrap : int
+        The number of bootstrap replicates.
+
+    max_workers : int
+        The maximum number of replicates to solve concurrently. Each
+        replicate needs a work array the same size as 'ln_q'. If None,
+        then the number of CPUs is used, limited so that the work arrays
+        fit within a fixed memory budget.
+
+    seed : int
+        The seed for the random number generator.
+
+    Returns
+    -------
+
+    variance : float
+        The variance of the free-energy difference.
+    """
+    import concurrent.futures as _futures
+
+    n_k = _numpy.array(n_k)
+
+    if _numpy.any(ln_q[:, 0] != 0.0):
+        ln_q = ln_q - ln_q[:, :1]
+
+    def replicate(seed_sequence):
+        rng = _numpy.random.default_rng(seed_sequence)
+        counts = _numpy.concatenate(
+            [_numpy.bincount(rng.integers(0, num, num), minlength=num) for num in n_k]
+        ).astype(_numpy.float64)
+        f, _, _ = _solve_f_i(
+            ln_q, n_k, initial_f_i=f_i, compute_variance=False, counts=counts
+        )
+        return f[-1] - f[0]
+
+    seeds = _numpy.random.SeedSequence(seed).spawn(num_bootstrap)
+
+    if max_workers is None:
+        max_workers = min(
+            _os.cpu_count() or 1, int(_bootstrap_memory // max(ln_q.nbytes, 1))
+        )
+    max_workers = max(1, min(max_workers, num_bootstrap))
+
+    # NumPy releases the GIL for the heavy array operations, so threads
+    # avoid copying the data into worker processes.
+    with _futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        values = list(executor.map(replicate, seeds))
+
+    return _numpy.var(values, ddof=1)
+
+
 def _sort_folders(work_dir):
     """Sorts folder names by lambda value, ensuring they are read correctly.
 
@@ -174,6 +423,117 @@ def _sort_folders(work_dir):
     return {k: v for k, v in sorted(folders.items())}
 
 
+def _load_uwham_data(folders, ignore_lower, ignore_upper, chunk_size=100000):
+    """
+    Stream the data needed for UWHAM analysis from the 'openmm.csv' file in
+    each lambda folder. Only the required columns are read, in chunks, and
+    the samples are written directly into preallocated arrays, grouped by
+    window. Rows outside of the 'ignore_lower' and 'ignore_upper' bounds
+    are skipped without being parsed.
+
+    Parameters
+    ----------
+
+    folders : dict
+        A dictionary of lambda values and their corresponding folders.
+
+    ignore_lower : int
+        The number of rows to ignore at the start of each file.
+
+    ignore_upper : int
+        The index of the row at which to stop reading each file.
+
+    chunk_size : int
+        The number of rows to read at a time.
+
+    Returns
+    -------
+
+    n_samples : [int]
+        The number of samples for each window, sorted by window index.
+
+    pots : numpy.ndarray
+        The potential energy of all samples, grouped by window.
+
+    pert_es : numpy.ndarray
+        The perturbation energy of all samples, grouped by window.
+
+    params : dict
+        The temperature, lambda1, lambda2, alpha, uh, and w0 parameters for
+        each window, taken from the first sample of the window.
+    """
+
+    param_names = ["temperature", "lambda1", "lambda2", "alpha", "uh", "w0"]
+    columns = ["window", "pot_en", "pert_en"] + param_names
+    dtypes = {name: _numpy.float64 for name in columns}
+    dtypes["window"] = _numpy.int64
+
+    # Work out the rows to read from each file.
+    skiprows = range(1, ignore_lower + 1) if ignore_lower > 0 else None
+    if ignore_upper is not None:
+        nrows = max(ignore_upper - ignore_lower, 0)
+    else:
+        nrows = None
+
+    def read(file, usecols):
+        if nrows == 0:
+            return []
+        return _pd.read_csv(
+            file,
+            usecols=usecols,
+            dtype={name: dtypes[name] for name in usecols},
+            skiprows=skiprows,
+            nrows=nrows,
+            chunksize=chunk_size,
+        )
+
+    files = [folder / "openmm.csv" for folder in folders.values()]
+
+    # First pass: count the samples in each window.
+    counts = {}
+    for file in files:
+        for chunk in read(file, ["window"]):
+            windows, num = _numpy.unique(chunk["window"].to_numpy(), return_counts=True)
+            for window, n in zip(windows, num):
+                counts[window] = counts.get(window, 0) + n
+
+    windows = sorted(counts)
+    n_samples = [int(counts[window]) for window in windows]
+    offsets = dict(zip(windows, _numpy.concatenate([[0], _numpy.cumsum(n_samples)])))
+
+    pots = _numpy.empty(sum(n_samples))
+    pert_es = _numpy.empty(sum(n_samples))
+    params = {name: _numpy.empty(len(windows)) for name in param_names}
+
+    # Second pass: copy the samples into place, preserving the order in
+    # which they appear for each window.
+    filled = {window: 0 for window in windows}
+    for file in files:
+        for chunk in read(file, columns):
+            window_col = chunk["window"].to_numpy()
+            order = _numpy.argsort(window_col, kind="stable")
+            chunk_windows, starts, num = _numpy.unique(
+                window_col[order], return_index=True, return_counts=True
+            )
+            pot_col = chunk["pot_en"].to_numpy()
+            pert_col = chunk["pert_en"].to_numpy()
+            for window, start, n in zip(chunk_windows, starts, num):
+                rows = order[start : start + n]
+                dest = offsets[window] + filled[window]
+                pots[dest : dest + n] = pot_col[rows]
+                pert_es[dest : dest + n] = pert_col[rows]
+
+                # Store the parameters from the first sample of the window.
+                if filled[window] == 0:
+                    index = windows.index(window)
+                    for name in param_names:
+                        params[name][index] = chunk[name].iat[rows[0]]
+
+                filled[window] += n
+
+    return n_samples, pots, pert_es, params
+
+
 def _get_inflection_indices(folders):
     # Find folders at which 'direction' goes from 1 to -1
     # This is the point at which the direction of the lambda windows changes
@@ -186,7 +546,7 @@ def _get_inflection_indices(folders):
 
     directions = []
     for folder in folders.values():
-        df = _pd.read_csv(folder / "openmm.csv")
+        df = _pd.read_csv(folder / "openmm.csv", usecols=["direction"], nrows=1)
         direction = df["direction"].values[0]
         directions.append(direction)
 
@@ -199,7 +559,15 @@ def _get_inflection_indices(folders):
     return inflection_indices
 
 
-def analyse_UWHAM(work_dir, ignore_lower, ignore_upper, inflection_indices=None):
+def analyse_UWHAM(
+    work_dir,
+    ignore_lower,
+    ignore_upper,
+    inflection_indices=None,
+    num_bootstrap=0,
+    max_workers=None,
+    seed=None,
+):
     """
     Analyse the output of BioSimSpace ATM simulations.
 
@@ -220,6 +588,18 @@ def analyse_UWHAM(work_dir, ignore_lower, ignore_upper, inflection_indices=None)
         Should be (last index of direction 1, first index of direction 2).
         If not provided not provided, will be implied from files.
 
+    num_bootstrap : int
+        The number of bootstrap replicates used to estimate the error. If
+        zero, then the analytical UWHAM error estimate is used.
+
+    max_workers : int
+        The maximum number of bootstrap replicates to solve concurrently.
+        If None, then the number of CPUs is used, limited by the memory
+        needed for each replicate.
+
+    seed : int
+        The seed for the bootstrap random number generator.
+
     Returns
     -------
 
@@ -231,119 +611,76 @@ def analyse_UWHAM(work_dir, ignore_lower, ignore_upper, inflection_indices=None)
     """
     # NOTE: This code is not designed to work with repex
     # It always assumes that each window is at the same temperature
-    dataframes = []
-    slices = {}
-    total_states = 0
-    total_samples = 0
     folders = _sort_folders(work_dir)
     if inflection_indices is None:
         inflection_indices = _get_inflection_indices(folders)
-    for folder in folders.values():
-        df = _pd.read_csv(folder / "openmm.csv")
-        # drop the first `ignore_lower` rows of each df
-        if ignore_upper is not None:
-            df = df.iloc[ignore_lower:ignore_upper]
-        else:
-            df = df.iloc[ignore_lower:]
-        # Beta values, assuming that energies are in kj/mol
-        df["beta"] = 1 / (0.001986209 * df["temperature"])
-        total_states += 1
-        total_samples += len(df)
-        for sub_df in df.groupby("window"):
-            # get value of window
-            window = sub_df[0]
-            # check if window is in slices
-            if window not in slices:
-                slices[window] = []
-            # append the dataframe to the list of dataframes for that window
-            # now get the tuple 'sub_df' and convert it to a dataframe
-            s = sub_df[1]
-            slices[window].append(s)
-
-    # now combine all dataframes in each slice
-    for window in slices:
-        # get the dataframes for the current window
-        dfs = slices[window]
-        # combine the dataframes
-        combined_df = _pd.concat(dfs)
-        dataframes.append(combined_df)
-
-    # sort 'dataframes' based on 'window'
-    dataframes = sorted(dataframes, key=lambda x: x["window"].values[0])
-
-    pots = []
-    pert_es = []
-    n_samples = []
-    # check that all dataframes are the same length, throw a warning if they are not
-    for df in dataframes:
-        n_samples.append(len(df))
-        e0 = df["pot_en"].values
-        pert_e = df["pert_en"].values
-        pots.append(e0)
-        pert_es.append(pert_e)
+
+    n_samples, pots, pert_es, params = _load_uwham_data(
+        folders, ignore_lower, ignore_upper
+    )
+    offsets = _numpy.concatenate([[0], _numpy.cumsum(n_samples)])
+
+    # Beta values, assuming that energies are in kj/mol
+    beta = 1 / (0.001986209 * params.pop("temperature"))
+    params = {
+        "lam1": params["lambda1"],
+        "lam2": params["lambda2"],
+        "alpha": params["alpha"],
+        "u0": params["uh"],
+        "w0": params["w0"],
+    }
 
     # Should only matter in cases where states are at different temps,
     # leaving here for debugging and parity with GL code
     for be in range(len(n_samples)):
-        pots[be] = pots[be] - _bias_fcn(
-            pert_es[be],
-            lam1=dataframes[be]["lambda1"].values[0],
-            lam2=dataframes[be]["lambda2"].values[0],
-            alpha=dataframes[be]["alpha"].values[0],
-            u0=dataframes[be]["uh"].values[0],
-            w0=dataframes[be]["w0"].values[0],
+        window = slice(offsets[be], offsets[be + 1])
+        pots[window] -= _bias_fcn(
+            pert_es[window], **{key: value[be] for key, value in params.items()}
         )
+
     # We will assume that the point at which leg1 and leg2 are split is halfway through
     n_samples_first_half = n_samples[: inflection_indices[0] + 1]
-    pots_first_half = _numpy.concatenate(pots[: inflection_indices[0] + 1])
-    pert_es_first_half = _numpy.concatenate(pert_es[: inflection_indices[0] + 1])
-    ln_q = _numpy.zeros((inflection_indices[0] + 1, len(pots_first_half)))
-    sid = 0
-
-    for be in range(len(n_samples_first_half)):
-        lnq = _npot_fcn(
-            e0=pots_first_half,
-            epert=pert_es_first_half,
-            bet=dataframes[be]["beta"].values[0],
-            lam1=dataframes[be]["lambda1"].values[0],
-            lam2=dataframes[be]["lambda2"].values[0],
-            alpha=dataframes[be]["alpha"].values[0],
-            u0=dataframes[be]["uh"].values[0],
-            w0=dataframes[be]["w0"].values[0],
-        )
-        ln_q[sid] = lnq
-        sid += 1
-    f_i, d_i, weights = _estimate_f_i(ln_q, n_samples_first_half)
+    num_states = len(n_samples_first_half)
+    ln_q = _compute_ln_q(
+        e0=pots[: offsets[num_states]],
+        epert=pert_es[: offsets[num_states]],
+        bet=beta[:num_states],
+        **{key: value[:num_states] for key, value in params.items()},
+    )
+    f_i, d_i, weights = _solve_f_i(ln_q, n_samples_first_half)
     ddg = f_i[-1] - f_i[0]
-    ddg1 = ddg / dataframes[0]["beta"].values[0]
+    ddg1 = ddg / beta[0]
     # print(f"Forward leg: {ddg1}")
-    ddg_error_1 = _numpy.sqrt(d_i[-1] + d_i[0]) / dataframes[0]["beta"].values[0]
-
-    n_samples_second_half = n_samples[inflection_indices[1] :]
-    pots_second_half = _numpy.concatenate(pots[inflection_indices[1] :])
-    pert_es_second_half = _numpy.concatenate(pert_es[inflection_indices[1] :])
-    ln_q = _numpy.zeros((total_states - inflection_indices[1], len(pots_second_half)))
-    sid = 0
+    if num_bootstrap > 0:
+        d_ddg = _bootstrap_f_i(
+            ln_q, n_samples_first_half, f_i, num_bootstrap, max_workers, seed
+        )
+    else:
+        d_ddg = d_i[-1] + d_i[0]
+    ddg_error_1 = _numpy.sqrt(d_ddg) / beta[0]
+    del ln_q, weights
 
     # note the order of (be, te)
-    for be in range(len(n_samples_second_half)):
-        lnq = _npot_fcn(
-            e0=pots_second_half,
-            epert=pert_es_second_half,
-            bet=dataframes[be]["beta"].values[0],
-            lam1=dataframes[be]["lambda1"].values[0],
-            lam2=dataframes[be]["lambda2"].values[0],
-            alpha=dataframes[be]["alpha"].values[0],
-            u0=dataframes[be]["uh"].values[0],
-            w0=dataframes[be]["w0"].values[0],
-        )
-        ln_q[sid] = lnq
-        sid += 1
-    f_i, d_i, weights = _estimate_f_i(ln_q, n_samples_second_half)
+    n_samples_second_half = n_samples[inflection_indices[1] :]
+    num_states = len(n_samples_second_half)
+    ln_q = _compute_ln_q(
+        e0=pots[offsets[inflection_indices[1]] :],
+        epert=pert_es[offsets[inflection_indices[1]] :],
+        bet=beta[:num_states],
+        **{key: value[:num_states] for key, value in params.items()},
+    )
+    # Warm-start from the solution for the first half.
+    f_i, d_i, weights = _solve_f_i(ln_q, n_samples_second_half, initial_f_i=f_i)
     ddg = f_i[-1] - f_i[0]
-    ddg2 = ddg / dataframes[0]["beta"].values[0]
+    ddg2 = ddg / beta[0]
     # print(f"Reverse leg: {ddg2}")
-    ddg_error_2 = _numpy.sqrt(d_i[-1] + d_i[0]) / dataframes[0]["beta"].values[0]
+    if num_bootstrap > 0:
+        d_ddg = _bootstrap_f_i(
+            ln_q, n_samples_second_half, f_i, num_bootstrap, max_workers, seed
+        )
+    else:
+        d_ddg = d_i[-1] + d_i[0]
+    ddg_error_2 = _numpy.sqrt(d_ddg) / beta[0]
 
     ddg_total = ddg1 - ddg2
     ddg_total_error = _numpy.sqrt(ddg_error_1**2 + ddg_error_2**2)
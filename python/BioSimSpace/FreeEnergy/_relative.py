@@ -24,8 +24,9 @@
 __author__ = "Lester Hedges"
 __email__ = "lester.hedges@gmail.com"
 
-__all__ = ["Relative", "getData"]
+__all__ = ["Relative", "OnlineEstimator", "getData"]
 
+import concurrent.futures as _futures
 import copy as _copy
 import json as _json
 import math as _math
@@ -83,7 +84,6 @@ from sire.legacy.Base import getShareDir as _getShareDir
 from sire.legacy import IO as _SireIO
 from sire.legacy import Mol as _SireMol
 
-from .. import _gmx_exe
 from .. import _is_notebook
 from .. import _isVerbose
 from .._Exceptions import AnalysisError as _AnalysisError
@@ -100,6 +100,10 @@ from .. import _Utils
 if _is_notebook:
     from IPython.display import FileLink as _FileLink
 
+# The version of the cache format used for extracted free-energy data.
+# Increment this to invalidate existing cache files.
+_analysis_cache_version = 1
+
 # Check that the analyse_freenrg script exists.
 if _sys.platform != "win32":
     _analyse_freenrg = _os.path.join(_getBinDir(), "analyse_freenrg")
@@ -136,6 +140,7 @@ class Relative:
         engine=None,
         setup_only=False,
         property_map={},
+        share_inputs=False,
         **kwargs,
     ):
         """
@@ -178,6 +183,15 @@ class Relative:
             values. This allows the user to refer to properties with their
             own naming scheme, e.g. { "charge" : "my-charge" }
 
+        share_inputs : bool
+            Whether to store the topology, coordinate, and perturbation input
+            files, which are the same for every lambda window, once in a
+            'shared' sub-directory of 'work_dir'. They are then hard linked
+            (or symbolically linked, where hard links aren't supported) into
+            each lambda window directory, rather than copied. Note that the
+            linked files must not be edited in place, since any change would
+            affect all lambda windows.
+
         kwargs : dict
             Additional keyword arguments to pass to the underlying Process
             objects.
@@ -277,6 +291,10 @@ class Relative:
             raise TypeError("'property_map' must be of type 'dict'")
         self._property_map = property_map
 
+        if not isinstance(share_inputs, bool):
+            raise TypeError("'share_inputs' must be of type 'bool'.")
+        self._share_inputs = share_inputs
+
         # Validate the kwargs.
         if not isinstance(kwargs, dict):
             raise TypeError("'kwargs' must be of type 'dict'.")
@@ -347,6 +365,41 @@ class Relative:
         """
         return str(self._work_dir)
 
+    def getOnlineEstimator(self, estimator="MBAR", **kwargs):
+        """
+        Return an estimator that can be used to monitor the free-energy
+        difference while the simulations are running.
+
+        Parameters
+        ----------
+
+        estimator : str
+            The estimator to use for the free-energy analysis. ("MBAR" or "TI")
+
+        kwargs : dict
+            Additional keyword arguments used to preprocess the data, as
+            for :meth:`analyse`.
+
+        Returns
+        -------
+
+        online_estimator : :class:`OnlineEstimator <BioSimSpace.FreeEnergy.OnlineEstimator>`
+            The online estimator.
+        """
+
+        if not hasattr(self._protocol, "getTemperature"):
+            raise ValueError(
+                "Online estimation requires a protocol with a temperature."
+            )
+
+        return OnlineEstimator(
+            str(self._work_dir),
+            self._engine,
+            self._protocol.getTemperature(),
+            estimator=estimator,
+            **kwargs,
+        )
+
     def getData(self, name="data", file_link=False, work_dir=None):
         """
         Return a link to a zip file containing the data files required for
@@ -510,6 +563,133 @@ class Relative:
             "Couldn't find any SOMD, SOMD2, GROMACS or AMBER free-energy output?"
         )
 
+    @staticmethod
+    def analyseNetwork(
+        work_dirs, estimator="MBAR", method="alchemlyb", max_workers=None, **kwargs
+    ):
+        """
+        Analyse existing free-energy data for multiple simulation working
+        directories, e.g. the legs of all edges in a perturbation network.
+        The directories are analysed concurrently using a pool of worker
+        processes.
+
+        Parameters
+        ----------
+
+        work_dirs : [str], {str: str}
+            The working directories to analyse. This can be a list of
+            directories, or a dictionary mapping a name, e.g. the name of
+            an edge and leg, to the directory.
+
+        estimator : str
+            The estimator to use for the free-energy analysis. ("MBAR" or "TI")
+
+        method : str
+            The method to use for the free-energy analysis. ("alchemlyb" or "native")
+
+        max_workers : int
+            The maximum number of worker processes. If None, then the number
+            of CPUs is used.
+
+        kwargs : dict
+            Additional keyword arguments passed to the analysis of each
+            working directory.
+
+        Returns
+        -------
+
+        results : pandas.DataFrame
+            A table of results, indexed by name, or working directory.
+            The columns are the working directory, "work_dir", the potential
+            of mean force, "pmf", the overlap matrix, "overlap", the total
+            free-energy difference and its standard error, "free_energy"
+            and "error", and "failure", which is a message describing why
+            the analysis failed, or None if it was successful. See
+            :meth:`analyse` for the format of the PMF and overlap matrix.
+        """
+
+        if isinstance(work_dirs, dict):
+            names = list(work_dirs.keys())
+            work_dirs = list(work_dirs.values())
+        elif isinstance(work_dirs, (list, tuple)):
+            names = list(work_dirs)
+            work_dirs = list(work_dirs)
+        else:
+            raise TypeError("'work_dirs' must be of type 'list' or 'dict'.")
+        if not all(isinstance(x, str) for x in work_dirs):
+            raise TypeError("'work_dirs' must contain 'str' types.")
+        for work_dir in work_dirs:
+            if not _os.path.isdir(work_dir):
+                raise ValueError(f"'work_dir' doesn't exist: {work_dir}")
+
+        if not isinstance(estimator, str):
+            raise TypeError("'estimator' must be of type 'str'.")
+
+        if not isinstance(method, str):
+            raise TypeError("'method' must be of type 'str'.")
+
+        if max_workers is None:
+            max_workers = _os.cpu_count() or 1
+        elif not type(max_workers) is int:
+            raise TypeError("'max_workers' must be of type 'int'.")
+        elif max_workers < 1:
+            raise ValueError("'max_workers' must be greater than zero.")
+        max_workers = min(max_workers, len(work_dirs))
+
+        args = [(work_dir, estimator, method, kwargs) for work_dir in work_dirs]
+
+        # Analyse the directories.
+        if max_workers <= 1:
+            results = [_analyse_worker(*arg) for arg in args]
+        else:
+            import multiprocessing as _multiprocessing
+
+            # Where possible, use a fork server that has already imported
+            # this module, along with alchemlyb. Workers are then forked from
+            # a single threaded process, so don't need to repeat the imports.
+            if "forkserver" in _multiprocessing.get_all_start_methods():
+                context = _multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = _multiprocessing.get_context("spawn")
+
+            with _futures.ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=context
+            ) as executor:
+                results = list(executor.map(_analyse_worker, *zip(*args)))
+
+        # Convert the results to a table.
+        rows = []
+        for work_dir, (pmf, overlap, failure) in zip(work_dirs, results):
+            if pmf is not None:
+                pmf = [
+                    (
+                        lam,
+                        nrg * _Units.Energy.kcal_per_mol,
+                        err * _Units.Energy.kcal_per_mol,
+                    )
+                    for lam, nrg, err in pmf
+                ]
+                free_energy = pmf[-1][1]
+                error = pmf[-1][2]
+                if overlap is not None:
+                    overlap = _np.matrix(overlap)
+            else:
+                free_energy = None
+                error = None
+            rows.append(
+                {
+                    "work_dir": work_dir,
+                    "pmf": pmf,
+                    "overlap": overlap,
+                    "free_energy": free_energy,
+                    "error": error,
+                    "failure": failure,
+                }
+            )
+
+        return _pd.DataFrame(rows, index=names)
+
     @staticmethod
     def checkOverlap(overlap, threshold=0.03):
         """
@@ -736,10 +916,17 @@ class Relative:
             "AMBER": _amber_extract_u_nk if is_mbar else _amber_extract_dHdl,
         }
 
-        # Extract the data.
+        # Extract the data. Apart from SOMD2, which already writes its output
+        # in a columnar format, the parsed data for each file is cached.
         func = function_dict[engine]
         try:
-            data = [func(file, T=temp) for file, temp in zip(files, temperatures)]
+            if engine == "SOMD2":
+                data = [func(file, T=temp) for file, temp in zip(files, temperatures)]
+            else:
+                data = [
+                    _extract_cached(func, file, temp, engine, estimator)
+                    for file, temp in zip(files, temperatures)
+                ]
         except Exception as e:
             msg = "Could not extract the data from the provided files!"
             if _isVerbose():
@@ -885,7 +1072,8 @@ class Relative:
         found_array = False
         found_time = False
 
-        # Process the file.
+        # Process the file. It is read once, with the header records parsed
+        # from the lines and the data records converted to an array below.
         with open(simfile, "r") as f:
             # Terms to search for in the record lines.
             start_w = "#Generating lambda is"
@@ -893,7 +1081,8 @@ class Relative:
             start_t = " and "
             end_t = " ps"
             # Read the file line-by-line.
-            for line in f.readlines():
+            lines = f.readlines()
+            for line in lines:
                 if start_w in line:
                     lambda_win = float(line.replace(start_w, "").strip())
                     if lambda_win is not None:
@@ -923,48 +1112,51 @@ class Relative:
 
         if not found_lambda:
             raise ValueError(
-                f"The lambda window was not detected in the SOMD output file: {file}"
+                f"The lambda window was not detected in the SOMD output file: {simfile}"
             )
 
         if not found_array:
             raise ValueError(
-                f"The lambda array was not detected in the SOMD output file: {file}"
+                f"The lambda array was not detected in the SOMD output file: {simfile}"
             )
 
         if not found_time:
             raise ValueError(
-                f"The simulation time was not detected in the SOMD output file: {file}"
+                f"The simulation time was not detected in the SOMD output file: {simfile}"
             )
 
-        # TODO: get header from the file instead of like this.
-        header = [
-            "step",
-            "potential",
-            "gradient",
-            "forward_Metropolis",
-            "backward_Metropolis",
-        ]
-        header.extend(lambda_array)
-
-        file_df = _pd.read_fwf(
-            simfile, skipinitialspace=True, skiprows=13, header=None, names=header
-        )
+        # The records are: step, potential, gradient, forward_Metropolis,
+        # backward_Metropolis, followed by the energy at each lambda value.
+        num_records = 5 + len(lambda_array)
+
+        # The file might still be being written, so ignore an incomplete
+        # final record.
+        data_lines = lines[13:]
+        if len(data_lines) > 0 and (
+            not data_lines[-1].endswith("\n")
+            or len(data_lines[-1].split()) != num_records
+        ):
+            data_lines = data_lines[:-1]
+
+        records = _np.loadtxt(data_lines, ndmin=2)
+        if records.shape[1] != num_records:
+            raise ValueError(
+                f"Unexpected number of records in the SOMD output file: {simfile}"
+            )
+        num_steps = records.shape[0]
 
-        time_step = sim_length / len(file_df["step"])
-        time_rows = _np.arange(0, len(file_df["step"]), 1)
+        time_step = sim_length / num_steps
         time = _np.arange(0, sim_length, time_step)
 
         # For MBAR, results in list of lists where each list is the 0 to 1
         # window values that lambda value. For TI, it is a list of gradients
         # at that lambda.
         if is_mbar:
-            results = (
-                file_df.iloc[:, 5:].subtract(file_df[lambda_win], axis=0).to_numpy()
-            )
+            results = records[:, 5:] - records[:, [5 + lambda_array.index(lambda_win)]]
         else:
             # This is actually in units of kT, but is reported incorrectly in
             # the file originally written by SOMD.
-            results = file_df["gradient"].to_numpy()
+            results = records[:, 2]
 
         # Turn into a dataframe that can be processed by alchemlyb.
         if is_mbar:
@@ -1498,6 +1690,8 @@ class Relative:
             each lambda window. For TI, this returns None.
         """
 
+        from .. import _gmx_exe
+
         if not isinstance(work_dir, str):
             raise TypeError("'work_dir' must be of type 'str'.")
         if not _os.path.isdir(work_dir):
@@ -2061,6 +2255,44 @@ class Relative:
             else:
                 processes.append(first_process)
 
+        # Work out the configuration file for the engine, along with the
+        # option used to set the lambda value. Files that are regenerated
+        # for each lambda window aren't shared.
+        if self._engine == "SOMD":
+            config_name = "somd.cfg"
+            lambda_option = "lambda_val"
+            exclude = [config_name]
+        elif self._engine == "GROMACS":
+            config_name = "gromacs.mdp"
+            lambda_option = "init-lambda-state"
+            exclude = [config_name, "gromacs.tpr", "gromacs.out.mdp"]
+        elif self._engine == "AMBER":
+            config_name = "amber.cfg"
+            lambda_option = "clambda"
+            exclude = [config_name]
+
+        # Read the configuration for the first lambda window.
+        with open(_os.path.join(first_dir, config_name), "r") as f:
+            first_config = f.read()
+
+        # Move the input files that are common to all lambda windows into a
+        # shared directory, then link them back into the first directory.
+        if self._share_inputs:
+            shared_dir = _os.path.abspath("%s/shared" % self._work_dir)
+            if _os.path.isdir(shared_dir):
+                _shutil.rmtree(shared_dir, ignore_errors=True)
+            _os.makedirs(shared_dir)
+
+            for name in _os.listdir(first_dir):
+                file = _os.path.join(first_dir, name)
+                if name not in exclude and _os.path.isfile(file):
+                    shared_file = _os.path.join(shared_dir, name)
+                    _os.replace(file, shared_file)
+                    _link_file(shared_file, file)
+
+        # Arguments for the grompp calls for each GROMACS lambda window.
+        grompp_jobs = []
+
         # Loop over the rest of the lambda values.
         for x, lam in enumerate(lam_vals[1:]):
             # Name the directory.
@@ -2074,27 +2306,43 @@ class Relative:
             if _os.path.isdir(new_dir):
                 _shutil.rmtree(new_dir, ignore_errors=True)
 
-            # Copy the first directory to that of the current lambda value.
-            _shutil.copytree(first_dir, new_dir)
+            # Populate the directory for the current lambda value. Shared
+            # inputs are linked, everything else is copied from the first
+            # directory, apart from the files that are regenerated below.
+            _os.makedirs(new_dir)
+            for name in _os.listdir(first_dir):
+                if name in exclude:
+                    continue
+                file = _os.path.join(first_dir, name)
+                new_file = _os.path.join(new_dir, name)
+                if _os.path.isdir(file):
+                    _shutil.copytree(file, new_file)
+                elif self._share_inputs:
+                    _link_file(_os.path.join(shared_dir, name), new_file)
+                else:
+                    _shutil.copy2(file, new_file)
 
             # Update the protocol lambda values.
             self._protocol.setLambdaValues(lam=lam, lam_vals=lam_vals)
 
-            # Now update the lambda values in the config files.
+            # Now write the config file for the current lambda value.
+            if self._engine == "GROMACS":
+                lambda_line = "init-lambda-state = %d" % (x + 1)
+            elif self._engine == "SOMD":
+                lambda_line = "lambda_val = %s" % lam
+            else:
+                lambda_line = "   clambda=%s," % lam
+            new_config = _re.sub(
+                r"^.*%s.*$" % _re.escape(lambda_option),
+                lambda match: lambda_line,
+                first_config,
+                flags=_re.MULTILINE,
+            )
+            with open(_os.path.join(new_dir, config_name), "w") as f:
+                f.write(new_config)
 
             # SOMD.
             if self._engine == "SOMD":
-                new_config = []
-                with open(new_dir + "/somd.cfg", "r") as f:
-                    for line in f:
-                        if "lambda_val" in line:
-                            new_config.append("lambda_val = %s\n" % lam)
-                        else:
-                            new_config.append(line)
-                with open(new_dir + "/somd.cfg", "w") as f:
-                    for line in new_config:
-                        f.write(line)
-
                 # Create a copy of the process and update the working
                 # directory.
                 if not self._setup_only:
@@ -2121,34 +2369,13 @@ class Relative:
 
             # GROMACS.
             elif self._engine == "GROMACS":
-                # Delete the existing binary run file.
-                _os.remove(new_dir + "/gromacs.tpr")
-                new_config = []
-                with open(new_dir + "/gromacs.mdp", "r") as f:
-                    for line in f:
-                        if "init-lambda-state" in line:
-                            new_config.append("init-lambda-state = %d\n" % (x + 1))
-                        else:
-                            new_config.append(line)
-                with open(new_dir + "/gromacs.mdp", "w") as f:
-                    for line in new_config:
-                        f.write(line)
-
                 mdp = _os.path.join(new_dir, "gromacs.mdp")
                 gro = _os.path.join(new_dir, "gromacs.gro")
                 top = _os.path.join(new_dir, "gromacs.top")
                 tpr = _os.path.join(new_dir, "gromacs.tpr")
 
-                # Use grompp to generate the portable binary run input file.
-                _Process.Gromacs._generate_binary_run_file(
-                    mdp,
-                    gro,
-                    top,
-                    gro,
-                    tpr,
-                    first_process._exe,
-                    **self._kwargs,
-                )
+                # Queue the generation of the portable binary run input file.
+                grompp_jobs.append((mdp, gro, top, gro, tpr))
 
                 # Create a copy of the process and update the working
                 # directory.
@@ -2175,17 +2402,6 @@ class Relative:
 
             # AMBER.
             elif self._engine == "AMBER":
-                new_config = []
-                with open(new_dir + "/amber.cfg", "r") as f:
-                    for line in f:
-                        if "clambda" in line:
-                            new_config.append("   clambda=%s,\n" % lam)
-                        else:
-                            new_config.append(line)
-                with open(new_dir + "/amber.cfg", "w") as f:
-                    for line in new_config:
-                        f.write(line)
-
                 # Create a copy of the process and update the working
                 # directory.
                 if not self._setup_only:
@@ -2208,12 +2424,488 @@ class Relative:
                     ]
                     processes.append(process)
 
+        # Use grompp to generate the binary run input files. Each call is an
+        # independent subprocess, so run them concurrently.
+        if grompp_jobs:
+            _run_grompp_jobs(grompp_jobs, first_process._exe, self._kwargs)
+
         if not self._setup_only:
             # Initialise the process runner. All processes have already been nested
             # inside the working directory so no need to re-nest.
             self._runner = _Process.ProcessRunner(processes)
 
 
+class OnlineEstimator:
+    """
+    An incremental free-energy estimator for a running free-energy leg.
+    The output of each lambda window is read as it is written, with new
+    samples added to per-window accumulators, so that the free-energy
+    difference, its error, and the overlap can be monitored while the
+    simulations run, e.g. to stop them once a target error is reached.
+    """
+
+    # The files containing the free-energy data for each engine.
+    _masks = {"AMBER": "*.out", "GROMACS": "[!bar]*.xvg", "SOMD": "simfile.dat"}
+
+    def __init__(self, work_dir, engine, temperature, estimator="MBAR", **kwargs):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+
+        work_dir : str
+            The working directory of the free-energy leg. This should contain
+            a directory for each lambda window, named 'lambda_<value>'.
+
+        engine : str
+            The molecular dynamics engine used to run the simulation.
+            Available options are "AMBER", "GROMACS", or "SOMD".
+
+        temperature : :class:`Temperature <BioSimSpace.Types.Temperature>`
+            The temperature at which the simulations are run.
+
+        estimator : str
+            The estimator to use for the free-energy analysis. ("MBAR" or "TI")
+
+        kwargs : dict
+            Additional keyword arguments used to preprocess the data, as
+            for :meth:`Relative.analyse`.
+        """
+
+        _assert_imported("alchemlyb")
+
+        if not isinstance(work_dir, str):
+            raise TypeError("'work_dir' must be of type 'str'.")
+        if not _os.path.isdir(work_dir):
+            raise ValueError("'work_dir' doesn't exist!")
+        self._work_dir = work_dir
+
+        if not isinstance(engine, str):
+            raise TypeError("'engine' must be of type 'str'.")
+        engine = engine.replace(" ", "").upper()
+        if engine not in self._masks:
+            raise ValueError(
+                f"Unsupported engine '{engine}'. Options are: {', '.join(self._masks)}"
+            )
+        self._engine = engine
+
+        if not isinstance(temperature, _Types.Temperature):
+            raise TypeError(
+                "'temperature' must be of type 'BioSimSpace.Types.Temperature'"
+            )
+        self._temperature = temperature.kelvin().value()
+
+        if not isinstance(estimator, str):
+            raise TypeError("'estimator' must be of type 'str'.")
+        estimator = estimator.replace(" ", "").upper()
+        if estimator not in ["MBAR", "TI"]:
+            raise ValueError("'estimator' must be either 'MBAR' or 'TI'.")
+        self._estimator = estimator
+
+        self._kwargs = kwargs
+
+        # A reader for each lambda window, keyed by lambda value.
+        self._readers = {}
+
+        # The free energies (in kT) from the previous MBAR solution, used to
+        # warm-start the next.
+        self._f_k = None
+
+    def __str__(self):
+        """Return a human readable string representation of the object."""
+        return (
+            f"<BioSimSpace.FreeEnergy.OnlineEstimator: work_dir={self._work_dir!r}, "
+            f"engine={self._engine!r}, estimator={self._estimator!r}>"
+        )
+
+    def __repr__(self):
+        """Return a string showing how to instantiate the object."""
+        return self.__str__()
+
+    def update(self):
+        """
+        Read any new data that has been written by the lambda windows.
+
+        Returns
+        -------
+
+        num_samples : int
+            The number of new samples.
+        """
+
+        num_samples = 0
+
+        for lambda_dir in _pathlib.Path(self._work_dir).glob("lambda_*"):
+            try:
+                lam = float(lambda_dir.name.split("_")[-1])
+            except ValueError:
+                continue
+
+            if lam not in self._readers:
+                files = sorted(lambda_dir.glob(self._masks[self._engine]))
+                if len(files) == 0:
+                    continue
+                if self._engine == "SOMD":
+                    self._readers[lam] = _SomdWindowReader(
+                        files[0], self._temperature, self._estimator
+                    )
+                else:
+                    self._readers[lam] = _AlchemlybWindowReader(
+                        files[0], self._temperature, self._engine, self._estimator
+                    )
+
+            num_samples += self._readers[lam].read()
+
+        return num_samples
+
+    def nSamples(self):
+        """
+        Return the number of samples that have been read for each lambda
+        window.
+
+        Returns
+        -------
+
+        num_samples : {float: int}
+            The number of samples, keyed by lambda value.
+        """
+        return {lam: self._readers[lam].nSamples() for lam in sorted(self._readers)}
+
+    def analyse(self):
+        """
+        Estimate the free-energy difference using the data read so far.
+        Call :meth:`update` first to read any new data. When using MBAR,
+        the solver is initialised using the solution from the previous call.
+
+        Returns
+        -------
+
+        pmf : [(float, :class:`Energy <BioSimSpace.Types.Energy>`, :class:`Energy <BioSimSpace.Types.Energy>`)]
+            The potential of mean force (PMF). The data is a list of tuples,
+            where each tuple contains the lambda value, the PMF, and the
+            standard error.
+
+        overlap : numpy.matrix, None
+            The overlap matrix. This gives the overlap between each lambda
+            window. This is None when using the TI estimator.
+        """
+
+        lambdas = sorted(self._readers)
+        data = [self._readers[lam].data() for lam in lambdas]
+        if len(lambdas) < 2 or any(x is None for x in data):
+            raise _AnalysisError(
+                "Data hasn't yet been written for all of the lambda windows!"
+            )
+
+        # Preprocess the data.
+        try:
+            processed_data = Relative._preprocess_data(
+                data, self._estimator, **self._kwargs
+            )
+        except:
+            _warnings.warn("Could not preprocess the data!")
+            processed_data = _alchemlyb.concat(data)
+
+        try:
+            if self._estimator == "MBAR":
+                alchem = None
+                if self._f_k is not None and len(self._f_k) == len(lambdas):
+                    try:
+                        alchem = _AutoMBAR(initial_f_k=self._f_k)
+                    except TypeError:
+                        pass
+                if alchem is None:
+                    alchem = _AutoMBAR()
+                alchem.fit(processed_data)
+                self._f_k = alchem.delta_f_.iloc[0, :].to_numpy()
+            else:
+                alchem = _TI().fit(processed_data)
+        except Exception as e:
+            msg = f"{self._estimator} free-energy analysis failed!"
+            if _isVerbose():
+                raise _AnalysisError(msg) from e
+            else:
+                raise _AnalysisError(msg) from None
+
+        # Convert the data frames to kcal/mol.
+        delta_f_ = _to_kcalmol(alchem.delta_f_)
+        d_delta_f_ = _to_kcalmol(alchem.d_delta_f_)
+
+        pmf = []
+        for x, lam in enumerate(lambdas):
+            pmf.append(
+                (
+                    lam,
+                    delta_f_.iloc[0, x] * _Units.Energy.kcal_per_mol,
+                    d_delta_f_.iloc[0, x] * _Units.Energy.kcal_per_mol,
+                )
+            )
+
+        if self._estimator == "MBAR":
+            return pmf, _np.matrix(alchem.overlap_matrix)
+        else:
+            return pmf, None
+
+    def isConverged(self, error):
+        """
+        Update the estimate and check whether the standard error of the
+        free-energy difference is below a target value.
+
+        Parameters
+        ----------
+
+        error : :class:`Energy <BioSimSpace.Types.Energy>`
+            The target standard error.
+
+        Returns
+        -------
+
+        is_converged : bool
+            Whether the standard error is below the target.
+        """
+
+        if not isinstance(error, _Types.Energy):
+            raise TypeError("'error' must be of type 'BioSimSpace.Types.Energy'")
+
+        self.update()
+        try:
+            pmf, _ = self.analyse()
+        except _AnalysisError:
+            return False
+
+        return pmf[-1][2].kcal_per_mol().value() <= error.kcal_per_mol().value()
+
+
+class _SomdWindowReader:
+    """
+    An incremental reader for the SOMD output file (simfile.dat) of a
+    single lambda window.
+    """
+
+    def __init__(self, file, T, estimator):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+
+        file : pathlib.Path
+            The path to the simfile.dat file.
+
+        T : float
+            The temperature in Kelvin.
+
+        estimator : str
+            The estimator that the data will be used with.
+        """
+        self._file = file
+        self._T = T
+        self._is_mbar = estimator == "MBAR"
+        self._reset()
+
+    def _reset(self):
+        """Reset the reader state."""
+        self._offset = 0
+        self._lambda_win = None
+        self._lambda_array = None
+        self._records = []
+        self._num_samples = 0
+
+    def nSamples(self):
+        """Return the number of samples read."""
+        return self._num_samples
+
+    def read(self):
+        """
+        Read any complete records appended since the last call.
+
+        Returns
+        -------
+
+        num_samples : int
+            The number of new samples.
+        """
+
+        if not self._file.is_file():
+            return 0
+
+        # The file has been truncated, e.g. the window was restarted.
+        if self._file.stat().st_size < self._offset:
+            self._reset()
+
+        with open(self._file, "rb") as f:
+            f.seek(self._offset)
+            text = f.read()
+
+        # Only process complete lines.
+        end = text.rfind(b"\n")
+        if end < 0:
+            return 0
+        self._offset += end + 1
+
+        # Terms to search for in the record lines.
+        start_w = "#Generating lambda is"
+        start_a = "#Alchemical array is"
+
+        lines = []
+        for line in text[: end + 1].decode().splitlines():
+            if line.startswith(start_w):
+                self._lambda_win = float(line.replace(start_w, "").strip())
+            elif line.startswith(start_a):
+                self._lambda_array = [
+                    float(lam)
+                    for lam in line.replace(start_a, "")
+                    .strip()
+                    .replace("(", "")
+                    .replace(")", "")
+                    .replace(" ", "")
+                    .split(",")
+                ]
+            elif not line.startswith("#") and line.strip():
+                lines.append(line)
+
+        if len(lines) == 0:
+            return 0
+
+        if self._lambda_win is None or self._lambda_array is None:
+            raise ValueError(
+                f"The lambda values were not detected in the SOMD output file: {self._file}"
+            )
+
+        self._records.append(_np.loadtxt(lines, ndmin=2))
+        self._num_samples += len(lines)
+
+        return len(lines)
+
+    def data(self):
+        """
+        Return the data read so far in alchemlyb format.
+
+        Returns
+        -------
+
+        data : pandas.DataFrame
+            The reduced potentials for MBAR, or gradients for TI, or None
+            if no data has been read.
+        """
+
+        if self._num_samples == 0:
+            return None
+
+        # Merge the records read so far.
+        if len(self._records) > 1:
+            self._records = [_np.vstack(self._records)]
+        records = self._records[0]
+
+        # Use the step number as the time index.
+        index = _pd.MultiIndex.from_arrays(
+            [records[:, 0], _np.repeat(self._lambda_win, len(records))],
+            names=["time", "fep-lambda"],
+        )
+
+        if self._is_mbar:
+            column = 5 + self._lambda_array.index(self._lambda_win)
+            df = _pd.DataFrame(
+                records[:, 5:] - records[:, [column]],
+                columns=_np.array(self._lambda_array, dtype=_np.float64),
+                index=index,
+            )
+        else:
+            df = _pd.DataFrame(records[:, 2], columns=["fep"], index=index)
+
+        df.attrs["temperature"] = self._T
+        df.attrs["energy_unit"] = "kT"
+
+        return df
+
+
+class _AlchemlybWindowReader:
+    """
+    A reader for the output of a single lambda window that is parsed by
+    alchemlyb. The file is re-parsed only when it has changed.
+    """
+
+    def __init__(self, file, T, engine, estimator):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+
+        file : pathlib.Path
+            The path to the output file.
+
+        T : float
+            The temperature in Kelvin.
+
+        engine : str
+            The engine used to generate the output file.
+
+        estimator : str
+            The estimator that the data will be used with.
+        """
+        self._file = file
+        self._T = T
+        if engine == "GROMACS":
+            self._func = _gmx_extract_u_nk if estimator == "MBAR" else _gmx_extract_dHdl
+        else:
+            self._func = (
+                _amber_extract_u_nk if estimator == "MBAR" else _amber_extract_dHdl
+            )
+        self._stat = None
+        self._data = None
+
+    def nSamples(self):
+        """Return the number of samples read."""
+        return 0 if self._data is None else len(self._data)
+
+    def read(self):
+        """
+        Re-parse the file if it has changed since the last call.
+
+        Returns
+        -------
+
+        num_samples : int
+            The number of new samples.
+        """
+
+        if not self._file.is_file():
+            return 0
+
+        stat = self._file.stat()
+        stat = (stat.st_size, stat.st_mtime_ns)
+        if stat == self._stat:
+            return 0
+
+        # The file may be part way through being written, in which case
+        # keep the existing data and try again on the next call.
+        try:
+            data = self._func(self._file, T=self._T)
+        except Exception:
+            return 0
+
+        num_samples = len(data) - self.nSamples()
+        self._stat = stat
+        self._data = data
+
+        return max(num_samples, 0)
+
+    def data(self):
+        """
+        Return the data read so far in alchemlyb format.
+
+        Returns
+        -------
+
+        data : pandas.DataFrame
+            The reduced potentials for MBAR, or gradients for TI, or None
+            if no data has been read.
+        """
+        return self._data
+
+
 def getData(name="data", file_link=False, work_dir=None):
     """
     Return a link to a zip file containing the data files required for
@@ -2238,3 +2930,274 @@ def getData(name="data", file_link=False, work_dir=None):
         A path, or file link, to an archive of the process input.
     """
     return Relative.getData(name=name, file_link=file_link, work_dir=work_dir)
+
+
+def _analyse_worker(work_dir, estimator, method, kwargs):
+    """
+    Internal helper function to analyse a single working directory in a
+    worker process. Units are stripped from the results so that they can
+    be returned to the parent process.
+
+    Parameters
+    ----------
+
+    work_dir : str
+        The working directory for the simulation.
+
+    estimator : str
+        The estimator to use for the free-energy analysis.
+
+    method : str
+        The method to use for the free-energy analysis.
+
+    kwargs : dict
+        Additional keyword arguments for the analysis.
+
+    Returns
+    -------
+
+    pmf : [(float, float, float)]
+        The potential of mean force in kcal/mol, or None if the analysis
+        failed.
+
+    overlap : numpy.ndarray
+        The overlap matrix, or None.
+
+    failure : str
+        A message describing why the analysis failed, or None.
+    """
+    try:
+        pmf, overlap = Relative.analyse(
+            work_dir, estimator=estimator, method=method, **kwargs
+        )
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+    pmf = [
+        (lam, nrg.kcal_per_mol().value(), err.kcal_per_mol().value())
+        for lam, nrg, err in pmf
+    ]
+    if overlap is not None:
+        overlap = _np.asarray(overlap)
+
+    return pmf, overlap, None
+
+
+def _extract_cached(func, file, T, engine, estimator):
+    """
+    Internal helper function to extract the data from a free-energy output
+    file, re-using the data from a cache file if the output file hasn't
+    changed since it was last parsed. The cache is a compressed NumPy archive
+    stored alongside the output file.
+
+    Parameters
+    ----------
+
+    func : callable
+        The function used to extract the data.
+
+    file : pathlib.Path
+        The path to the output file.
+
+    T : float
+        The temperature of the lambda window in Kelvin.
+
+    engine : str
+        The engine used to generate the output file.
+
+    estimator : str
+        The estimator that the data will be used with.
+
+    Returns
+    -------
+
+    data : pandas.DataFrame
+        The extracted data.
+    """
+
+    # The cache is only valid for an output file of the same size and
+    # modification time, extracted with the same settings.
+    stat = _os.stat(file)
+    key = _json.dumps(
+        [_analysis_cache_version, engine, estimator, T, stat.st_size, stat.st_mtime_ns]
+    )
+    cache_file = file.parent / f"{file.name}.{estimator.lower()}.npz"
+
+    data = _load_cached_data(cache_file, key)
+    if data is None:
+        data = func(file, T=T)
+        _save_cached_data(cache_file, key, data)
+
+    return data
+
+
+def _load_cached_data(cache_file, key):
+    """
+    Internal helper function to load extracted free-energy data from a
+    cache file.
+
+    Parameters
+    ----------
+
+    cache_file : pathlib.Path
+        The path to the cache file.
+
+    key : str
+        The key identifying the output file and extraction settings.
+
+    Returns
+    -------
+
+    data : pandas.DataFrame
+        The cached data, or None if there is no valid cache.
+    """
+    if not cache_file.is_file():
+        return None
+
+    try:
+        with _np.load(cache_file, allow_pickle=False) as archive:
+            metadata = _json.loads(str(archive["metadata"]))
+            if metadata["key"] != key:
+                return None
+
+            levels = [
+                archive["index_%d" % x] for x in range(len(metadata["index_names"]))
+            ]
+            if len(levels) > 1:
+                index = _pd.MultiIndex.from_arrays(
+                    levels, names=metadata["index_names"]
+                )
+            else:
+                index = _pd.Index(levels[0], name=metadata["index_names"][0])
+
+            # JSON stores tuples as lists.
+            columns = _pd.Index(
+                [tuple(x) if isinstance(x, list) else x for x in metadata["columns"]]
+            )
+            columns.names = metadata["column_names"]
+
+            data = _pd.DataFrame(archive["values"], index=index, columns=columns)
+            data.attrs = metadata["attrs"]
+
+    except Exception:
+        return None
+
+    return data
+
+
+def _save_cached_data(cache_file, key, data):
+    """
+    Internal helper function to save extracted free-energy data to a cache
+    file. Data that can't be cached is ignored, as are errors writing the
+    file, e.g. when the output directory is read-only.
+
+    Parameters
+    ----------
+
+    cache_file : pathlib.Path
+        The path to the cache file.
+
+    key : str
+        The key identifying the output file and extraction settings.
+
+    data : pandas.DataFrame
+        The extracted data.
+    """
+    import tempfile as _tempfile
+
+    if not all(_np.issubdtype(dtype, _np.floating) for dtype in data.dtypes):
+        return
+
+    try:
+        arrays = {"values": data.to_numpy()}
+        for x in range(data.index.nlevels):
+            arrays["index_%d" % x] = _np.asarray(data.index.get_level_values(x))
+        if any(array.dtype == object for array in arrays.values()):
+            return
+
+        metadata = {
+            "key": key,
+            "index_names": list(data.index.names),
+            "columns": list(data.columns),
+            "column_names": list(data.columns.names),
+            "attrs": data.attrs,
+        }
+        arrays["metadata"] = _np.array(_json.dumps(metadata))
+
+        # Write to a temporary file, then move it into place so that
+        # concurrent readers never see a partially written cache.
+        fd, tmp_file = _tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+        try:
+            with _os.fdopen(fd, "wb") as f:
+                _np.savez_compressed(f, **arrays)
+            _os.replace(tmp_file, cache_file)
+        except:
+            _os.remove(tmp_file)
+            raise
+
+    except Exception:
+        pass
+
+
+def _run_grompp_jobs(jobs, exe, kwargs, max_workers=None):
+    """
+    Internal helper function to generate GROMACS binary run input files
+    for multiple lambda windows concurrently.
+
+    Parameters
+    ----------
+
+    jobs : [(str, str, str, str, str)]
+        The MDP, GRO, TOP, reference GRO, and TPR files for each window.
+
+    exe : str
+        The path to the GROMACS executable.
+
+    kwargs : dict
+        Additional keyword arguments to pass to grompp.
+
+    max_workers : int
+        The maximum number of concurrent grompp processes. If None, then
+        the number of CPUs is used.
+    """
+    if max_workers is None:
+        max_workers = _os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(jobs)))
+
+    with _futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _Process.Gromacs._generate_binary_run_file, *job, exe, **kwargs
+            )
+            for job in jobs
+        ]
+
+        # Wait for all jobs, re-raising the first error.
+        for future in futures:
+            future.result()
+
+
+def _link_file(source, destination):
+    """
+    Internal helper function to link a file into a lambda window directory.
+    A hard link is used where possible, falling back to a relative symbolic
+    link, and finally to a copy of the file.
+
+    Parameters
+    ----------
+
+    source : str
+        The path to the source file.
+
+    destination : str
+        The path to the destination file.
+    """
+    try:
+        _os.link(source, destination)
+    except OSError:
+        try:
+            _os.symlink(
+                _os.path.relpath(source, _os.path.dirname(destination)), destination
+            )
+        except OSError:
+            _shutil.copyfile(source, destination)
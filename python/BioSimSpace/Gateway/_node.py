@@ -30,7 +30,6 @@ from .._Utils import _try_import
 
 import configargparse as _argparse
 import collections as _collections
-import __main__
 import os as _os
 import shutil as _shutil
 import sys as _sys
@@ -282,6 +281,11 @@ class Node:
     # Whether the node is run from a Jupyter notebook.
     _is_notebook = _is_notebook
 
+    # The directory in which to write the output YAML file. This allows
+    # BioSimSpace.Node.run to give each node a private directory, so that
+    # concurrent nodes don't overwrite each other's output.
+    _output_dir = _os.environ.get("BSS_NODE_OUTPUT_DIR")
+
     def __init__(self, description, name=None):
         """
         Constructor.
@@ -302,7 +306,9 @@ class Node:
         # Set the node name.
         if name is None:
             try:
-                self._name = _os.path.basename(__main__.__file__)
+                # Look up the main module at run time, since nodes run in a
+                # worker process are executed with 'runpy'.
+                self._name = _os.path.basename(_sys.modules["__main__"].__file__)
             except:
                 self._name = None
         else:
@@ -1378,6 +1384,8 @@ class Node:
 
             # Create the YAML file name.
             yamlname = "%s.yaml" % file_prefix
+            if self._output_dir is not None:
+                yamlname = _os.path.join(self._output_dir, yamlname)
 
             # Populate the dictionary.
             for name, output in self._outputs.items():
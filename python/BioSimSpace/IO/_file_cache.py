@@ -27,10 +27,26 @@ __email__ = "lester.hedges@gmail.com"
 __all__ = ["clearCache", "disableCache", "enableCache"]
 
 import collections as _collections
+import contextlib as _contextlib
+import glob as _glob
 import hashlib as _hashlib
 import os as _os
 import shutil as _shutil
 import sys as _sys
+import tempfile as _tempfile
+import warnings as _warnings
+
+try:
+    import fcntl as _fcntl
+except ImportError:
+    # File locking isn't available on Windows. Entries are still written
+    # atomically, so only concurrent eviction is unprotected.
+    _fcntl = None
+
+try:
+    from sire import __version__ as _sire_version
+except ImportError:
+    _sire_version = None
 
 from .._SireWrappers import System as _System
 
@@ -83,13 +99,50 @@ _cache = _FixedSizeOrderedDict()
 # Whether to use the cache.
 _use_cache = True
 
+# The persistent cache directory. When set, files are also stored on disk using
+# a content hash of the system as the key, so that they can be shared between
+# processes. This can be set using the BSS_FILE_CACHE environment variable, so
+# that it is inherited by worker processes.
+_cache_dir = _os.environ.get("BSS_FILE_CACHE")
+if _cache_dir is not None:
+    _cache_dir = _os.path.abspath(_cache_dir)
+
+# The maximum size of the persistent cache in GB. This can be set using the
+# BSS_FILE_CACHE_SIZE environment variable.
+_cache_max_size = 10.0
+try:
+    _cache_max_size = float(_os.environ.get("BSS_FILE_CACHE_SIZE", _cache_max_size))
+    if not _cache_max_size >= 0:
+        raise ValueError
+except ValueError:
+    _warnings.warn(
+        "Invalid value for 'BSS_FILE_CACHE_SIZE' environment variable: "
+        f"'{_os.environ['BSS_FILE_CACHE_SIZE']}'. Using the default of 10 GB."
+    )
+    _cache_max_size = 10.0
+
+# A dictionary mapping molecule numbers and versions to content hashes, so
+# that unchanged molecules don't need to be re-hashed.
+_molecule_hashes = {}
+_max_molecule_hashes = 1000000
+
 
 def clearCache():
     """
-    Clear the file cache.
+    Clear the file cache. This also removes all files from the persistent
+    cache directory, if one is set.
     """
     global _cache
     _cache = _FixedSizeOrderedDict()
+    _molecule_hashes.clear()
+
+    if _cache_dir is not None and _os.path.isdir(_cache_dir):
+        with _lock_cache(exclusive=True):
+            for path in _cache_entries():
+                try:
+                    _os.remove(path)
+                except OSError:
+                    pass
 
 
 def disableCache():
@@ -100,13 +153,45 @@ def disableCache():
     _use_cache = False
 
 
-def enableCache():
+def enableCache(directory=None, max_size=None):
     """
     Enable the file cache.
+
+    Parameters
+    ----------
+
+    directory : str
+        The path to a directory used for a persistent file cache. Files in
+        this cache are keyed on a hash of the content of the system, so can
+        be re-used between different processes, or sessions. The directory
+        can also be set using the BSS_FILE_CACHE environment variable.
+
+    max_size : float
+        The maximum size of the persistent file cache in GB. The least
+        recently used files are removed when this is exceeded.
     """
-    global _use_cache
+
+    if directory is not None:
+        if not isinstance(directory, str):
+            raise TypeError("'directory' must be of type 'str'.")
+
+    if max_size is not None:
+        if not isinstance(max_size, (int, float)):
+            raise TypeError("'max_size' must be of type 'float'.")
+        if max_size <= 0:
+            raise ValueError("'max_size' must be greater than zero.")
+
+    global _use_cache, _cache_dir, _cache_max_size
     _use_cache = True
 
+    if directory is not None:
+        directory = _os.path.abspath(directory)
+        _os.makedirs(directory, exist_ok=True)
+        _cache_dir = directory
+
+    if max_size is not None:
+        _cache_max_size = float(max_size)
+
 
 def _cache_active():
     """
@@ -204,17 +289,30 @@ def _check_cache(
         str(skip_water),
     )
 
-    # Get the existing file path and MD5 hash from the cache.
+    # Get the existing file path, MD5 hash, system fingerprint, and file
+    # stats from the cache.
     try:
-        (prev_system, path, original_hash) = _cache[key]
+        (prev_system, path, original_hash, fingerprint, file_stat) = _cache[key]
     except:
-        return False
+        return _check_persistent_cache(
+            system,
+            format,
+            filebase,
+            key,
+            match_water=match_water,
+            property_map=property_map,
+            excluded_properties=excluded_properties,
+        )
 
     # Whether the cache entry is still valid.
     cache_valid = True
 
-    # Is this system the same as the previous?
-    if not system.isSame(
+    # Is this system the same as the previous? If no properties are excluded,
+    # then we can simply compare the fingerprints of the systems.
+    if len(excluded_properties) == 0:
+        if system._getFingerprint() != fingerprint:
+            cache_valid = False
+    elif not system.isSame(
         prev_system,
         excluded_properties=excluded_properties,
         property_map0=property_map,
@@ -224,19 +322,40 @@ def _check_cache(
         cache_valid = False
 
     # Make sure the file still exists.
-    if not _os.path.exists(path):
-        cache_valid = False
-    # Make sure the MD5 sum is still the same.
-    else:
-        current_hash = _get_md5_hash(path)
-        if current_hash != original_hash:
+    if cache_valid:
+        current_stat = _get_file_stat(path)
+        if current_stat is None:
             cache_valid = False
-
-    # If the cache isn't valid, delete the entry and return False.
+        # Make sure the MD5 sum is still the same. This only needs to be
+        # recomputed if the file has been modified.
+        elif current_stat != file_stat:
+            current_hash = _get_md5_hash(path)
+            if current_hash != original_hash:
+                cache_valid = False
+            else:
+                del _cache[key]
+                _cache[key] = (
+                    prev_system,
+                    path,
+                    original_hash,
+                    fingerprint,
+                    current_stat,
+                )
+
+    # If the cache isn't valid, delete the entry and check the persistent
+    # cache instead.
     if not cache_valid:
         if key in _cache:
             del _cache[key]
-        return False
+        return _check_persistent_cache(
+            system,
+            format,
+            filebase,
+            key,
+            match_water=match_water,
+            property_map=property_map,
+            excluded_properties=excluded_properties,
+        )
 
     # Copy the old file to the new location.
     else:
@@ -265,6 +384,7 @@ def _update_cache(
     excluded_properties=[],
     match_water=True,
     skip_water=True,
+    property_map={},
     **kwargs,
 ):
     """
@@ -293,6 +413,11 @@ def _update_cache(
 
     skip_water : bool
         Whether to skip water molecules when comparing systems.
+
+    property_map : dict
+        A dictionary that maps system "properties" to their user
+        defined values. This allows the user to refer to properties
+        with their own naming scheme, e.g. { "charge" : "my-charge" }
     """
 
     # Validate input.
@@ -340,7 +465,27 @@ def _update_cache(
     )
 
     # Update the cache.
-    _cache[key] = (system.copy(), path, hash)
+    _cache[key] = (
+        system.copy(),
+        path,
+        hash,
+        system._getFingerprint(),
+        _get_file_stat(path),
+    )
+
+    # Store the file in the persistent cache.
+    if _cache_dir is not None:
+        if not isinstance(property_map, dict):
+            raise TypeError("'property_map' must be of type 'dict'.")
+
+        content_hash = _get_content_hash(
+            system,
+            format,
+            match_water=match_water,
+            property_map=property_map,
+            excluded_properties=excluded_properties,
+        )
+        _store_persistent(content_hash, path)
 
 
 def _get_md5_hash(path):
@@ -362,8 +507,409 @@ def _get_md5_hash(path):
     return hash.hexdigest()
 
 
+def _get_file_stat(path):
+    """
+    Internal helper function to return the modification time and size of a
+    file, used to check whether the file has changed.
+
+    Returns
+    -------
+
+    stat : (int, int)
+        The modification time in nanoseconds and the size in bytes, or None
+        if the file doesn't exist.
+    """
+    try:
+        stat = _os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 def _compress_molnum_key(str):
     """
     Internal helper function to compress the MolNum list section of the key.
     """
     return str.replace("MolNum(", "").replace(")", "")
+
+
+def _check_persistent_cache(
+    system,
+    format,
+    filebase,
+    key,
+    match_water=True,
+    property_map={},
+    excluded_properties=[],
+):
+    """
+    Internal helper function to check whether a file for a system with the
+    same content exists in the persistent cache. If so, the file is copied
+    to the new location and an entry is added to the in-memory cache.
+
+    Parameters
+    ----------
+
+    system : :class:`System <BioSimSpace._SireWrappers.System>`
+        The system.
+
+    format : str
+        The molecular file format.
+
+    filebase : str
+        The file base to copy the file to.
+
+    key : tuple
+        The key for the in-memory cache.
+
+    match_water : bool
+        Whether water molecules are matched to the file format convention.
+
+    property_map : dict
+        A dictionary that maps system "properties" to their user
+        defined values.
+
+    excluded_properties : [str]
+        A list of properties to exclude when hashing the system.
+
+    Returns
+    -------
+
+    extension : str
+        The extension for cached file. False if no file was found.
+    """
+
+    if _cache_dir is None:
+        return False
+
+    content_hash = _get_content_hash(
+        system,
+        format,
+        match_water=match_water,
+        property_map=property_map,
+        excluded_properties=excluded_properties,
+    )
+
+    with _lock_cache(exclusive=False):
+        paths = _glob.glob(
+            _os.path.join(_cache_dir, content_hash[:2], content_hash + ".*")
+        )
+        if len(paths) == 0:
+            return False
+        path = paths[0]
+
+        # Get the file extension.
+        ext = _os.path.splitext(path)[1]
+
+        # Copy the file to the new location.
+        new_path = filebase + ext
+        try:
+            _shutil.copyfile(path, new_path)
+        except _shutil.SameFileError:
+            pass
+        except:
+            return False
+
+        # Mark the entry as recently used.
+        try:
+            _os.utime(path)
+        except OSError:
+            pass
+
+    # Add the new file to the in-memory cache.
+    _cache[key] = (
+        system.copy(),
+        new_path,
+        _get_md5_hash(new_path),
+        system._getFingerprint(),
+        _get_file_stat(new_path),
+    )
+
+    return ext
+
+
+def _store_persistent(content_hash, path):
+    """
+    Internal helper function to store a file in the persistent cache, then
+    evict the least recently used entries if the cache is too large.
+
+    Parameters
+    ----------
+
+    content_hash : str
+        The content hash for the file.
+
+    path : str
+        The path to the file.
+    """
+
+    # Store entries in sub-directories to keep directory listings small.
+    directory = _os.path.join(_cache_dir, content_hash[:2])
+    _os.makedirs(directory, exist_ok=True)
+
+    ext = _os.path.splitext(path)[1]
+    entry = _os.path.join(directory, content_hash + ext)
+
+    # Copy to a temporary file then rename, so that readers never see a
+    # partially written file.
+    fd, tmp_path = _tempfile.mkstemp(dir=directory, prefix=".tmp")
+    _os.close(fd)
+    try:
+        _shutil.copyfile(path, tmp_path)
+        _os.replace(tmp_path, entry)
+    except:
+        if _os.path.exists(tmp_path):
+            _os.remove(tmp_path)
+        raise
+
+    # Evict the least recently used entries.
+    with _lock_cache(exclusive=True):
+        entries = []
+        total_size = 0
+        for path in _cache_entries():
+            try:
+                stat = _os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        max_size = _cache_max_size * 1e9
+        if total_size > max_size:
+            entries.sort()
+            for _, size, path in entries:
+                if total_size <= max_size or path == entry:
+                    break
+                try:
+                    _os.remove(path)
+                    total_size -= size
+                except OSError:
+                    pass
+
+
+def _cache_entries():
+    """
+    Internal helper function to return the paths of all files in the
+    persistent cache.
+
+    Returns
+    -------
+
+    paths : [str]
+        The paths of the cached files.
+    """
+    return _glob.glob(_os.path.join(_cache_dir, "*", "*"))
+
+
+@_contextlib.contextmanager
+def _lock_cache(exclusive=True):
+    """
+    Internal context manager to lock the persistent cache directory.
+
+    Parameters
+    ----------
+
+    exclusive : bool
+        Whether to acquire an exclusive lock. Otherwise a shared lock is used.
+    """
+
+    _os.makedirs(_cache_dir, exist_ok=True)
+
+    if _fcntl is None:
+        yield
+        return
+
+    with open(_os.path.join(_cache_dir, ".lock"), "a") as f:
+        _fcntl.flock(f, _fcntl.LOCK_EX if exclusive else _fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            _fcntl.flock(f, _fcntl.LOCK_UN)
+
+
+def _get_content_hash(
+    system, format, match_water=True, property_map={}, excluded_properties=[]
+):
+    """
+    Internal helper function to compute a hash of the content of a system,
+    i.e. its topology and coordinates, along with the options used when
+    writing it to file. Unlike the system UID, this is the same for identical
+    systems in different processes.
+
+    Parameters
+    ----------
+
+    system : :class:`System <BioSimSpace._SireWrappers.System>`
+        The system.
+
+    format : str
+        The molecular file format.
+
+    match_water : bool
+        Whether water molecules are matched to the file format convention.
+
+    property_map : dict
+        A dictionary that maps system "properties" to their user
+        defined values.
+
+    excluded_properties : [str]
+        A list of properties to exclude from the hash.
+
+    Returns
+    -------
+
+    hash : str
+        The SHA-256 hex digest.
+    """
+
+    # Properties used for internal metadata, which don't affect the output.
+    excluded = set(excluded_properties)
+    excluded.update(["fileformat", "is_perturbable", "was_perturbable"])
+    excluded = frozenset(property_map.get(x, x) for x in excluded)
+
+    hash = _hashlib.sha256()
+    hash.update(
+        repr(
+            (
+                _sire_version,
+                format.upper(),
+                match_water,
+                sorted((k, str(v)) for k, v in property_map.items()),
+            )
+        ).encode()
+    )
+
+    # Hash the system properties, e.g. the space.
+    sire_system = system._sire_object
+    for prop in sorted(sire_system.propertyKeys()):
+        if prop not in excluded:
+            hash.update(prop.encode())
+            hash.update(_property_hash(sire_system.property(prop)).encode())
+
+    # Hash each molecule, re-using the hash for molecules that haven't changed.
+    if len(_molecule_hashes) > _max_molecule_hashes:
+        _molecule_hashes.clear()
+    for mol in system.getMolecules():
+        mol = mol._sire_object
+        try:
+            key = (mol.number().value(), mol.version(), excluded)
+        except:
+            key = None
+
+        mol_hash = _molecule_hashes.get(key) if key is not None else None
+        if mol_hash is None:
+            mol_hash = _molecule_hash(mol, excluded)
+            if key is not None:
+                _molecule_hashes[key] = mol_hash
+
+        hash.update(mol_hash.encode())
+
+    return hash.hexdigest()
+
+
+def _molecule_hash(molecule, excluded_properties):
+    """
+    Internal helper function to hash the content of a Sire molecule.
+
+    Parameters
+    ----------
+
+    molecule : Sire.Mol.Molecule
+        The molecule.
+
+    excluded_properties : frozenset
+        The properties to exclude.
+
+    Returns
+    -------
+
+    hash : str
+        The SHA-256 hex digest.
+    """
+
+    hash = _hashlib.sha256()
+
+    # Hash the names and numbers of the molecular constituents.
+    for views in [
+        molecule.atoms(),
+        molecule.residues(),
+        molecule.chains(),
+        molecule.segments(),
+    ]:
+        for attr in ["name", "number"]:
+            try:
+                values = [str(getattr(x, attr)().value()) for x in views]
+            except:
+                continue
+            hash.update(",".join(values).encode())
+        hash.update(b";")
+
+    # Hash the properties.
+    for prop in sorted(molecule.propertyKeys()):
+        if prop not in excluded_properties:
+            hash.update(prop.encode())
+            hash.update(_property_hash(molecule.property(prop)).encode())
+
+    return hash.hexdigest()
+
+
+def _property_hash(property):
+    """
+    Internal helper function to hash the value of a Sire property.
+
+    Parameters
+    ----------
+
+    property : Sire.Base.Property
+        The property.
+
+    Returns
+    -------
+
+    hash : str
+        The SHA-256 hex digest.
+    """
+
+    hash = _hashlib.sha256(property.what().encode())
+
+    # Per-atom properties.
+    try:
+        values = property.toVector()
+    except:
+        values = None
+
+    if values is not None:
+        for value in values:
+            # Vectors, e.g. coordinates and velocities. Use the full precision
+            # of the components.
+            if hasattr(value, "x"):
+                value = (value.x(), value.y(), value.z())
+                value = tuple(x.value() if hasattr(x, "value") else x for x in value)
+            # Physical quantities, e.g. charges and masses.
+            elif hasattr(value, "value") and callable(value.value):
+                value = value.value()
+            if isinstance(value, (tuple, float, int)):
+                hash.update(repr(value).encode())
+            else:
+                hash.update(str(value).encode())
+        return hash.hexdigest()
+
+    # Bonded terms.
+    try:
+        potentials = property.potentials()
+    except:
+        potentials = None
+
+    if potentials is not None:
+        for potential in potentials:
+            hash.update(str(potential).encode())
+        return hash.hexdigest()
+
+    # Anything else.
+    try:
+        hash.update(property.toString().encode())
+    except:
+        hash.update(str(property).encode())
+
+    return hash.hexdigest()
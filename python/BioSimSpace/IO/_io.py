@@ -58,7 +58,6 @@ from sire.legacy import Mol as _SireMol
 from sire.legacy import System as _SireSystem
 
 from .. import _amber_home
-from .. import _gmx_path
 from .. import _isVerbose
 from .._Exceptions import MissingSoftwareError as _MissingSoftwareError
 from .._SireWrappers import Molecule as _Molecule
@@ -423,6 +422,8 @@ def readMolecules(
     >>> system = BSS.IO.readMolecules(["mol.gro87", "mol.grotop"], property_map={"GROMACS_PATH" : "/path/to/gromacs/topology"})
     """
 
+    from .. import _gmx_path
+
     global _has_gmx_warned
     if _gmx_path is None and not _has_gmx_warned:
         _warnings.warn(
@@ -653,6 +654,8 @@ def saveMolecules(
     >>> BSS.IO.saveMolecules("test", system, ["gro87", "grotop"], property_map={"charge" : "my-charge"})
     """
 
+    from .. import _gmx_path
+
     global _has_gmx_warned
     if _gmx_path is None and not _has_gmx_warned:
         _warnings.warn(
@@ -847,7 +850,12 @@ def saveMolecules(
             # If this is a new file, then add it to the cache.
             if _cache_active():
                 _update_cache(
-                    system, format, file[0], match_water=match_water, **kwargs
+                    system,
+                    format,
+                    file[0],
+                    match_water=match_water,
+                    property_map=property_map,
+                    **kwargs,
                 )
 
         except Exception as e:
@@ -30,7 +30,7 @@ import os as _os
 
 from sire.legacy import Base as _SireBase
 
-from .. import _amber_home, _gmx_exe
+from .. import _amber_home
 from .._Exceptions import IncompatibleError as _IncompatibleError
 from .._Exceptions import MissingSoftwareError as _MissingSoftwareError
 from .._SireWrappers import System as _System
@@ -124,6 +124,8 @@ def _find_md_engines(system, protocol, engine="AUTO", gpu_support=False):
        Lists containing the supported MD engines and executables.
     """
 
+    from .. import _gmx_exe
+
     # The input has already been validated in the run method, so no need
     # to re-validate here.
 
@@ -32,6 +32,9 @@ Functions
     list
     run
     setNodeDirectory
+    startPool
+    stopPool
+    submit
 
 Examples
 ========
@@ -64,6 +67,22 @@ Run the minimisation node.
    # Run the node and get the output as a dictionary.
    output = BSS.Node.run("minimisation", input)
 
+Run several nodes concurrently in a pool of worker processes, which avoids
+the cost of starting a new Python interpreter for each node.
+
+.. code-block:: python
+
+   import BioSimSpace as BSS
+
+   # Start a pool of four worker processes.
+   BSS.Node.startPool(4)
+
+   # Submit the nodes.
+   futures = [BSS.Node.submit("minimisation", input) for input in inputs]
+
+   # Get the output of each node.
+   outputs = [future.result() for future in futures]
+
 Set a custom directory for the node library.
 
 .. code-block:: python
@@ -25,9 +25,13 @@ from .._Utils import _try_import
 
 from .. import _Utils
 
+import concurrent.futures as _futures
 import os as _os
 import shlex as _shlex
 import subprocess as _subprocess
+import sys as _sys
+import tempfile as _tempfile
+import threading as _threading
 
 _yaml = _try_import("yaml")
 
@@ -36,7 +40,13 @@ from sire.legacy import Base as _SireBase
 # Set the default node directory.
 _node_dir = _os.path.dirname(__file__) + "/_nodes"
 
-__all__ = ["list", "help", "run", "setNodeDirectory"]
+# The pool of worker processes used to run nodes, the number of workers it
+# was started with, and a lock to protect it.
+_pool = None
+_pool_max_workers = None
+_pool_lock = _threading.Lock()
+
+__all__ = ["list", "help", "run", "submit", "setNodeDirectory", "startPool", "stopPool"]
 
 
 def list():
@@ -65,18 +75,7 @@ def help(name):
     if not isinstance(name, str):
         raise TypeError("'name' must be of type 'str'.")
 
-    # Apped the node directory name.
-    full_name = _node_dir + "/" + name
-
-    # Make sure the node exists.
-    if not _os.path.isfile(full_name):
-        if not _os.path.isfile(full_name + ".py"):
-            raise ValueError(
-                "Cannot find node: '%s'. " % name
-                + "Run 'Node.list()' to see available nodes!"
-            )
-        else:
-            full_name += ".py"
+    full_name = _get_node_path(name)
 
     # Create the command.
     command = "%s/python %s --help" % (_SireBase.getBinDir(), full_name)
@@ -90,7 +89,7 @@ def help(name):
     print(proc.stdout)
 
 
-def run(name, args={}):
+def run(name, args={}, use_pool=False):
     """
     Run a node.
 
@@ -103,6 +102,11 @@ def run(name, args={}):
     args : dict
         A dictionary of arguments to be passed to the node.
 
+    use_pool : bool
+        Whether to run the node in a pool of worker processes that have
+        already imported BioSimSpace, rather than starting a new Python
+        interpreter. The pool is started on first use. (See 'startPool'.)
+
     Returns
     -------
 
@@ -115,6 +119,191 @@ def run(name, args={}):
     if not isinstance(args, dict):
         raise TypeError("'args' must be of type 'dict'.")
 
+    if not isinstance(use_pool, bool):
+        raise TypeError("'use_pool' must be of type 'bool'.")
+
+    if use_pool:
+        return submit(name, args).result()
+
+    full_name = _get_node_path(name)
+
+    # Use a private directory for the input and output YAML files, so that
+    # nodes can be run concurrently from the same directory.
+    with _tempfile.TemporaryDirectory() as tmp_dir:
+        # Write a YAML configuration file for the BioSimSpace node.
+        if len(args) > 0:
+            config = _os.path.join(tmp_dir, "input.yaml")
+            with open(config, "w") as file:
+                _yaml.dump(args, file, default_flow_style=False)
+
+            # Create the command.
+            command = "%s/python %s --config %s" % (
+                _SireBase.getBinDir(),
+                full_name,
+                _shlex.quote(config),
+            )
+
+        # No arguments.
+        else:
+            command = "%s/python %s" % (_SireBase.getBinDir(), full_name)
+
+        # Tell the node where to write its output.
+        env = _os.environ.copy()
+        env["BSS_NODE_OUTPUT_DIR"] = tmp_dir
+
+        # Run the node as a subprocess.
+        proc = _subprocess.run(
+            _Utils.command_split(command),
+            shell=False,
+            text=True,
+            stderr=_subprocess.PIPE,
+            env=env,
+        )
+
+        if proc.returncode == 0:
+            # Read the output YAML file into a dictionary.
+            with open(_os.path.join(tmp_dir, "output.yaml"), "r") as file:
+                return _yaml.safe_load(file)
+
+        else:
+            # Print the standard error, decoded as UTF-8.
+            print(proc.stderr)
+
+
+def submit(name, args={}):
+    """
+    Submit a node to be run in the pool of worker processes. Each worker
+    runs one node at a time, from the current working directory, with its
+    input and output passed via a private directory, so any number of
+    nodes can be submitted concurrently. The pool is started on first
+    use, and is re-started if a worker dies, e.g. if a node crashes or
+    is killed. (See 'startPool'.)
+
+    Workers are re-used, so the verbosity, node directory, and environment
+    variables are reset after each node is run. Any other module level
+    state that a node modifies, e.g. imported modules or random number
+    generator seeds, persists between the nodes run by a worker.
+
+    Parameters
+    ----------
+
+    name : str
+        The name of the node.
+
+    args : dict
+        A dictionary of arguments to be passed to the node.
+
+    Returns
+    -------
+
+    future : concurrent.futures.Future
+        A future that resolves to a dictionary containing the output of
+        the node, or None if the node failed.
+    """
+
+    # Validate the input.
+
+    if not isinstance(args, dict):
+        raise TypeError("'args' must be of type 'dict'.")
+
+    full_name = _get_node_path(name)
+
+    with _pool_lock:
+        if _pool is None:
+            _start_pool()
+        try:
+            worker_future = _pool.submit(_run_worker, full_name, args, _os.getcwd())
+        except _futures.BrokenExecutor:
+            # A worker died, so the pool can no longer be used. Replace it.
+            _stop_pool()
+            _start_pool(_pool_max_workers)
+            worker_future = _pool.submit(_run_worker, full_name, args, _os.getcwd())
+
+    # Unpack the result of the worker, printing any errors.
+    future = _futures.Future()
+
+    def _done(worker_future):
+        try:
+            output, error = worker_future.result()
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        if error is not None:
+            print(error)
+        future.set_result(output)
+
+    worker_future.add_done_callback(_done)
+
+    return future
+
+
+def startPool(max_workers=None):
+    """
+    Start a pool of worker processes for running nodes. BioSimSpace is
+    imported once in each worker, rather than every time a node is run.
+    Any existing pool is stopped.
+
+    Parameters
+    ----------
+
+    max_workers : int
+        The number of worker processes. If None, then the number of
+        processors on the machine is used.
+    """
+
+    if max_workers is not None:
+        if not type(max_workers) is int:
+            raise TypeError("'max_workers' must be of type 'int'.")
+        if max_workers < 1:
+            raise ValueError("'max_workers' must be greater than zero.")
+
+    with _pool_lock:
+        _stop_pool()
+        _start_pool(max_workers)
+
+
+def stopPool():
+    """Stop the pool of worker processes used for running nodes."""
+
+    with _pool_lock:
+        _stop_pool()
+
+
+def setNodeDirectory(dir):
+    """
+    Set the directory of the node library.
+
+    Parameters
+    ----------
+
+    dir : str
+        The path to the node library.
+    """
+
+    if not _os.path.isdir(dir):
+        raise IOError("Node directory '%s' doesn't exist!" % dir)
+
+    global _node_dir
+    _node_dir = dir
+
+
+def _get_node_path(name):
+    """
+    Get the path to the named node.
+
+    Parameters
+    ----------
+
+    name : str
+        The name of the node.
+
+    Returns
+    -------
+
+    full_name : str
+        The path to the node script.
+    """
+
     # Apped the node directory name.
     full_name = _node_dir + "/" + name
 
@@ -128,55 +317,151 @@ def run(name, args={}):
         else:
             full_name += ".py"
 
-    # Write a YAML configuration file for the BioSimSpace node.
-    if len(args) > 0:
-        with open("input.yaml", "w") as file:
-            _yaml.dump(args, file, default_flow_style=False)
+    return _os.path.abspath(full_name)
 
-        # Create the command.
-        command = "%s/python %s --config input.yaml" % (
-            _SireBase.getBinDir(),
-            full_name,
-        )
 
-    # No arguments.
-    else:
-        command = "%s/python %s" % (_SireBase.getBinDir(), full_name)
+def _start_pool(max_workers=None):
+    """
+    Start the worker pool. The caller must hold the pool lock.
 
-    # Run the node as a subprocess.
-    proc = _subprocess.run(
-        _Utils.command_split(command), shell=False, text=True, stderr=_subprocess.PIPE
+    Parameters
+    ----------
+
+    max_workers : int
+        The number of worker processes.
+    """
+
+    import multiprocessing as _multiprocessing
+
+    global _pool, _pool_max_workers
+
+    _pool_max_workers = max_workers
+
+    if max_workers is None:
+        max_workers = _os.cpu_count() or 1
+
+    # The workers are long lived, so BioSimSpace is only imported once per
+    # worker. Spawn them, rather than using the fork server, since its
+    # preloaded modules are shared by the whole process.
+    context = _multiprocessing.get_context("spawn")
+
+    _pool = _futures.ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=context, initializer=_init_worker
     )
 
-    if proc.returncode == 0:
-        # Read the output YAML file into a dictionary.
-        with open("output.yaml", "r") as file:
-            output = _yaml.safe_load(file)
+    # Start all of the workers now, so that they are warm before the first
+    # node is submitted.
+    for future in [_pool.submit(_init_worker) for x in range(max_workers)]:
+        future.result()
 
-        # Delete the redundant YAML files.
-        _os.remove("input.yaml")
-        _os.remove("output.yaml")
 
-        return output
+def _stop_pool():
+    """Stop the worker pool. The caller must hold the pool lock."""
 
-    else:
-        # Print the standard error, decoded as UTF-8.
-        print(proc.stderr)
+    global _pool
 
+    if _pool is not None:
+        # Don't wait for the workers of a broken pool.
+        _pool.shutdown(wait=not _pool._broken)
+        _pool = None
 
-def setNodeDirectory(dir):
+
+def _init_worker():
+    """Initialise a worker process by importing BioSimSpace."""
+    import BioSimSpace
+
+
+def _run_worker(full_name, args, work_dir):
     """
-    Set the directory of the node library.
+    Run a node in a worker process.
 
     Parameters
     ----------
 
-    dir : str
-        The path to the node library.
+    full_name : str
+        The path to the node script.
+
+    args : dict
+        A dictionary of arguments to be passed to the node.
+
+    work_dir : str
+        The directory from which to run the node.
+
+    Returns
+    -------
+
+    output : dict
+        A dictionary containing the output of the node, or None if it failed.
+
+    error : str
+        The standard error of the node if it failed, else None.
     """
 
-    if not _os.path.isdir(dir):
-        raise IOError("Node directory '%s' doesn't exist!" % dir)
+    import contextlib as _contextlib
+    import gc as _gc
+    import io as _io
+    import runpy as _runpy
+    import traceback as _traceback
+
+    import BioSimSpace as _BSS
+    from ..Gateway._node import Node as _GatewayNode
 
     global _node_dir
-    _node_dir = dir
+
+    stderr = _io.StringIO()
+    argv = _sys.argv
+    output_dir = _GatewayNode._output_dir
+
+    # Global state that a node might modify. This is restored after the node
+    # has run so that it doesn't leak into the next node run by the worker.
+    is_verbose = _BSS._is_verbose
+    node_dir = _node_dir
+    environ = _os.environ.copy()
+
+    with _tempfile.TemporaryDirectory() as tmp_dir:
+        # Write a YAML configuration file for the BioSimSpace node and
+        # pass it on the command-line.
+        if len(args) > 0:
+            config = _os.path.join(tmp_dir, "input.yaml")
+            with open(config, "w") as file:
+                _yaml.dump(args, file, default_flow_style=False)
+            _sys.argv = [full_name, "--config", config]
+        else:
+            _sys.argv = [full_name]
+
+        # Tell the node where to write its output.
+        _GatewayNode._output_dir = tmp_dir
+
+        try:
+            with _Utils.cd(work_dir), _contextlib.redirect_stderr(stderr):
+                try:
+                    namespace = _runpy.run_path(full_name, run_name="__main__")
+
+                    # Make sure that any node objects are destroyed, and
+                    # so validated, while the output directory is set.
+                    del namespace
+                    _gc.collect()
+
+                    is_success = True
+                except SystemExit as e:
+                    is_success = e.code is None or e.code == 0
+                    if not is_success and not isinstance(e.code, int):
+                        print(e.code, file=_sys.stderr)
+                except Exception:
+                    _traceback.print_exc()
+                    is_success = False
+        finally:
+            _sys.argv = argv
+            _GatewayNode._output_dir = output_dir
+            _BSS._is_verbose = is_verbose
+            _node_dir = node_dir
+            if _os.environ != environ:
+                _os.environ.clear()
+                _os.environ.update(environ)
+
+        output_file = _os.path.join(tmp_dir, "output.yaml")
+        if is_success and _os.path.isfile(output_file):
+            with open(output_file, "r") as file:
+                return _yaml.safe_load(file), None
+        else:
+            return None, stderr.getvalue()
@@ -61,7 +61,7 @@ del _sys, _orig_stderr
 from sire.legacy import IO as _SireIO
 from sire.legacy import Mol as _SireMol
 
-from ... import _amber_home, _gmx_exe, _isVerbose
+from ... import _amber_home, _isVerbose
 from ... import IO as _IO
 from ... import _Utils
 from ...Convert import smiles as _smiles
@@ -295,6 +295,8 @@ class AmberProtein(_protocol.Protocol):
             The parameterised molecule.
         """
 
+        from ... import _gmx_exe
+
         if not isinstance(molecule, (_Molecule, str)):
             raise TypeError(
                 "'molecule' must be of type 'BioSimSpace._SireWrappers.Molecule' or 'str'"
@@ -552,6 +554,8 @@ class AmberProtein(_protocol.Protocol):
             The working directory.
         """
 
+        from ... import _gmx_exe
+
         # A list of supported force fields, mapping to their GROMACS ID string.
         # GROMACS supports a sub-set of the AMBER force fields.
         supported_ff = {"ff99": "amber99", "ff99SB": "amber99sb", "ff03": "amber03"}
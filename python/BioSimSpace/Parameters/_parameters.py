@@ -49,7 +49,7 @@ _amber_protein_forcefields = {
     "ff14SB": False,
 }
 
-from .. import _amber_home, _gmx_exe, _gmx_path, _isVerbose
+from .. import _amber_home, _isVerbose
 
 from .._Exceptions import IncompatibleError as _IncompatibleError
 from .._Exceptions import MissingSoftwareError as _MissingSoftwareError
@@ -216,6 +216,8 @@ def _parameterise_amber_protein(
         parameterisation is complete and get the parameterised molecule.
     """
 
+    from .. import _gmx_exe, _gmx_path
+
     if not isinstance(forcefield, str):
         raise TypeError("'forcefield' must be of type 'str'.")
 
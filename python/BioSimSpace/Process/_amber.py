@@ -26,10 +26,7 @@ __email__ = "lester.hedges@gmail.com"
 
 __all__ = ["Amber"]
 
-from .._Utils import _try_import
-
-_pygtail = _try_import("pygtail")
-
+import math as _math
 import os as _os
 import re as _re
 import time as _time
@@ -61,6 +58,15 @@ from .. import _Utils
 from . import _process
 
 from ._plumed import Plumed as _Plumed
+from ._restart import _read_amber_restart, _update_from_template
+
+# Regular expression used to split AMBER stdout lines into record names and values.
+_record_regex = _re.compile(
+    r"([SC_]*[EEL_]*[RES_]*[VDW_]*\d*\-*\d*\s*[A-Z/]+\(*[A-Z]*\)*)\s*=\s*(\-*\d+\.?\d*|\**)"
+)
+
+# A cache mapping AMBER record keys to their universal form.
+_universal_keys = {}
 
 
 class Amber(_process.Process):
@@ -81,6 +87,7 @@ class Amber(_process.Process):
         extra_lines=[],
         extra_args={},
         property_map={},
+        previous_process=None,
         **kwargs,
     ):
         """
@@ -133,6 +140,11 @@ class Amber(_process.Process):
             values. This allows the user to refer to properties with their
             own naming scheme, e.g. { "charge" : "my-charge" }
 
+        previous_process : :class:`Process.Amber <BioSimSpace.Process.Amber>`
+            An optional process for a previous stage in a chain of simulations.
+            If the topology of the system is unchanged, then the topology file
+            from the previous process is re-used rather than being re-written.
+
         kwargs : dict
             Additional keyword arguments.
         """
@@ -149,6 +161,7 @@ class Amber(_process.Process):
             extra_lines=extra_lines,
             extra_args=extra_args,
             property_map=property_map,
+            previous_process=previous_process,
         )
 
         # Set the package name.
@@ -202,8 +215,8 @@ class Amber(_process.Process):
             raise TypeError("'explicit_dummies' must be of type 'bool'")
         self._explicit_dummies = explicit_dummies
 
-        # Initialise the energy dictionary and header.
-        self._stdout_dict = _process._MultiDict()
+        # Initialise the byte offset of the next unread line of stdout.
+        self._stdout_offset = 0
 
         # Initialise dictionaries to hold stdout records for all possible
         # regions. For regular simulations there will be one, for free-energy
@@ -215,10 +228,10 @@ class Amber(_process.Process):
         #  - TI region 2
         #  - TI region 2 (soft-core part)
         self._stdout_dict = [
-            _process._MultiDict(),
-            _process._MultiDict(),
-            _process._MultiDict(),
-            _process._MultiDict(),
+            _process._ColumnDict(),
+            _process._ColumnDict(),
+            _process._ColumnDict(),
+            _process._ColumnDict(),
         ]
 
         # Initialise mappings between "universal" stdout keys, and the actual
@@ -264,6 +277,18 @@ class Amber(_process.Process):
         system = self._system.copy()
         reference_system = self._reference_system.copy()
 
+        # Clear the template used to read restart files.
+        self._restart_template = None
+
+        # Fingerprint the topology, along with any settings that affect how
+        # it is written, so that it can be re-used in a chain of processes.
+        fingerprint = self._get_topology_fingerprint(
+            isinstance(self._protocol, _FreeEnergyMixin),
+            self._explicit_dummies,
+            self._is_vacuum and self._is_pmemd_cuda,
+            kwargs.get("somd1_compatibility") is True,
+        )
+
         # Convert the water model topology so that it matches the AMBER naming convention.
         system._set_water_topology("AMBER", property_map=self._property_map)
         reference_system._set_water_topology("AMBER", property_map=self._property_map)
@@ -348,18 +373,31 @@ class Amber(_process.Process):
             else:
                 raise IOError(msg) from None
 
-        # PRM file (topology).
-        try:
-            file = _os.path.splitext(self._top_file)[0]
-            _IO.saveMolecules(
-                file, system, "prm7", match_water=False, property_map=self._property_map
-            )
-        except Exception as e:
-            msg = "Failed to write system to 'PRM7' format."
-            if _isVerbose():
-                raise IOError(msg) from e
-            else:
-                raise IOError(msg) from None
+        # PRM file (topology). This is re-used from the previous process if
+        # the topology is unchanged.
+        top_files = {"prm7": self._top_file}
+        if not self._reuse_topology(fingerprint, top_files):
+            try:
+                file = _os.path.splitext(self._top_file)[0]
+                _IO.saveMolecules(
+                    file,
+                    system,
+                    "prm7",
+                    match_water=False,
+                    property_map=self._property_map,
+                )
+            except Exception as e:
+                msg = "Failed to write system to 'PRM7' format."
+                if _isVerbose():
+                    raise IOError(msg) from e
+                else:
+                    raise IOError(msg) from None
+            self._store_topology(top_files)
+
+        # Store the system that was written to file. Atoms in restart files
+        # are in the same order, so this can be used as a template when
+        # reading them, avoiding the need to re-parse the topology.
+        self._restart_template = system.copy()
 
         # Generate the AMBER configuration file.
         # Skip if the user has passed a custom config.
@@ -509,6 +547,21 @@ class Amber(_process.Process):
 
         return self
 
+    def _infer_gpus(self):
+        """
+        Internal helper function to infer the number of GPUs required by
+        the process from the executable.
+
+        Returns
+        -------
+
+        gpus : int
+            The number of GPUs.
+        """
+        if "cuda" in _os.path.basename(self._exe).lower():
+            return 1
+        return 0
+
     def getSystem(self, block="AUTO"):
         """
         Get the latest molecular system.
@@ -547,19 +600,38 @@ class Amber(_process.Process):
             else:
                 is_lambda1 = False
 
-            # Copy the restart file to a temporary location. Sire streams from
-            # binary files with the same path, so we need to ensure that a new
-            # stream is created each time.
-            with _tempfile.TemporaryDirectory() as tmp_dir:
-                tmp_file = f"{tmp_dir}/{self._name}.crd"
-                _shutil.copyfile(restart, tmp_file)
-
-                # Create a new molecular system from the restart file.
-                new_system = _System(
-                    _SireIO.MoleculeParser.read(
-                        [tmp_file, self._top_file], self._property_map
+            # Read the coordinates, velocities, and box from the restart file
+            # into a copy of the system that was written to the topology file.
+            new_system = None
+            if self._restart_template is not None:
+                try:
+                    space_prop = self._property_map.get("space", "space")
+                    has_box = (
+                        space_prop in self._restart_template._sire_object.propertyKeys()
+                    )
+                    new_system = _update_from_template(
+                        self._restart_template,
+                        *_read_amber_restart(restart, has_box),
+                        property_map=self._property_map,
+                    )
+                except Exception:
+                    new_system = None
+
+            # Fall back to parsing the restart and topology files.
+            if new_system is None:
+                # Copy the restart file to a temporary location. Sire streams from
+                # binary files with the same path, so we need to ensure that a new
+                # stream is created each time.
+                with _tempfile.TemporaryDirectory() as tmp_dir:
+                    tmp_file = f"{tmp_dir}/{self._name}.crd"
+                    _shutil.copyfile(restart, tmp_file)
+
+                    # Create a new molecular system from the restart file.
+                    new_system = _System(
+                        _SireIO.MoleculeParser.read(
+                            [tmp_file, self._top_file], self._property_map
+                        )
                     )
-                )
 
             # Create a copy of the existing system object.
             old_system = self._system.copy()
@@ -937,8 +1009,8 @@ class Amber(_process.Process):
         Returns
         -------
 
-        records : :class:`MultiDict <BioSimSpace.Process._process._MultiDict>`
-           The dictionary of time-series records.
+        records : dict
+           The dictionary of time-series records. Missing values are None.
         """
 
         # Validate the region.
@@ -988,8 +1060,8 @@ class Amber(_process.Process):
         Returns
         -------
 
-        records : :class:`MultiDict <BioSimSpace.Process._process._MultiDict>`
-           The dictionary of time-series records.
+        records : dict
+           The dictionary of time-series records. Missing values are None.
         """
         return self.getRecords(region=region, soft_core=soft_core, block=False)
 
@@ -2532,17 +2604,63 @@ class Amber(_process.Process):
         if n < 0:
             raise ValueError("The number of lines must be positive!")
 
+        # Parse any new lines and append them to the stdout list.
+        self._update_stdout_dict()
+
+        # Get the current number of lines.
+        num_lines = len(self._stdout)
+
+        # Set the line from which to start printing.
+        if num_lines < n:
+            start = 0
+        else:
+            start = num_lines - n
+
+        # Print the lines.
+        for x in range(start, num_lines):
+            print(self._stdout[x])
+
+    def _update_stdout_dict(self):
+        """
+        Read any complete lines that have been appended to the stdout file
+        since the last call and add their records to the stdout dictionaries.
+        Only the new bytes are read, so the cost of each update is
+        proportional to the amount of new output.
+        """
+
+        # Nothing to do.
+        if not _os.path.isfile(self._stdout_file):
+            return
+
+        # The file has been truncated, so start again.
+        if _os.path.getsize(self._stdout_file) < self._stdout_offset:
+            self._stdout_offset = 0
+
+        # Read the new data.
+        with open(self._stdout_file, "rb") as f:
+            f.seek(self._stdout_offset)
+            data = f.read()
+
+        # Only consume complete lines. Any partial line will be read once
+        # it has been completed.
+        end = data.rfind(b"\n")
+        if end == -1:
+            return
+        self._stdout_offset += end + 1
+
         # Flag that this isn't a header line.
         self._is_header = False
 
-        # Append any new lines to the stdout list.
-        for line in _pygtail.Pygtail(self._stdout_file):
+        is_free_energy = isinstance(self._protocol, _FreeEnergyMixin)
+        is_minimisation = isinstance(self._protocol, _Protocol.Minimisation)
+
+        for line in data[: end + 1].decode("utf-8", errors="replace").splitlines():
             self._stdout.append(line.rstrip())
             line = line.strip()
 
             # Swap dictionary based on the protocol and the degre of freedom to
             # which the next block of records correspond.
-            if isinstance(self._protocol, _FreeEnergyMixin):
+            if is_free_energy:
                 if "TI region  1" in line:
                     self._current_region = 0
                 elif "TI region  2" in line:
@@ -2563,109 +2681,98 @@ class Amber(_process.Process):
             if self._current_region == 4:
                 continue
 
-            stdout_dict = self._stdout_dict[self._current_region]
-            stdout_key = self._stdout_key[self._current_region]
-
             # Skip empty lines and summary reports.
-            if len(line) > 0 and line[0] != "|" and line[0] != "-":
-                # Skip EAMBER records.
-                if "EAMBER (non-restraint)" in line:
-                    continue
-                # Flag that we've started recording results.
-                elif not self._has_results and line.startswith("NSTEP"):
-                    self._has_results = True
-                    self._finished_results = False
-                # Flag that we've finished recording results.
-                elif "A V E R A G E S" in line:
-                    self._finished_results = True
-
-                # Parse the results.
-                if self._has_results and not self._finished_results:
-                    # The first line of output has different formatting for minimisation protocols.
-                    if isinstance(self._protocol, _Protocol.Minimisation):
-                        # No equals sign in the line.
-                        if "NSTEP" in line and "=" not in line:
-                            # Split the line using whitespace.
-                            data = line.upper().split()
-
-                            # If we find a header, jump to the top of the loop.
-                            if len(data) > 0:
-                                if data[0] == "NSTEP":
-                                    self._is_header = True
-                                    continue
-
-                        # Process the header record.
-                        if self._is_header:
-                            # Split the line using whitespace.
-                            data = line.upper().split()
-
-                            # The file hasn't been updated.
-                            if (
-                                "NSTEP" in stdout_dict
-                                and data[0] == stdout_dict["NSTEP"][-1]
-                            ):
-                                self._finished_results = True
-                                continue
-
-                            # Add the timestep and energy records to the dictionary.
-                            stdout_dict["NSTEP"] = data[0]
-                            stdout_dict["ENERGY"] = data[1]
-
-                            # Add the keys to the mapping
-                            stdout_key["NSTEP"] = "NSTEP"
-                            stdout_key["ENERGY"] = "ENERGY"
-
-                            # Turn off the header flag now that the data has been recorded.
-                            self._is_header = False
-
-                    # All other records are formatted as RECORD = VALUE.
-
-                    # Use a regex search to split the line into record names and values.
-                    records = _re.findall(
-                        r"([SC_]*[EEL_]*[RES_]*[VDW_]*\d*\-*\d*\s*[A-Z/]+\(*[A-Z]*\)*)\s*=\s*(\-*\d+\.?\d*|\**)",
-                        line.upper(),
-                    )
-
-                    # Append each record to the dictionary.
-                    for key, value in records:
-                        # Strip whitespace from beginning and end.
-                        key = key.strip()
-
-                        # Format key so it can be re-used for records corresponding to
-                        # different regions, which use different abbreviations.
-                        universal_key = (
-                            key.replace("SC_", "")
-                            .replace(" ", "")
-                            .replace("-", "")
-                            .replace("EELEC", "EEL")
-                            .replace("VDWAALS", "VDW")
-                        )
+            if len(line) == 0 or line[0] == "|" or line[0] == "-":
+                continue
 
-                        # Handle missing values, which will appear as asterisks, e.g.
-                        # PRESS=********
-                        try:
-                            tmp = float(value)
-                        except:
-                            value = None
+            stdout_dict = self._stdout_dict[self._current_region]
+            stdout_key = self._stdout_key[self._current_region]
 
-                        # Store the record using the original key.
-                        stdout_dict[key] = value
+            # Skip EAMBER records.
+            if "EAMBER (non-restraint)" in line:
+                continue
+            # Flag that we've started recording results.
+            elif not self._has_results and line.startswith("NSTEP"):
+                self._has_results = True
+                self._finished_results = False
+            # Flag that we've finished recording results.
+            elif "A V E R A G E S" in line:
+                self._finished_results = True
+
+            # Parse the results.
+            if not self._has_results or self._finished_results:
+                continue
 
-                        # Map the universal key to the original.
-                        stdout_key[universal_key] = key
+            # The first line of output has different formatting for minimisation protocols.
+            if is_minimisation:
+                # No equals sign in the line.
+                if "NSTEP" in line and "=" not in line:
+                    # Split the line using whitespace.
+                    data = line.upper().split()
+
+                    # If we find a header, jump to the top of the loop.
+                    if len(data) > 0:
+                        if data[0] == "NSTEP":
+                            self._is_header = True
+                            continue
+
+                # Process the header record.
+                if self._is_header:
+                    # Split the line using whitespace.
+                    data = line.upper().split()
+
+                    # The file hasn't been updated.
+                    if "NSTEP" in stdout_dict and float(data[0]) == float(
+                        stdout_dict["NSTEP"][-1]
+                    ):
+                        self._finished_results = True
+                        continue
+
+                    # Add the timestep and energy records to the dictionary.
+                    stdout_dict.append("NSTEP", data[0])
+                    stdout_dict.append("ENERGY", data[1])
+
+                    # Add the keys to the mapping
+                    stdout_key["NSTEP"] = "NSTEP"
+                    stdout_key["ENERGY"] = "ENERGY"
+
+                    # Turn off the header flag now that the data has been recorded.
+                    self._is_header = False
+
+            # All other records are formatted as RECORD = VALUE, so we can
+            # skip lines without an equals sign.
+            if "=" not in line:
+                continue
 
-        # Get the current number of lines.
-        num_lines = len(self._stdout)
+            # Use a regex search to split the line into record names and values.
+            records = _record_regex.findall(line.upper())
+
+            # Append each record to the dictionary.
+            for key, value in records:
+                # Strip whitespace from beginning and end.
+                key = key.strip()
+
+                # Format key so it can be re-used for records corresponding to
+                # different regions, which use different abbreviations.
+                try:
+                    universal_key = _universal_keys[key]
+                except KeyError:
+                    universal_key = (
+                        key.replace("SC_", "")
+                        .replace(" ", "")
+                        .replace("-", "")
+                        .replace("EELEC", "EEL")
+                        .replace("VDWAALS", "VDW")
+                    )
+                    _universal_keys[key] = universal_key
 
-        # Set the line from which to start printing.
-        if num_lines < n:
-            start = 0
-        else:
-            start = num_lines - n
+                # Store the record using the original key. Missing values,
+                # which appear as asterisks, e.g. PRESS=********, are stored
+                # as NaN.
+                stdout_dict.append(key, value)
 
-        # Print the lines.
-        for x in range(start, num_lines):
-            print(self._stdout[x])
+                # Map the universal key to the original.
+                stdout_key[universal_key] = key
 
     def kill(self):
         """Kill the running process."""
@@ -2747,44 +2854,39 @@ class Amber(_process.Process):
         except:
             return None
 
-        # Return the list of dictionary values.
+        # Return the list of values. Records are stored as float64 columns,
+        # with missing values as NaN, so these are mapped back to None.
         if time_series:
             try:
-                if key == "NSTEP":
-                    return [int(x) for x in stdout_dict[key]]
-                else:
-                    if unit is None:
-                        return [float(x) if x else None for x in stdout_dict[key]]
-                    else:
-                        return [
-                            (float(x) * unit)._to_default_unit() if x else None
-                            for x in stdout_dict[key]
-                        ]
-
+                values = stdout_dict.tolist(key)
             except KeyError:
                 return None
 
+            if key == "NSTEP":
+                return [None if x is None else int(x) for x in values]
+            elif unit is None:
+                return values
+            else:
+                return [
+                    None if x is None else (x * unit)._to_default_unit()
+                    for x in values
+                ]
+
         # Return the most recent dictionary value.
         else:
             try:
-                if key == "NSTEP":
-                    return int(stdout_dict[key][-1])
-                else:
-                    if unit is None:
-                        try:
-                            return float(stdout_dict[key][-1])
-                        except:
-                            return None
-                    else:
-                        try:
-                            return (
-                                float(stdout_dict[key][-1]) * unit
-                            )._to_default_unit()
-                        except:
-                            return None
+                value = stdout_dict[key][-1]
+            except (KeyError, IndexError):
+                return None
 
-            except KeyError:
+            if _math.isnan(value):
                 return None
+            elif key == "NSTEP":
+                return int(value)
+            elif unit is None:
+                return float(value)
+            else:
+                return (float(value) * unit)._to_default_unit()
 
 
 def _find_exe(is_gpu=False, is_free_energy=False, is_vacuum=False):
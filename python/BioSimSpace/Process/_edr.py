@@ -0,0 +1,459 @@
+######################################################################
+# BioSimSpace: Making biomolecular simulation a breeze!
+#
+# Copyright: 2017-2024
+#
+# Authors: Lester Hedges <lester.hedges@gmail.com>
+#
+# BioSimSpace is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BioSimSpace is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BioSimSpace. If not, see <http://www.gnu.org/licenses/>.
+#####################################################################
+
+"""Functionality for incrementally reading GROMACS energy (EDR) files."""
+
+__author__ = "Lester Hedges"
+__email__ = "lester.hedges@gmail.com"
+
+__all__ = ["EdrReader"]
+
+import mmap as _mmap
+import os as _os
+import struct as _struct
+
+import numpy as _np
+
+# The range of supported versions of the EDR format. Version 4 was
+# introduced in GROMACS 4.5.
+_min_enx_version = 4
+_enx_version = 5
+
+# Magic numbers used to identify the energy names and frame headers.
+_names_magic = -55555
+_frame_magic = -7777777
+
+# Sizes (in bytes) of the XDR data types used by sub-blocks. The keys are
+# the GROMACS xdr_datatype enum values: int, float, double, int64, char.
+_xdr_sizes = {0: 4, 1: 4, 2: 8, 3: 8, 4: 4}
+
+
+class _XdrBuffer:
+    """A minimal big-endian XDR decoder operating on a buffer."""
+
+    def __init__(self, buffer, offset=0, is_double=False):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+
+        buffer : bytes, mmap.mmap
+            The buffer to decode.
+
+        offset : int
+            The byte offset at which to start decoding.
+
+        is_double : bool
+            Whether reals are stored in double precision.
+        """
+        self._buffer = buffer
+        self._offset = offset
+        self._size = len(buffer)
+        self._real = ">d" if is_double else ">f"
+        self._real_size = 8 if is_double else 4
+
+    def _unpack(self, fmt, size):
+        if self._offset + size > self._size:
+            raise EOFError("Unexpected end of EDR data.")
+        value = _struct.unpack_from(fmt, self._buffer, self._offset)[0]
+        self._offset += size
+        return value
+
+    def offset(self):
+        return self._offset
+
+    def skip(self, size):
+        if self._offset + size > self._size:
+            raise EOFError("Unexpected end of EDR data.")
+        self._offset += size
+
+    def int(self):
+        return self._unpack(">i", 4)
+
+    def int64(self):
+        return self._unpack(">q", 8)
+
+    def double(self):
+        return self._unpack(">d", 8)
+
+    def real(self):
+        return self._unpack(self._real, self._real_size)
+
+    def reals(self, num):
+        size = num * self._real_size
+        if self._offset + size > self._size:
+            raise EOFError("Unexpected end of EDR data.")
+        values = _np.frombuffer(
+            self._buffer, dtype=self._real, count=num, offset=self._offset
+        )
+        self._offset += size
+        return values
+
+    def string(self):
+        length = self.int()
+        padded = (length + 3) & ~3
+        if self._offset + padded > self._size:
+            raise EOFError("Unexpected end of EDR data.")
+        value = bytes(self._buffer[self._offset : self._offset + length])
+        self._offset += padded
+        return value.decode("ascii", errors="replace")
+
+
+class EdrReader:
+    """
+    An incremental reader for GROMACS energy (EDR) files. The file is
+    memory-mapped and the byte offset of the end of the last complete frame
+    is remembered, so each call to :meth:`read` only decodes frames that
+    have been appended since the previous call. This makes it cheap to poll
+    the energy file of a running simulation.
+    """
+
+    def __init__(self, edr_file):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+
+        edr_file : str
+            The path to the EDR file.
+        """
+
+        if not isinstance(edr_file, str):
+            raise TypeError("'edr_file' must be of type 'str'.")
+
+        self._edr_file = edr_file
+        self._reset()
+
+        # Incremented each time the reader is reset, i.e. when the file is
+        # truncated or replaced.
+        self._generation = 0
+
+    def _reset(self):
+        """Reset the reader state."""
+        self._offset = 0
+        self._inode = None
+        self._names = None
+        self._units = None
+        self._is_double = None
+        self._file_version = None
+
+    def generation(self):
+        """
+        Return the number of times that the reader has been reset because
+        the file was truncated or replaced. Frames returned by :meth:`read`
+        before a reset should be discarded.
+
+        Returns
+        -------
+
+        generation : int
+            The reader generation.
+        """
+        return self._generation
+
+    def names(self):
+        """
+        Return the names of the energy terms, or None if the header hasn't
+        yet been read.
+
+        Returns
+        -------
+
+        names : [str]
+            The names of the energy terms.
+        """
+        return None if self._names is None else self._names.copy()
+
+    def units(self):
+        """
+        Return the units of the energy terms, or None if the header hasn't
+        yet been read.
+
+        Returns
+        -------
+
+        units : [str]
+            The units of the energy terms, as written by GROMACS.
+        """
+        return None if self._units is None else self._units.copy()
+
+    def read(self):
+        """
+        Read any complete frames that have been appended to the file since
+        the last call.
+
+        Returns
+        -------
+
+        times : numpy.ndarray
+            The simulation time of each new frame in picoseconds.
+
+        energies : numpy.ndarray
+            A (frames, terms) array of energies for each new frame.
+        """
+
+        # The file doesn't exist yet.
+        if not _os.path.isfile(self._edr_file):
+            return self._empty()
+
+        stat = _os.stat(self._edr_file)
+        size = stat.st_size
+
+        # The file has been truncated or replaced, so start again.
+        if size < self._offset or (
+            self._inode is not None and stat.st_ino != self._inode
+        ):
+            self._reset()
+            self._generation += 1
+
+        self._inode = stat.st_ino
+
+        # Nothing new to read. (An empty file can't be memory-mapped.)
+        if size == 0 or size == self._offset:
+            return self._empty()
+
+        with open(self._edr_file, "rb") as f:
+            with _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ) as buffer:
+                return self._read_frames(buffer)
+
+    def _empty(self):
+        """Return empty time and energy arrays."""
+        num_terms = 0 if self._names is None else len(self._names)
+        return _np.empty(0), _np.empty((0, num_terms))
+
+    def _read_frames(self, buffer):
+        """
+        Decode all complete frames after the current offset.
+
+        Parameters
+        ----------
+
+        buffer : mmap.mmap
+            The memory-mapped file.
+
+        Returns
+        -------
+
+        times : numpy.ndarray
+            The simulation time of each new frame in picoseconds.
+
+        energies : numpy.ndarray
+            A (frames, terms) array of energies for each new frame.
+        """
+
+        # Read the energy names and work out the precision.
+        if self._names is None:
+            if not self._read_names(buffer):
+                return self._empty()
+
+        times = []
+        energies = []
+
+        while self._offset < len(buffer):
+            xdr = _XdrBuffer(buffer, self._offset, self._is_double)
+            try:
+                frame = self._read_frame(xdr)
+            except EOFError:
+                # The final frame is incomplete, so wait for more data.
+                break
+
+            self._offset = xdr.offset()
+
+            if frame is not None:
+                times.append(frame[0])
+                energies.append(frame[1])
+
+        if len(times) == 0:
+            return self._empty()
+
+        return _np.array(times), _np.vstack(energies)
+
+    def _read_names(self, buffer):
+        """
+        Read the energy names from the start of the file.
+
+        Parameters
+        ----------
+
+        buffer : mmap.mmap
+            The memory-mapped file.
+
+        Returns
+        -------
+
+        is_complete : bool
+            Whether the header could be read.
+        """
+
+        xdr = _XdrBuffer(buffer)
+
+        try:
+            magic = xdr.int()
+
+            # Old format files store the number of terms in place of the magic.
+            if magic > 0:
+                raise ValueError(
+                    f"'{self._edr_file}' uses an unsupported legacy EDR format."
+                )
+            elif magic != _names_magic:
+                raise ValueError(
+                    f"'{self._edr_file}' is not a GROMACS energy file. "
+                    "Energy names magic number mismatch."
+                )
+
+            file_version = xdr.int()
+            if file_version < _min_enx_version or file_version > _enx_version:
+                raise ValueError(
+                    f"Unsupported EDR file version {file_version} in "
+                    f"'{self._edr_file}'."
+                )
+            num_terms = xdr.int()
+
+            names = []
+            units = []
+            for x in range(num_terms):
+                names.append(xdr.string())
+                units.append(xdr.string())
+
+        except EOFError:
+            return False
+
+        # Work out the precision from the first frame header. In single
+        # precision, the first real is -2e10 followed by the frame magic.
+        offset = xdr.offset()
+        is_double = None
+        for precision in [False, True]:
+            try:
+                probe = _XdrBuffer(buffer, offset, precision)
+                probe.real()
+                if probe.int() == _frame_magic:
+                    is_double = precision
+                    break
+            except EOFError:
+                return False
+        if is_double is None:
+            raise ValueError(
+                f"'{self._edr_file}' is not a GROMACS energy file. "
+                "Frame header magic number mismatch."
+            )
+
+        self._names = names
+        self._units = units
+        self._file_version = file_version
+        self._is_double = is_double
+        self._offset = xdr.offset()
+
+        return True
+
+    def _read_frame(self, xdr):
+        """
+        Read a single frame.
+
+        Parameters
+        ----------
+
+        xdr : _XdrBuffer
+            The decoder, positioned at the start of the frame.
+
+        Returns
+        -------
+
+        frame : (float, numpy.ndarray)
+            The time and energies for the frame, or None if the frame
+            contains no energies.
+        """
+
+        # Read the frame header.
+        xdr.real()
+        if xdr.int() != _frame_magic:
+            raise ValueError(
+                f"Corrupt frame in '{self._edr_file}'. "
+                "Frame header magic number mismatch."
+            )
+        file_version = xdr.int()
+        if file_version < _min_enx_version or file_version > _enx_version:
+            raise ValueError(
+                f"Unsupported EDR frame version {file_version} in "
+                f"'{self._edr_file}'."
+            )
+        time = xdr.double()
+        # Step.
+        xdr.int64()
+        num_sum = xdr.int()
+        # Number of steps.
+        xdr.int64()
+        # Time step.
+        if file_version >= 5:
+            xdr.double()
+
+        num_terms = xdr.int()
+        # Reserved.
+        xdr.int()
+        num_blocks = xdr.int()
+
+        # Read the block headers, storing the data type and size of each
+        # sub-block.
+        sub_blocks = []
+        for x in range(num_blocks):
+            # Block id.
+            xdr.int()
+            num_sub = xdr.int()
+            for y in range(num_sub):
+                data_type = xdr.int()
+                sub_blocks.append((data_type, xdr.int()))
+
+        # Energy size and reserved values.
+        xdr.int()
+        xdr.int()
+        xdr.int()
+
+        # Read the energies. When averages are stored, each term is followed
+        # by its average and sum.
+        energies = None
+        if num_terms > 0:
+            if num_sum > 0:
+                values = xdr.reals(3 * num_terms)[::3]
+            else:
+                values = xdr.reals(num_terms)
+            energies = values.astype(_np.float64)
+
+        # Skip the sub-blocks.
+        for data_type, num in sub_blocks:
+            # Strings are stored with their length.
+            if data_type == 5:
+                for x in range(num):
+                    xdr.int()
+                    xdr.string()
+            else:
+                try:
+                    xdr.skip(num * _xdr_sizes[data_type])
+                except KeyError:
+                    raise ValueError(
+                        f"Corrupt frame in '{self._edr_file}'. "
+                        f"Unknown data type {data_type}."
+                    )
+
+        if energies is None:
+            return None
+
+        return time, energies
@@ -48,7 +48,6 @@ from sire.legacy import Maths as _SireMaths
 from sire.legacy import Units as _SireUnits
 from sire.legacy import Vol as _SireVol
 
-from .. import _gmx_exe, _gmx_version
 from .. import _isVerbose
 from .._Config import Gromacs as _GromacsConfig
 from .._Exceptions import MissingSoftwareError as _MissingSoftwareError
@@ -66,7 +65,9 @@ from .. import _Utils
 
 from . import _process
 
+from ._edr import EdrReader as _EdrReader
 from ._plumed import Plumed as _Plumed
+from ._restart import _read_gro, _update_from_template
 
 
 class Gromacs(_process.Process):
@@ -88,6 +89,7 @@ class Gromacs(_process.Process):
         ignore_warnings=False,
         show_errors=True,
         checkpoint_file=None,
+        previous_process=None,
         **kwargs,
     ):
         """
@@ -149,10 +151,17 @@ class Gromacs(_process.Process):
            to continue an existing simulation. Currently we only support the
            use of checkpoint files for Equilibration protocols.
 
+        previous_process : :class:`Process.Gromacs <BioSimSpace.Process.Gromacs>`
+            An optional process for a previous stage in a chain of simulations.
+            If the topology of the system is unchanged, then the topology file
+            from the previous process is re-used rather than being re-written.
+
         kwargs : dict
             Additional keyword arguments.
         """
 
+        from .. import _gmx_exe
+
         # Call the base class constructor.
         super().__init__(
             system,
@@ -165,6 +174,7 @@ class Gromacs(_process.Process):
             extra_lines=extra_lines,
             extra_args=extra_args,
             property_map=property_map,
+            previous_process=previous_process,
         )
 
         # Set the package name.
@@ -198,8 +208,8 @@ class Gromacs(_process.Process):
             raise ValueError("'show_errors' must be of type 'bool'.")
         self._show_errors = show_errors
 
-        # Initialise the stdout dictionary and title header.
-        self._energy_dict = {}
+        # Initialise the dictionary of energy records.
+        self._energy_dict = _process._ColumnDict()
 
         # Store the name of the GROMACS log file.
         self._log_file = "%s/%s.log" % (self._work_dir, name)
@@ -207,6 +217,11 @@ class Gromacs(_process.Process):
         # Store the name of the GROMACS energy file.
         self._energy_file = "%s/%s.edr" % (self._work_dir, name)
 
+        # Create a reader to incrementally parse the energy file.
+        self._edr_reader = _EdrReader(self._energy_file)
+        self._edr_generation = 0
+        self._energy_indices = None
+
         # The names of the input files.
         self._gro_file = _os.path.join(str(self._work_dir), f"{name}.gro")
         self._top_file = _os.path.join(str(self._work_dir), f"{name}.top")
@@ -255,6 +270,16 @@ class Gromacs(_process.Process):
         # Create a copy of the system.
         system = self._system.copy()
 
+        # Clear the template used to read the final coordinates.
+        self._restart_template = None
+
+        # Fingerprint the topology, along with any settings that affect how
+        # it is written, so that it can be re-used in a chain of processes.
+        fingerprint = self._get_topology_fingerprint(
+            isinstance(self._protocol, _FreeEnergyMixin),
+            kwargs.get("somd1_compatibility") is True,
+        )
+
         if isinstance(self._protocol, _FreeEnergyMixin):
             # Check that the system contains a perturbable molecule.
             if self._system.nPerturbableMolecules() == 0:
@@ -307,11 +332,26 @@ class Gromacs(_process.Process):
             property_map=self._property_map,
         )
 
-        # TOP file.
-        file = _os.path.splitext(self._top_file)[0]
-        _IO.saveMolecules(
-            file, system, "grotop", match_water=False, property_map=self._property_map
-        )
+        # TOP file. This is re-used from the previous process if the topology
+        # is unchanged.
+        top_files = {"grotop": self._top_file}
+        if not self._reuse_topology(fingerprint, top_files):
+            file = _os.path.splitext(self._top_file)[0]
+            _IO.saveMolecules(
+                file,
+                system,
+                "grotop",
+                match_water=False,
+                property_map=self._property_map,
+            )
+            self._store_topology(top_files)
+
+        # Store the system that was written to file. Atoms in the final GRO
+        # file are in the same order, so this can be used as a template when
+        # reading it, avoiding the need to re-parse the topology. Perturbable
+        # molecules are written with both end states, so are always parsed.
+        if not isinstance(self._protocol, _FreeEnergyMixin):
+            self._restart_template = system.copy()
 
         # Create the binary input file name.
         self._tpr_file = _os.path.join(str(self._work_dir), f"{self._name}.tpr")
@@ -334,6 +374,8 @@ class Gromacs(_process.Process):
     def _generate_config(self):
         """Generate GROMACS configuration file strings."""
 
+        from .. import _gmx_version
+
         # Check whether the system contains periodic box information.
         space_prop = self._property_map.get("space", "space")
         if space_prop in self._system._sire_object.propertyKeys():
@@ -757,6 +799,10 @@ class Gromacs(_process.Process):
         # Clear any existing output.
         self._clear_output()
 
+        # Clear any existing energy records, since GROMACS will write a new
+        # energy file.
+        self._reset_energy_dict()
+
         # Run the process in the working directory.
         with _Utils.cd(self._work_dir):
             # Create the arguments string list.
@@ -788,6 +834,108 @@ class Gromacs(_process.Process):
 
         return self
 
+    def _infer_cpus(self):
+        """
+        Internal helper function to infer the number of CPUs required by
+        the process from the mdrun thread options.
+
+        Returns
+        -------
+
+        cpus : int
+            The number of CPUs.
+        """
+
+        try:
+            # The total number of threads has been set explicitly.
+            if "-nt" in self._args:
+                return max(1, int(self._args["-nt"]))
+
+            # Otherwise, use the number of thread-MPI ranks multiplied by
+            # the number of OpenMP threads per rank.
+            ntmpi = int(self._args.get("-ntmpi", 1))
+            if "-ntomp" in self._args:
+                ntomp = int(self._args["-ntomp"])
+            else:
+                ntomp = super()._infer_cpus()
+            return max(1, ntmpi * ntomp)
+
+        except (TypeError, ValueError):
+            return super()._infer_cpus()
+
+    def _infer_gpus(self):
+        """
+        Internal helper function to infer the number of GPUs required by
+        the process from the mdrun GPU options.
+
+        Returns
+        -------
+
+        gpus : int
+            The number of GPUs.
+        """
+
+        # Explicit GPU ids, e.g. "01" or "0,1".
+        if "-gpu_id" in self._args:
+            ids = str(self._args["-gpu_id"]).replace(",", "")
+            return len(set(ids))
+
+        # Offloading of any of the interactions to the GPU.
+        for arg in ["-nb", "-pme", "-pmefft", "-bonded", "-update"]:
+            if str(self._args.get(arg, "")).lower() == "gpu":
+                return 1
+
+        return 0
+
+    def _set_visible_devices(self, devices):
+        """
+        Internal helper function to re-index the mdrun GPU options when the
+        process is run with a restricted set of visible devices. GROMACS
+        numbers the visible devices from zero, so any explicit device ids
+        are mapped to their position within the slot, in order of first
+        appearance. If there are more distinct ids than visible devices,
+        then the options are removed and GROMACS chooses the devices.
+
+        Parameters
+        ----------
+
+        devices : [str]
+            The device identifiers that will be visible to the process.
+        """
+
+        options = [x for x in ["-gpu_id", "-gputasks"] if x in self._args]
+        if len(options) == 0:
+            return
+
+        # Ids are given either as a string of digits, e.g. "01", or as
+        # a comma-separated list, e.g. "0,1".
+        values = {}
+        is_comma = False
+        for option in options:
+            value = str(self._args[option])
+            if "," in value:
+                is_comma = True
+                values[option] = [x.strip() for x in value.split(",") if x.strip()]
+            else:
+                values[option] = list(value.strip())
+
+        # Map each distinct id to its position within the slot.
+        mapping = {}
+        for option in options:
+            for x in values[option]:
+                if not x in mapping:
+                    mapping[x] = str(len(mapping))
+
+        if len(mapping) > len(devices):
+            for option in options:
+                self.deleteArg(option)
+            return
+
+        # Use a comma-separated list if there are more than ten devices.
+        separator = "," if is_comma or len(mapping) > 10 else ""
+        for option in options:
+            self.setArg(option, separator.join(mapping[x] for x in values[option]))
+
     def getSystem(self, block="AUTO"):
         """
         Get the latest molecular system.
@@ -1019,7 +1167,7 @@ class Gromacs(_process.Process):
         Returns
         -------
 
-        records : :class:`MultiDict <BioSimSpace.Process._process._MultiDict>`
+        records : dict
            The dictionary of time-series records.
         """
         # Wait for the process to finish.
@@ -1048,7 +1196,7 @@ class Gromacs(_process.Process):
         Returns
         -------
 
-        records : :class:`MultiDict <BioSimSpace.Process._process._MultiDict>`
+        records : dict
            The dictionary of time-series records.
         """
         return self.getRecords(block=False)
@@ -2185,7 +2333,9 @@ class Gromacs(_process.Process):
                         # Append the restraint file to the list of autogenerated inputs.
                         self._input_files.append(restraint_file)
 
-                # Write the updated topology to file.
+                # Write the updated topology to file. Remove the existing file
+                # first, since it may be linked to that of another process.
+                _os.remove(self._top_file)
                 with open(self._top_file, "w") as file:
                     for line in top_lines:
                         file.write("%s\n" % line)
@@ -2271,7 +2421,9 @@ class Gromacs(_process.Process):
                         # Append the restraint file to the list of autogenerated inputs.
                         self._input_files.append(restraint_file)
 
-                # Write the updated topology to file.
+                # Write the updated topology to file. Remove the existing file
+                # first, since it may be linked to that of another process.
+                _os.remove(self._top_file)
                 with open(self._top_file, "w") as file:
                     for line in top_lines:
                         file.write("%s\n" % line)
@@ -2292,11 +2444,11 @@ class Gromacs(_process.Process):
         # We need to stored the original key as the one in the
         # self._energy_dict will be the sanitised keys.
         self._energy_keys = keys
-        self._energy_dict["TIME"] = []
+        self._energy_columns = ["TIME"]
         for key in keys:
             # Skip surface tension records, since there is no appropriate general unit.
             if key != "#Surf*SurfTen":
-                self._energy_dict[self._sanitise_energy_term(key)] = []
+                self._energy_columns.append(self._sanitise_energy_term(key))
 
     @staticmethod
     def _parse_energy_terms(text):
@@ -2391,32 +2543,50 @@ class Gromacs(_process.Process):
         for line in lines:
             terms = line.split()
             if len(terms) > 1 and terms[0] != "#Surf*SurfTen":
-                unit = terms[-1][1:-1]
-                if unit == "K":
-                    units.append(_Units.Temperature.kelvin)
-                elif unit == "kJ/mol":
-                    units.append(_Units.Energy.kj_per_mol)
-                elif unit == "bar":
-                    units.append(_Units.Pressure.bar)
-                elif unit == "":
-                    units.append(_Units.Length.nanometer)
-                elif unit == "nm":
-                    units.append(_Units.Length.nanometer)
-                elif unit == "nm^3":
-                    units.append(_Units.Volume.nanometer3)
-                elif unit == "bar nm":
-                    units.append(_Units.Pressure.bar * _Units.Length.nanometer)
-                elif unit == "nm/ps":
-                    units.append(_Units.Length.nanometer / _Units.Time.picosecond)
-                elif unit == "kg/m^3":
-                    units.append(_Types._GeneralUnit("kg/m3"))
-                else:
-                    units.append(1.0)
-                    _warnings.warn(
-                        f"Unit {unit} cannot be parsed, recording the unit as unitless."
-                    )
+                units.append(Gromacs._convert_energy_unit(terms[-1][1:-1]))
         return units
 
+    @staticmethod
+    def _convert_energy_unit(unit):
+        """
+        Convert a GROMACS energy unit string to a BioSimSpace unit.
+
+        Parameters
+        ----------
+
+        unit : str
+            The unit string, e.g. "kJ/mol".
+
+        Returns
+        -------
+
+        unit : :mod:`~BioSimSpace.Types._GeneralUnit`, float
+            The unit. Unknown units are recorded as unitless.
+        """
+        if unit == "K":
+            return _Units.Temperature.kelvin
+        elif unit == "kJ/mol":
+            return _Units.Energy.kj_per_mol
+        elif unit == "bar":
+            return _Units.Pressure.bar
+        elif unit == "":
+            return _Units.Length.nanometer
+        elif unit == "nm":
+            return _Units.Length.nanometer
+        elif unit == "nm^3":
+            return _Units.Volume.nanometer3
+        elif unit == "bar nm":
+            return _Units.Pressure.bar * _Units.Length.nanometer
+        elif unit == "nm/ps":
+            return _Units.Length.nanometer / _Units.Time.picosecond
+        elif unit == "kg/m^3":
+            return _Types._GeneralUnit("kg/m3")
+        else:
+            _warnings.warn(
+                f"Unit {unit} cannot be parsed, recording the unit as unitless."
+            )
+            return 1.0
+
     @staticmethod
     def _sanitise_energy_term(key):
         """
@@ -2456,10 +2626,78 @@ class Gromacs(_process.Process):
         key = key.replace("BAR", "")
         return key
 
+    def _reset_energy_dict(self):
+        """Internal function to clear the energy dictionary and reader."""
+        self._energy_dict.clear()
+        self._edr_reader = _EdrReader(self._energy_file)
+        self._edr_generation = 0
+        self._energy_indices = None
+
     def _update_energy_dict(self):
         """Internal function to update the energy dictionary with the latest data."""
 
-        if len(self._energy_dict) == 0:
+        # Read any new frames directly from the energy file. If the file
+        # can't be parsed, e.g. because it uses an unsupported format, then
+        # fall back to using 'gmx energy'.
+        if self._edr_reader is not None:
+            try:
+                self._read_energy_frames()
+                return
+            except ValueError as e:
+                _warnings.warn(
+                    f"Unable to read GROMACS energy file natively, using "
+                    f"'gmx energy' instead: {e}"
+                )
+                self._edr_reader = None
+
+        self._update_energy_dict_gmx()
+
+    def _read_energy_frames(self):
+        """
+        Internal function to append the records from any new frames in the
+        energy file to the energy dictionary.
+        """
+
+        times, energies = self._edr_reader.read()
+
+        # The energy file has been replaced, so discard the existing records.
+        if self._edr_reader.generation() != self._edr_generation:
+            self._edr_generation = self._edr_reader.generation()
+            self._energy_dict.clear()
+            self._energy_indices = None
+
+        # The header hasn't been written yet.
+        names = self._edr_reader.names()
+        if names is None:
+            return
+
+        # Work out the record keys and units from the header.
+        if self._energy_indices is None:
+            units = self._edr_reader.units()
+            self._energy_indices = {}
+            self._energy_units = {"TIME": _Units.Time.picosecond}
+            for i, name in enumerate(names):
+                # Skip surface tension records, since there is no appropriate general unit.
+                if name != "#Surf*SurfTen":
+                    key = self._sanitise_energy_term(name)
+                    self._energy_indices[key] = i
+                    self._energy_units[key] = self._convert_energy_unit(units[i])
+
+        if len(times) == 0:
+            return
+
+        # Append the new records.
+        self._energy_dict.extend("TIME", times)
+        for key, i in self._energy_indices.items():
+            self._energy_dict.extend(key, energies[:, i])
+
+    def _update_energy_dict_gmx(self):
+        """
+        Internal function to update the energy dictionary with the latest
+        data using 'gmx energy'.
+        """
+
+        if not hasattr(self, "_energy_keys"):
             self._initialise_energy_dict()
 
         keys = self._energy_keys
@@ -2479,10 +2717,10 @@ class Gromacs(_process.Process):
                 encoding="utf-8",
             )
             out = proc.stdout
-            results = _np.loadtxt(output_file, comments=["@", "#"])
+            results = _np.loadtxt(output_file, comments=["@", "#"], ndmin=2)
             units = self._parse_energy_units(out)
 
-            if len(units) != len(list(self._energy_dict)):
+            if len(units) != len(self._energy_columns):
                 raise ValueError(
                     "The number of energy units does not match the "
                     "number of energy terms."
@@ -2490,14 +2728,11 @@ class Gromacs(_process.Process):
 
         self._energy_units = {}
 
-        for i, key in enumerate(self._energy_dict):
-            if len(results.shape) == 1:
-                # Account for the case of single point energy
-                self._energy_dict[key] = [results[i]]
-                self._energy_units[key] = units[i]
-            else:
-                self._energy_dict[key] = [result for result in results[:, i]]
-                self._energy_units[key] = units[i]
+        # Replace the existing records.
+        self._energy_dict.clear()
+        for i, key in enumerate(self._energy_columns):
+            self._energy_dict.extend(key, results[:, i])
+            self._energy_units[key] = units[i]
 
     def _get_energy_record(self, key, time_series=False, unit=None):
         """Helper function to get a stdout record from the dictionary.
@@ -2537,17 +2772,18 @@ class Gromacs(_process.Process):
         # Return the list of dictionary values.
         if time_series:
             try:
-                if unit is None:
-                    return [x for x in self._energy_dict[key]]
-                else:
-                    return [
-                        (float(x) * unit)._to_default_unit()
-                        for x in self._energy_dict[key]
-                    ]
-
+                values = self._energy_dict.tolist(key)
             except KeyError:
                 return None
 
+            if unit is None:
+                return values
+            else:
+                return [
+                    None if x is None else (x * unit)._to_default_unit()
+                    for x in values
+                ]
+
         # Return the most recent dictionary value.
         else:
             try:
@@ -2556,7 +2792,7 @@ class Gromacs(_process.Process):
                 else:
                     return (float(self._energy_dict[key][-1]) * unit)._to_default_unit()
 
-            except KeyError:
+            except (KeyError, IndexError):
                 return None
 
     def _getFinalFrame(self):
@@ -2586,10 +2822,24 @@ class Gromacs(_process.Process):
                 )
                 return None
 
-            # Read the frame file.
-            new_system = _IO.readMolecules(
-                [self._crd_file, self._top_file], property_map=self._property_map
-            )
+            # Read the coordinates, velocities, and box from the frame file
+            # into a copy of the system that was written to the topology file.
+            new_system = None
+            if self._restart_template is not None:
+                try:
+                    new_system = _update_from_template(
+                        self._restart_template,
+                        *_read_gro(self._crd_file),
+                        property_map=self._property_map,
+                    )
+                except Exception:
+                    new_system = None
+
+            # Fall back to parsing the frame and topology files.
+            if new_system is None:
+                new_system = _IO.readMolecules(
+                    [self._crd_file, self._top_file], property_map=self._property_map
+                )
 
             # Create a copy of the existing system object.
             old_system = self._system.copy()
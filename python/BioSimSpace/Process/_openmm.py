@@ -101,6 +101,7 @@ class OpenMM(_process.Process):
         work_dir=None,
         seed=None,
         property_map={},
+        previous_process=None,
         **kwargs,
     ):
         """
@@ -144,6 +145,11 @@ class OpenMM(_process.Process):
             values. This allows the user to refer to properties with their
             own naming scheme, e.g. { "charge" : "my-charge" }
 
+        previous_process : :class:`Process.OpenMM <BioSimSpace.Process.OpenMM>`
+            An optional process for a previous stage in a chain of simulations.
+            If the topology of the system is unchanged, then the topology file
+            from the previous process is re-used rather than being re-written.
+
         kwargs : dict
             Additional keyword arguments.
         """
@@ -157,6 +163,7 @@ class OpenMM(_process.Process):
             work_dir=work_dir,
             seed=seed,
             property_map=property_map,
+            previous_process=previous_process,
         )
 
         # Set the package name.
@@ -265,6 +272,10 @@ class OpenMM(_process.Process):
     def _setup(self):
         """Setup the input files and working directory ready for simulation."""
 
+        # Fingerprint the topology so that it can be re-used in a chain of
+        # processes.
+        fingerprint = self._get_topology_fingerprint()
+
         # Create a copy of the system.
         system = self._system.copy()
 
@@ -308,18 +319,26 @@ class OpenMM(_process.Process):
                 else:
                     raise IOError(msg) from None
 
-        # PRM file (topology).
-        try:
-            file = _os.path.splitext(self._top_file)[0]
-            _IO.saveMolecules(
-                file, system, "prm7", match_water=False, property_map=self._property_map
-            )
-        except Exception as e:
-            msg = "Failed to write system to 'PRM7' format."
-            if _isVerbose():
-                raise IOError(msg) from e
-            else:
-                raise IOError(msg) from None
+        # PRM file (topology). This is re-used from the previous process if
+        # the topology is unchanged.
+        top_files = {"prm7": self._top_file}
+        if not self._reuse_topology(fingerprint, top_files):
+            try:
+                file = _os.path.splitext(self._top_file)[0]
+                _IO.saveMolecules(
+                    file,
+                    system,
+                    "prm7",
+                    match_water=False,
+                    property_map=self._property_map,
+                )
+            except Exception as e:
+                msg = "Failed to write system to 'PRM7' format."
+                if _isVerbose():
+                    raise IOError(msg) from e
+                else:
+                    raise IOError(msg) from None
+            self._store_topology(top_files)
 
         # Skip if the user has passed a custom config.
         if isinstance(self._protocol, _Protocol.Custom):
@@ -1315,6 +1334,21 @@ class OpenMM(_process.Process):
 
         return self
 
+    def _infer_gpus(self):
+        """
+        Internal helper function to infer the number of GPUs required by
+        the process from the platform.
+
+        Returns
+        -------
+
+        gpus : int
+            The number of GPUs.
+        """
+        if self._platform.upper() in ["CUDA", "OPENCL"]:
+            return 1
+        return 0
+
     def getSystem(self, block="AUTO"):
         """
         Get the latest molecular system.
@@ -2031,6 +2065,36 @@ class OpenMM(_process.Process):
                 "properties = {'OpenCLDeviceIndex': '%s'}" % opencl_devices
             )
 
+    def _set_visible_devices(self, devices):
+        """
+        Internal helper function to re-index the platform devices in the
+        OpenMM Python script when the process is run with a restricted set
+        of visible devices.
+
+        Parameters
+        ----------
+
+        devices : [str]
+            The device identifiers that will be visible to the process.
+        """
+
+        if self._platform == "CUDA":
+            key = "CudaDeviceIndex"
+        elif self._platform == "OpenCL":
+            key = "OpenCLDeviceIndex"
+        else:
+            return
+
+        # Devices are indexed relative to those that are visible.
+        index = ",".join(str(x) for x in range(len(devices)))
+
+        # Update the platform properties and re-write the script.
+        prefix = "properties = {'%s'" % key
+        for x, line in enumerate(self._config):
+            if line.startswith(prefix):
+                self._config[x] = "properties = {'%s': '%s'}" % (key, index)
+        self.writeConfig(self._config_file)
+
     def _add_config_restart(self):
         """Helper function to check for a restart file and load state information."""
 
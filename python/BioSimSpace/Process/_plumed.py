@@ -29,6 +29,8 @@ __all__ = ["Plumed"]
 from .._Utils import _try_import
 
 import glob as _glob
+import math as _math
+import numpy as _np
 import os as _os
 
 _pygtail = _try_import("pygtail")
@@ -53,9 +55,281 @@ from .. import Types as _Types
 from .. import _Utils
 from .. import Units as _Units
 
+from ._process import _ColumnDict
 from ._process import _MultiDict
 
 
+class _BiasGrid:
+    """
+    A metadynamics bias potential accumulated on a regular grid. Hills
+    are added incrementally, so the free-energy surface can be refreshed
+    cheaply while a simulation is running, without calling out to
+    'plumed sum_hills'.
+    """
+
+    # PLUMED truncates each Gaussian where the scaled squared distance,
+    # 0.5 * sum((dx / sigma)^2), exceeds this cutoff, stretching it so that
+    # it goes smoothly to zero.
+    _dp2_cutoff = 6.25
+
+    # The maximum number of hill and grid point pairs evaluated at once.
+    _batch_size = 2**22
+
+    def __init__(self, grid_data, periodic):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+
+        grid_data : [(float, float, int)]
+            The minimum, maximum, and number of bins for each component.
+            The strings "-pi" and "pi" are also accepted for the bounds.
+
+        periodic : [bool]
+            Whether each component is periodic.
+        """
+
+        self._axes = []
+        self._periods = []
+
+        for (minimum, maximum, bins), is_periodic in zip(grid_data, periodic):
+            minimum = self._to_float(minimum)
+            maximum = self._to_float(maximum)
+            bins = int(bins)
+
+            # PLUMED grids have an extra point for non-periodic variables,
+            # so that both bounds are included.
+            if is_periodic:
+                axis = minimum + (maximum - minimum) * _np.arange(bins) / bins
+                self._periods.append(maximum - minimum)
+            else:
+                axis = _np.linspace(minimum, maximum, bins + 1)
+                self._periods.append(None)
+
+            self._axes.append(axis)
+
+        self._shape = tuple(len(axis) for axis in self._axes)
+
+        # Coefficients used to stretch the truncated Gaussians.
+        exp_cutoff = _math.exp(-self._dp2_cutoff)
+        self._stretch_a = 1.0 / (1.0 - exp_cutoff)
+        self._stretch_b = -exp_cutoff / (1.0 - exp_cutoff)
+
+        self.clear()
+
+    @staticmethod
+    def _to_float(value):
+        """Convert a grid bound to a float."""
+        if value == "pi":
+            return _math.pi
+        elif value == "-pi":
+            return -_math.pi
+        return float(value)
+
+    def clear(self):
+        """Remove all hills from the grid."""
+        self._bias = _np.zeros(self._shape)
+        self._num_hills = 0
+
+    def axes(self):
+        """
+        Return the grid points along each component.
+
+        Returns
+        -------
+
+        axes : [numpy.ndarray]
+            The grid points.
+        """
+        return self._axes
+
+    def nHills(self):
+        """
+        Return the number of hills that have been added to the grid.
+
+        Returns
+        -------
+
+        num_hills : int
+            The number of hills.
+        """
+        return self._num_hills
+
+    def bias(self):
+        """
+        Return the current bias potential.
+
+        Returns
+        -------
+
+        bias : numpy.ndarray
+            The bias on the grid, with one axis per component.
+        """
+        return self._bias
+
+    def addHills(self, centers, sigmas, heights):
+        """
+        Add hills to the bias.
+
+        Parameters
+        ----------
+
+        centers : numpy.ndarray
+            A (hills, components) array of hill centres.
+
+        sigmas : numpy.ndarray
+            A (hills, components) array of hill widths.
+
+        heights : numpy.ndarray
+            The height of each hill.
+        """
+        self._bias += self._evaluate(centers, sigmas, heights)
+        self._num_hills += len(heights)
+
+    def series(self, centers, sigmas, heights, stride):
+        """
+        Return the bias after every 'stride' hills, and after the final
+        hill, starting from an empty grid.
+
+        Parameters
+        ----------
+
+        centers : numpy.ndarray
+            A (hills, components) array of hill centres.
+
+        sigmas : numpy.ndarray
+            A (hills, components) array of hill widths.
+
+        heights : numpy.ndarray
+            The height of each hill.
+
+        stride : int
+            The number of hills between each estimate.
+
+        Returns
+        -------
+
+        series : [numpy.ndarray]
+            The bias on the grid after each stride.
+        """
+        series = []
+        bias = _np.zeros(self._shape)
+        for start in range(0, len(heights), stride):
+            end = start + stride
+            bias = bias + self._evaluate(
+                centers[start:end], sigmas[start:end], heights[start:end]
+            )
+            series.append(bias)
+        return series
+
+    def freeEnergy(self, bias, index=None, kt=1.0):
+        """
+        Convert a bias on the grid to a free-energy surface, in the same
+        layout as 'plumed sum_hills --mintozero'.
+
+        Parameters
+        ----------
+
+        bias : numpy.ndarray
+            The bias on the grid, as returned by 'bias' or 'series'.
+
+        index : int
+            The index of the component to project onto, integrating out
+            the others. If None, then the full surface is returned.
+
+        kt : float
+            The temperature in energy units for integrating out components.
+
+        Returns
+        -------
+
+        grid, fes : [numpy.ndarray], numpy.ndarray
+            The grid points for each component that is kept, and the free
+            energy at each point, shifted so that the minimum is zero. As
+            for PLUMED, the first component varies fastest.
+        """
+
+        # The free energy is the negative of the bias. (PLUMED stores
+        # well-tempered hill heights already rescaled by the bias factor.)
+        fes = -bias
+
+        if index is None:
+            grid = [
+                points.ravel(order="F")
+                for points in _np.meshgrid(*self._axes, indexing="ij")
+            ]
+            fes = fes.ravel(order="F")
+        else:
+            index = index % len(self._axes)
+            grid = [self._axes[index]]
+
+            # Integrate out the other components.
+            others = tuple(x for x in range(fes.ndim) if x != index)
+            if len(others) > 0:
+                fes = -fes / kt
+                fes_max = fes.max(axis=others, keepdims=True)
+                fes = -kt * (
+                    _np.log(_np.exp(fes - fes_max).sum(axis=others))
+                    + fes_max.reshape(-1)
+                )
+
+        # Shift the minimum to zero.
+        return grid, fes - fes.min()
+
+    def _evaluate(self, centers, sigmas, heights):
+        """
+        Sum the given hills over the grid.
+
+        Parameters
+        ----------
+
+        centers : numpy.ndarray
+            A (hills, components) array of hill centres.
+
+        sigmas : numpy.ndarray
+            A (hills, components) array of hill widths.
+
+        heights : numpy.ndarray
+            The height of each hill.
+
+        Returns
+        -------
+
+        bias : numpy.ndarray
+            The sum of the hills on the grid.
+        """
+
+        bias = _np.zeros(self._shape)
+        num_dims = len(self._axes)
+        batch = max(1, self._batch_size // bias.size)
+
+        for start in range(0, len(heights), batch):
+            end = start + batch
+
+            # Accumulate the scaled squared distance between each hill and
+            # grid point, broadcasting the per-component distances.
+            dp2 = 0.0
+            for dim, (axis, period) in enumerate(zip(self._axes, self._periods)):
+                dx = axis[None, :] - centers[start:end, dim, None]
+                if period is not None:
+                    dx -= period * _np.round(dx / period)
+                shape = [dx.shape[0]] + [1] * num_dims
+                shape[dim + 1] = len(axis)
+                dp2 = dp2 + (0.5 * (dx / sigmas[start:end, dim, None]) ** 2).reshape(
+                    shape
+                )
+
+            gaussians = _np.where(
+                dp2 < self._dp2_cutoff,
+                self._stretch_a * _np.exp(-dp2) + self._stretch_b,
+                0.0,
+            )
+            bias += _np.tensordot(heights[start:end], gaussians, axes=1)
+
+        return bias
+
+
 class Plumed:
     """A class for interfacing with PLUMED."""
 
@@ -142,7 +416,15 @@ class Plumed:
 
         # Initialise dictionaries to hold COLVAR and HILLS time-series records.
         self._colvar_dict = _MultiDict()
-        self._hills_dict = _MultiDict()
+        self._hills_dict = _ColumnDict()
+
+        # The HILLS file is also read when computing free energies, so it
+        # keeps its own byte offset.
+        self._hills_offset = 0
+
+        # The bias potential accumulated from the HILLS file. This is only
+        # available when a grid has been specified for all components.
+        self._bias_grid = None
 
         # Initialise lists to store the keys used to index the above dictionary.
         self._colvar_keys = []
@@ -258,6 +540,11 @@ class Plumed:
         except:
             pass
 
+        # The HILLS file will be re-read from the start.
+        self._hills_offset = 0
+        self._hills_dict.clear()
+        self._bias_grid = None
+
         # Restart if existing HILLS and COLVAR files are present.
         if _os.path.isfile(self._colvar_file) and _os.path.isfile(self._hills_file):
             is_restart = True
@@ -451,8 +738,10 @@ class Plumed:
         num_center = 0
         num_fixed = 0
 
-        # Initialise a list to store the grid data for each variable.
+        # Initialise lists to store the grid data for each variable, and
+        # whether each is periodic.
         grid_data = []
+        grid_periodic = []
 
         # Initialise the METAD string.
         metad_string = "metad: METAD ARG="
@@ -785,6 +1074,7 @@ class Plumed:
             if grid is not None:
                 if is_torsion:
                     grid_data.append(("-pi", "pi", grid.getBins()))
+                    grid_periodic.append(True)
                 elif is_funnel:
                     # Grid for "projection" component.
                     grid_data.append(
@@ -802,6 +1092,7 @@ class Plumed:
                             grid[1].getBins(),
                         )
                     )
+                    grid_periodic.extend([False, False])
                 else:
                     try:
                         # Unit based.
@@ -817,6 +1108,7 @@ class Plumed:
                         grid_data.append(
                             (grid.getMinimum(), grid.getMaximum(), grid.getBins())
                         )
+                    grid_periodic.append(False)
 
             # Add the argument to the METAD record. We join argument names with
             # a "," to handle multi-component collective variables.
@@ -878,6 +1170,11 @@ class Plumed:
                 metad_string += " GRID_RFILE=GRID"
             metad_string += " CALC_RCT"
 
+            # Accumulate the bias on the same grid when all components have
+            # one, so that free energies can be computed in-process.
+            if len(grid_data) == len(self._colvar_name):
+                self._bias_grid = _BiasGrid(grid_data, grid_periodic)
+
         # Temperature and bias parameters.
         metad_string += " TEMP=%s" % protocol.getTemperature().kelvin().value()
         if protocol.getBiasFactor() is not None:
@@ -941,6 +1238,7 @@ class Plumed:
         self._colvar_unit = {}
         self._config = []
         self._aux_files = []
+        self._bias_grid = None
 
         # Always remove pygtail offset files.
         try:
@@ -1399,6 +1697,14 @@ class Plumed:
         """
         Get the current free energy estimate.
 
+        When a grid was specified for every collective variable component,
+        the hills are summed in-process and the free energy is returned on
+        the same grid as the metadynamics bias, i.e. between the protocol's
+        grid bounds with its number of bins (plus one point for non-periodic
+        components). Otherwise 'plumed sum_hills' is used, which chooses
+        the grid from the range spanned by the hills, so the number and
+        location of the points can differ between the two.
+
         Parameters
         ----------
 
@@ -1418,6 +1724,9 @@ class Plumed:
         kt : :class:`Energy <BioSimSpace.Types.Energy>`
             The temperature in energy units for integrating out variables.
 
+        Returns
+        -------
+
         free_energies : [:class:`Type <BioSimSpace.Types>`, ...], \
                         [[:class:`Type <BioSimSpace.Types>`, :class:`Type <BioSimSpace.Types>`, ...], ...]
             The free energy estimate for the chosen collective variables.
@@ -1453,6 +1762,10 @@ class Plumed:
         if kt <= 0:
             raise ValueError("'kt' must have value > 0")
 
+        # Sum the hills in-process if the bias is being accumulated on a grid.
+        if self._bias_grid is not None:
+            return self._get_grid_free_energy(index, stride, kt)
+
         # Delete any existing FES directotry and create a new one.
         _shutil.rmtree(_os.path.join(str(self._work_dir), "fes"), ignore_errors=True)
         _os.makedirs(_os.path.join(str(self._work_dir), "fes"))
@@ -1565,6 +1878,106 @@ class Plumed:
 
         return tuple(free_energies)
 
+    def _get_grid_free_energy(self, index, stride, kt):
+        """
+        Compute the free energy from the bias accumulated on the grid. Only
+        hills that have been added to the HILLS file since the last call are
+        summed, unless a stride is requested.
+
+        Parameters
+        ----------
+
+        index : int
+            The index of the collective variable component. If None, then
+            all components will be considered.
+
+        stride : int
+            The number of hills between each free energy estimate.
+
+        kt : float
+            The temperature in kJ/mol for integrating out variables.
+
+        Returns
+        -------
+
+        free_energies : tuple
+            The free energy estimate, formatted as for 'getFreeEnergy'.
+        """
+
+        # Read any new hills.
+        self._update_hills_dict()
+
+        if "height" not in self._hills_dict:
+            raise RuntimeError(
+                "Failed to generate free energy estimate.\n"
+                "Error: No hills have been deposited."
+            )
+
+        heights = self._hills_dict["height"]
+        centers = _np.column_stack(
+            [self._hills_dict[name] for name in self._colvar_name]
+        )
+        sigmas = _np.column_stack(
+            [self._hills_dict["sigma_" + name] for name in self._colvar_name]
+        )
+
+        # Add the new hills to the running bias.
+        start = self._bias_grid.nHills()
+        if start < len(heights):
+            self._bias_grid.addHills(centers[start:], sigmas[start:], heights[start:])
+
+        if stride:
+            biases = self._bias_grid.series(centers, sigmas, heights, stride)
+        else:
+            biases = [self._bias_grid.bias()]
+
+        if index is not None:
+            names = [self._colvar_name[index]]
+        else:
+            names = self._colvar_name
+
+        free_energies = []
+
+        for bias in biases:
+            grid, fes = self._bias_grid.freeEnergy(bias, index, kt)
+
+            free_energy = [
+                self._to_colvar_unit(points, name) for points, name in zip(grid, names)
+            ]
+            free_energy.append([float(x) * _Units.Energy.kj_per_mol for x in fes])
+
+            free_energies.append(tuple(free_energy))
+
+        if len(free_energies) == 1:
+            return free_energies[0]
+        else:
+            return tuple(free_energies)
+
+    def _to_colvar_unit(self, values, name):
+        """
+        Convert collective variable values to their unit.
+
+        Parameters
+        ----------
+
+        values : numpy.ndarray
+            The values.
+
+        name : str
+            The name of the collective variable component.
+
+        Returns
+        -------
+
+        values : [:class:`Type <BioSimSpace.Types>`], [float]
+            The values in the unit of the collective variable.
+        """
+        unit = self._colvar_unit[name]
+        if unit is None:
+            return [float(x) for x in values]
+        else:
+            return [float(x) * unit for x in values]
+
     def _update_colvar_dict(self):
         """Read the COLVAR file and update any records."""
 
@@ -1605,23 +2018,53 @@ class Plumed:
                         self._colvar_dict[key] = value
 
     def _update_hills_dict(self):
-        """Read the HILLS file and update any records."""
+        """
+        Read any complete lines that have been appended to the HILLS file
+        and update the records.
+        """
 
         # Exit if the HILLS file hasn't been created.
         if not _os.path.isfile(self._hills_file):
             return
 
-        # Loop over all new lines in the file.
-        for line in _pygtail.Pygtail(self._hills_file):
+        # The file has been truncated, so start again.
+        if _os.path.getsize(self._hills_file) < self._hills_offset:
+            self._hills_offset = 0
+            self._hills_dict.clear()
+            if self._bias_grid is not None:
+                self._bias_grid.clear()
+
+        # Read the new data.
+        with open(self._hills_file, "rb") as f:
+            f.seek(self._hills_offset)
+            data = f.read()
+
+        # Only consume complete lines. PLUMED may be part way through writing
+        # a hill, which will be read once it has been completed.
+        end = data.rfind(b"\n")
+        if end == -1:
+            return
+        self._hills_offset += end + 1
+
+        # Collect all new data records in the file.
+        records = []
+        for line in data[: end + 1].decode("utf-8", errors="replace").splitlines():
             # Is this a header line. If so, store the keys.
             if line[3:9] == "FIELDS":
                 self._hills_keys = line[10:].split()
 
-            # This is an actual data record. Update the multi-dictionary.
-            elif line[0] != "#":
-                data = [float(x) for x in line.split()]
-                for key, value in zip(self._hills_keys, data):
-                    self._hills_dict[key] = value
+            # This is an actual data record.
+            elif line and line[0] != "#":
+                record = line.split()
+                # Skip malformed records.
+                if len(record) == len(self._hills_keys):
+                    records.append(record)
+
+        # Convert the records in one go and update the columns.
+        if len(records) > 0:
+            data = _np.array(records, dtype=_np.float64)
+            for x, key in enumerate(self._hills_keys):
+                self._hills_dict.extend(key, data[:, x])
 
     def _get_colvar_record(self, key, time_series=False, unit=None):
         """
@@ -1729,9 +2172,9 @@ class Plumed:
         if time_series:
             try:
                 if unit is None:
-                    return self._hills_dict[key]
+                    return [float(x) for x in self._hills_dict[key]]
                 else:
-                    return [x * unit for x in self._hills_dict[key]]
+                    return [float(x) * unit for x in self._hills_dict[key]]
 
             except KeyError:
                 return None
@@ -1740,9 +2183,9 @@ class Plumed:
         else:
             try:
                 if unit is None:
-                    return self._hills_dict[key][-1]
+                    return float(self._hills_dict[key][-1])
                 else:
-                    return self._hills_dict[key][-1] * unit
+                    return float(self._hills_dict[key][-1]) * unit
 
             except KeyError:
                 return None
@@ -28,7 +28,10 @@ __all__ = ["Process"]
 
 import collections as _collections
 import glob as _glob
+import math as _math
+import numpy as _np
 import os as _os
+import shutil as _shutil
 
 from .._Utils import _try_import
 
@@ -55,6 +58,26 @@ if _is_notebook:
     from IPython.display import FileLink as _FileLink
 
 
+def _get_file_stat(path):
+    """
+    Internal helper function to return the inode, modification time, and size
+    of a file, used to check whether the file has changed.
+
+    Returns
+    -------
+
+    stat : (int, int, int)
+        The inode, modification time in nanoseconds, and size in bytes, or
+        None if the file doesn't exist.
+    """
+    try:
+        stat = _os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
 class _MultiDict(dict):
     """A multi-valued dictionary."""
 
@@ -63,6 +86,161 @@ class _MultiDict(dict):
         self.setdefault(key, []).append(value)
 
 
+class _ColumnDict:
+    """
+    A dictionary of growable float64 columns. Records are converted to
+    floating point once, when they are appended, and the columns are
+    returned as read-only NumPy views, so that time series can be
+    queried repeatedly without any further conversion. Missing values
+    are stored as NaN. Use 'tolist' or 'copy' to get the records as
+    lists, as returned by the public API.
+    """
+
+    # The initial capacity of each column.
+    _initial_capacity = 64
+
+    def __init__(self):
+        """Constructor."""
+        self._columns = {}
+        self._sizes = {}
+
+    def append(self, key, value):
+        """
+        Append a value to the column for the given key.
+
+        Parameters
+        ----------
+
+        key : str
+            The record key.
+
+        value : float, str, None
+            The value. Values that can't be converted to float are stored
+            as NaN.
+        """
+
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = _np.nan
+
+        try:
+            column = self._columns[key]
+            size = self._sizes[key]
+        except KeyError:
+            column = _np.empty(self._initial_capacity, dtype=_np.float64)
+            size = 0
+
+        # Double the capacity of the column when it is full.
+        if size == len(column):
+            new_column = _np.empty(2 * len(column), dtype=_np.float64)
+            new_column[:size] = column
+            column = new_column
+
+        column[size] = value
+        self._columns[key] = column
+        self._sizes[key] = size + 1
+
+    def extend(self, key, values):
+        """
+        Append multiple values to the column for the given key.
+
+        Parameters
+        ----------
+
+        key : str
+            The record key.
+
+        values : numpy.ndarray, [float]
+            The values.
+        """
+
+        values = _np.asarray(values, dtype=_np.float64)
+
+        try:
+            column = self._columns[key]
+            size = self._sizes[key]
+        except KeyError:
+            column = _np.empty(self._initial_capacity, dtype=_np.float64)
+            size = 0
+
+        # Grow the column to fit the new values.
+        new_size = size + len(values)
+        if new_size > len(column):
+            capacity = len(column)
+            while capacity < new_size:
+                capacity *= 2
+            new_column = _np.empty(capacity, dtype=_np.float64)
+            new_column[:size] = column[:size]
+            column = new_column
+
+        column[size:new_size] = values
+        self._columns[key] = column
+        self._sizes[key] = new_size
+
+    def clear(self):
+        """Remove all columns."""
+        self._columns.clear()
+        self._sizes.clear()
+
+    def __getitem__(self, key):
+        """Return a read-only view of the column for the given key."""
+        view = self._columns[key][: self._sizes[key]]
+        view.flags.writeable = False
+        return view
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def keys(self):
+        """Return the record keys."""
+        return self._columns.keys()
+
+    def values(self):
+        """Return views of the columns."""
+        return [self[key] for key in self._columns]
+
+    def items(self):
+        """Return (key, column) pairs."""
+        return [(key, self[key]) for key in self._columns]
+
+    def tolist(self, key):
+        """
+        Return the column for the given key as a list.
+
+        Parameters
+        ----------
+
+        key : str
+            The record key.
+
+        Returns
+        -------
+
+        values : [float]
+            The values, with missing values returned as None.
+        """
+        return [None if _math.isnan(x) else x for x in self[key].tolist()]
+
+    def copy(self):
+        """
+        Return a dictionary mapping each key to a list of its values.
+
+        Returns
+        -------
+
+        records : dict
+            The dictionary of records, with missing values returned as None.
+        """
+        return {key: self.tolist(key) for key in self._columns}
+
+
 class Process:
     """Base class for running different biomolecular simulation processes."""
 
@@ -78,6 +256,7 @@ class Process:
         extra_lines=[],
         extra_args={},
         property_map={},
+        previous_process=None,
     ):
         """
         Constructor.
@@ -123,6 +302,13 @@ class Process:
             A dictionary that maps system "properties" to their user defined
             values. This allows the user to refer to properties with their
             own naming scheme, e.g. { "charge" : "my-charge" }
+
+        previous_process : :class:`Process <BioSimSpace.Process>`
+            An optional process for a previous stage in a chain of simulations,
+            e.g. minimisation followed by equilibration. If the topology of
+            the system is unchanged, i.e. only the coordinates, velocities, or
+            box dimensions differ, then the topology files from the previous
+            process are re-used rather than being re-written.
         """
 
         # Don't allow user to create an instance of this base class.
@@ -205,6 +391,10 @@ class Process:
         if not isinstance(property_map, dict):
             raise TypeError("'property_map' must be of type 'dict'")
 
+        # Check that the previous process is valid.
+        if previous_process is not None and not isinstance(previous_process, Process):
+            raise TypeError("'previous_process' must be of type 'BioSimSpace.Process'")
+
         # Make sure that molecules in the system have coordinates.
         prop = property_map.get("coordinates", "coordinates")
         for mol in system.getMolecules():
@@ -268,9 +458,28 @@ class Process:
         self._timer = None
         self._runtime = None
 
+        # The number of CPUs and GPUs required by the process. If None, then
+        # these are inferred from the command-line arguments and environment.
+        self._num_cpus = None
+        self._num_gpus = None
+
         # Set the command-line string to None
         self._command = None
 
+        # The topology fingerprint and files written by this process, and
+        # those written by the previous process in the chain, if any. Only
+        # the topology information is stored, so that the previous process,
+        # and its working directory, can be garbage collected.
+        self._topology_fingerprint = None
+        self._topology_files = {}
+        if previous_process is None:
+            self._previous_topology = None
+        else:
+            self._previous_topology = (
+                previous_process._topology_fingerprint,
+                previous_process._topology_files.copy(),
+            )
+
         # Set the list of input files to None.
         self._input_files = None
 
@@ -358,6 +567,10 @@ class Process:
             offset_files.remove(_os.path.join(str(self._work_dir), "HILLS.offset"))
         except:
             pass
+        try:
+            offset_files.remove(_os.path.join(str(self._work_dir), "HILLS.bias.offset"))
+        except:
+            pass
 
         for file in offset_files:
             _os.remove(file)
@@ -753,6 +966,201 @@ class Process:
 
         return system
 
+    def _get_topology_fingerprint(self, *args):
+        """
+        Internal helper function to compute a fingerprint for the topology
+        of the system, i.e. everything that is written to a topology file.
+        Coordinates, velocities, and box dimensions are ignored. The
+        fingerprint uses the Sire property version numbers, so is only
+        valid within the current session.
+
+        Parameters
+        ----------
+
+        args : tuple
+            Any additional settings that affect how the topology is written.
+
+        Returns
+        -------
+
+        fingerprint : int
+            The topology fingerprint, or None if it couldn't be computed.
+        """
+
+        # Properties that aren't written to topology files.
+        excluded = set(
+            self._property_map.get(x, x)
+            for x in [
+                "coordinates",
+                "coordinates0",
+                "coordinates1",
+                "velocity",
+                "velocity0",
+                "velocity1",
+                "space",
+                "fileformat",
+            ]
+        )
+
+        try:
+            sire_system = self._system._sire_object
+
+            # Molecules with the same number and property versions have the
+            # same properties. The major version changes when atoms are added,
+            # removed, or renamed.
+            mol_keys = []
+            for num in self._system._mol_nums:
+                mol = sire_system[num]
+                props = tuple(
+                    (prop, mol.version(prop))
+                    for prop in sorted(mol.propertyKeys())
+                    if prop not in excluded
+                )
+                mol_keys.append((num.value(), mol.version().majorVersion(), props))
+
+            # System properties, e.g. force field metadata.
+            sys_props = tuple(
+                (prop, str(sire_system.property(prop)))
+                for prop in sorted(sire_system.propertyKeys())
+                if prop not in excluded
+            )
+
+            # Only the shape of the box can affect the topology. The box
+            # dimensions are read from the coordinate file.
+            box, angles = self._system.getBox(property_map=self._property_map)
+            if box is not None:
+                angles = tuple(round(x.value(), 4) for x in angles)
+
+            return hash(
+                (
+                    type(self).__name__,
+                    tuple(sorted((k, str(v)) for k, v in self._property_map.items())),
+                    tuple(mol_keys),
+                    sys_props,
+                    angles,
+                    args,
+                )
+            )
+        # Warn, rather than fail, since the topology can still be written.
+        except Exception as e:
+            _warnings.warn(
+                f"Unable to fingerprint the topology, so it won't be re-used: {e}"
+            )
+            return None
+
+    def _reuse_topology(self, fingerprint, files):
+        """
+        Internal helper function to re-use the topology files from the previous
+        process in a chain, if the topology is unchanged. The files are hard
+        linked if possible, otherwise they are copied.
+
+        Parameters
+        ----------
+
+        fingerprint : int
+            The topology fingerprint for this process.
+
+        files : dict
+            A dictionary mapping the file format to the path of each topology
+            file for this process.
+
+        Returns
+        -------
+
+        is_reused : bool
+            Whether the topology files were re-used. If not, then the caller
+            must write them.
+        """
+
+        self._topology_fingerprint = fingerprint
+        self._topology_files = {}
+
+        if self._link_topology(files):
+            self._store_topology(files)
+            return True
+
+        # Existing files may be hard links to those of another process, so
+        # remove them to make sure that they aren't modified when the new
+        # topology is written.
+        for path in files.values():
+            try:
+                if _os.stat(path).st_nlink > 1:
+                    _os.remove(path)
+            except OSError:
+                pass
+
+        return False
+
+    def _link_topology(self, files):
+        """
+        Internal helper function to link the topology files from the previous
+        process in a chain to those of this process.
+
+        Parameters
+        ----------
+
+        files : dict
+            A dictionary mapping the file format to the path of each topology
+            file for this process.
+
+        Returns
+        -------
+
+        is_linked : bool
+            Whether the files were linked.
+        """
+
+        if self._topology_fingerprint is None or self._previous_topology is None:
+            return False
+
+        previous_fingerprint, previous_files = self._previous_topology
+        if self._topology_fingerprint != previous_fingerprint or set(files) != set(
+            previous_files
+        ):
+            return False
+
+        # Make sure the files haven't been modified since they were written.
+        for path, stat in previous_files.values():
+            if _get_file_stat(path) != stat:
+                return False
+
+        for format, path in files.items():
+            previous_path = previous_files[format][0]
+            try:
+                if _os.path.exists(path):
+                    if _os.path.samefile(path, previous_path):
+                        continue
+                    _os.remove(path)
+                try:
+                    _os.link(previous_path, path)
+                except OSError:
+                    _shutil.copyfile(previous_path, path)
+            except OSError:
+                return False
+
+        return True
+
+    def _store_topology(self, files):
+        """
+        Internal helper function to record the topology files written by this
+        process, so that they can be re-used by the next process in a chain.
+
+        Parameters
+        ----------
+
+        files : dict
+            A dictionary mapping the file format to the path of each topology
+            file for this process.
+        """
+
+        if self._topology_fingerprint is None:
+            return
+
+        self._topology_files = {
+            format: (_os.path.abspath(path), _get_file_stat(path))
+            for format, path in files.items()
+        }
+
     def start(self):
         """
         Start the process.
@@ -818,8 +1226,9 @@ class Process:
             if not isinstance(protocol, _Protocol):
                 raise TypeError("'protocol' must be of type 'BioSimSpace.Protocol'")
 
-        # Create the new process.
-        process = type(self)(system, protocol)
+        # Create the new process, re-using the topology of this process if
+        # it is unchanged.
+        process = type(self)(system, protocol, previous_process=self)
 
         # Return the new process object.
         if auto_start:
@@ -1564,6 +1973,126 @@ class Process:
         """Reset the command-line arguments."""
         self._generate_args()
 
+    def getCPUs(self):
+        """
+        Return the number of CPUs required by the process. Unless set
+        explicitly, this is inferred from the command-line arguments and
+        the OMP_NUM_THREADS environment variable.
+
+        Returns
+        -------
+
+        cpus : int
+            The number of CPUs.
+        """
+        if self._num_cpus is not None:
+            return self._num_cpus
+        return self._infer_cpus()
+
+    def setCPUs(self, cpus):
+        """
+        Set the number of CPUs required by the process. This is used by the
+        :class:`ProcessRunner <BioSimSpace.Process.ProcessRunner>` when
+        packing processes into the available resources.
+
+        Parameters
+        ----------
+
+        cpus : int
+            The number of CPUs. Use None to infer the value.
+        """
+
+        if cpus is not None:
+            if not type(cpus) is int:
+                raise TypeError("'cpus' must be of type 'int'.")
+            if cpus < 1:
+                raise ValueError("'cpus' must be > 0.")
+
+        self._num_cpus = cpus
+
+    def getGPUs(self):
+        """
+        Return the number of GPUs required by the process. Unless set
+        explicitly, this is inferred from the executable, platform, or
+        command-line arguments.
+
+        Returns
+        -------
+
+        gpus : int
+            The number of GPUs.
+        """
+        if self._num_gpus is not None:
+            return self._num_gpus
+        return self._infer_gpus()
+
+    def setGPUs(self, gpus):
+        """
+        Set the number of GPUs required by the process. This is used by the
+        :class:`ProcessRunner <BioSimSpace.Process.ProcessRunner>` when
+        packing processes into the available resources.
+
+        Parameters
+        ----------
+
+        gpus : int
+            The number of GPUs. Use None to infer the value.
+        """
+
+        if gpus is not None:
+            if not type(gpus) is int:
+                raise TypeError("'gpus' must be of type 'int'.")
+            if gpus < 0:
+                raise ValueError("'gpus' cannot be negative!")
+
+        self._num_gpus = gpus
+
+    def _infer_cpus(self):
+        """
+        Internal helper function to infer the number of CPUs required by
+        the process. Derived classes should override this if the number
+        can be determined from their command-line arguments.
+
+        Returns
+        -------
+
+        cpus : int
+            The number of CPUs.
+        """
+        try:
+            return max(1, int(_os.environ.get("OMP_NUM_THREADS", 1)))
+        except ValueError:
+            return 1
+
+    def _infer_gpus(self):
+        """
+        Internal helper function to infer the number of GPUs required by
+        the process. Derived classes should override this if the number
+        can be determined from their executable, platform, or arguments.
+
+        Returns
+        -------
+
+        gpus : int
+            The number of GPUs.
+        """
+        return 0
+
+    def _set_visible_devices(self, devices):
+        """
+        Internal helper function called by the ProcessRunner before the
+        process is started with a restricted set of visible GPU devices.
+        Derived classes should override this if device indices are baked
+        into their input files.
+
+        Parameters
+        ----------
+
+        devices : [str]
+            The device identifiers that will be visible to the process.
+        """
+        pass
+
     def runTime(self):
         """
         Return the running time for the process (in minutes).
@@ -26,16 +26,53 @@ __email__ = "lester.hedges@gmail.com"
 
 __all__ = ["ProcessRunner"]
 
+from contextlib import contextmanager as _contextmanager
+
 import os as _os
+import queue as _queue
 import tempfile as _tempfile
 import threading as _threading
 import time as _time
+import timeit as _timeit
 
 from .._SireWrappers import System as _System
+from .. import Units as _Units
+from .. import _Utils
 
 from ._process import Process as _Process
 
 
+@_contextmanager
+def _affinity(cores):
+    """
+    Execute the context with the CPU affinity of the calling thread
+    restricted to the given cores. Sub-processes launched within the
+    context inherit the affinity.
+
+    Parameters
+    ----------
+
+    cores : [int]
+        The core ids. If None, then the affinity is unchanged.
+    """
+
+    if cores is None or not hasattr(_os, "sched_setaffinity"):
+        yield
+        return
+
+    # Store the current affinity and pin the thread.
+    old_cores = _os.sched_getaffinity(0)
+    _os.sched_setaffinity(0, cores)
+
+    # Execute the context.
+    try:
+        yield
+
+    # Restore the original affinity.
+    finally:
+        _os.sched_setaffinity(0, old_cores)
+
+
 class ProcessRunner:
     """
     A class for managing and running multiple simulation processes, e.g.
@@ -49,17 +86,25 @@ class ProcessRunner:
     which can handle the running of processes for you, both in serial and
     parallel.
 
-    At present there is no way to allocate specific compute resources to
-    individual processes. As such, unless you have access to a large amount
-    of compute, when executing the runner in parallel we recommend that the
-    individual processes are serial in nature. BioSimSpace is not intended
-    to be a workflow manager and the ProcessRunner is only meant to help
-    facilitate running of more complex, multi-leg simulation processes. If
-    you desire more fine-grained resource control we recommend breaking your
-    workflow into separate :class:`nodes <BioSimSpace.Gateway.Node>`, which
-    can be run independently and allocated their own specific resources.
+    By default, each process is treated as a single slot, so unless you have
+    access to a large amount of compute, when executing the runner in parallel
+    we recommend that the individual processes are serial in nature. When
+    processes have differing requirements, the runner can instead be started
+    in resource-aware mode, where processes are packed into the available CPU
+    and GPU budget according to their individual needs.
+
+    BioSimSpace is not intended to be a workflow manager and the ProcessRunner
+    is only meant to help facilitate running of more complex, multi-leg
+    simulation processes. If you desire more fine-grained resource control we
+    recommend breaking your workflow into separate
+    :class:`nodes <BioSimSpace.Gateway.Node>`, which can be run independently
+    and allocated their own specific resources.
     """
 
+    # The maximum time (in seconds) that the scheduler will sleep while waiting
+    # for a process to exit before re-checking the state of the queue.
+    _max_wait = 60
+
     def __init__(self, processes, name="runner", work_dir=None):
         """
         Constructor.
@@ -117,6 +162,10 @@ class ProcessRunner:
         # Flag that the runner hasn't been killed.
         self._is_killed = False
 
+        # A queue used by watcher threads to notify the runner that a
+        # process has exited.
+        self._events = _queue.Queue()
+
         # Set the name.
         self.setName(name)
 
@@ -126,9 +175,7 @@ class ProcessRunner:
 
         # Initialise the state for each process.
         for p in self._processes:
-            p._is_queued = True
-            p._is_finished = False
-            p._num_failed = 0
+            self._reset_state(p)
 
     def __str__(self):
         """Return a human readable string representation of the object."""
@@ -250,9 +297,10 @@ class ProcessRunner:
         num_processes = self.nProcesses()
         for x in range(0, len(processes)):
             idx = num_processes - x - 1
-            self._processes[idx]._is_queued = True
-            self._processes[idx]._is_finished = False
-            self._processes[idx]._num_failed = 0
+            self._reset_state(self._processes[idx])
+
+        # Wake the scheduler so that the new processes are picked up.
+        self._events.put(None)
 
     def removeProcess(self, index):
         """
@@ -523,7 +571,15 @@ class ProcessRunner:
         # Start the process.
         self._processes[index].start()
 
-    def startAll(self, serial=False, batch_size=None, max_retries=5):
+    def startAll(
+        self,
+        serial=False,
+        batch_size=None,
+        max_retries=5,
+        resource_aware=False,
+        cpus=None,
+        gpus=None,
+    ):
         """
         Start all of the processes.
 
@@ -541,10 +597,37 @@ class ProcessRunner:
         batch_size : int
             When running in parallel, how many processes to run at any
             one time. If set to None, then the batch size will be set
-            to the output of multiprocess.cpu_count().
+            to the output of multiprocess.cpu_count(), or the number of
+            CPUs in the budget when running in resource-aware mode.
 
         max_retries : int
             How many times to retry a process if it fails.
+
+        resource_aware : bool
+            When running in parallel, whether to pack processes into the
+            available CPU and GPU budget according to the number of each
+            required by the individual processes. (See
+            :meth:`getCPUs <BioSimSpace.Process.Process.getCPUs>` and
+            :meth:`getGPUs <BioSimSpace.Process.Process.getGPUs>`.) Each
+            running process is pinned to its own set of cores and sees
+            only the GPU devices allocated to it, if any, via the
+            CUDA_VISIBLE_DEVICES and OPENCL_VISIBLE_DEVICES environment
+            variables. In this mode,
+            batch_size is an additional limit on the number of processes
+            that can run at one time.
+
+        cpus : int
+            The number of CPUs available when running in resource-aware
+            mode. If None, then the value from the
+            :data:`ResourceManager <BioSimSpace.Gateway.ResourceManager>`
+            will be used, falling back to the number of available cores.
+
+        gpus : int
+            The number of GPUs available when running in resource-aware
+            mode. If None, then the value from the
+            :data:`ResourceManager <BioSimSpace.Gateway.ResourceManager>`
+            will be used, falling back to the number of devices listed in
+            the CUDA_VISIBLE_DEVICES environment variable.
         """
 
         if self.nProcesses() == 0:
@@ -560,10 +643,6 @@ class ProcessRunner:
                 raise TypeError("'batch_size' must be of type 'int'.")
             if batch_size < 1:
                 raise ValueError("'batch_size' must be > 1.")
-        else:
-            from multiprocessing import cpu_count
-
-            batch_size = cpu_count()
 
         if not type(max_retries) is int:
             raise TypeError("'max_retries' must be of type 'int'.")
@@ -571,6 +650,35 @@ class ProcessRunner:
         if max_retries < 1:
             raise ValueError("'max_retries' must be > 0.")
 
+        if not isinstance(resource_aware, bool):
+            raise TypeError("'resource_aware' must be of type 'bool'.")
+
+        # Work out the resources available to the processes.
+        if resource_aware and not serial:
+            resources = self._get_resources(cpus, gpus)
+
+            # Make sure that every process can fit within the budget.
+            num_cores = len(resources["cores"])
+            num_devices = len(resources["devices"])
+            for p in self._processes:
+                if p.getCPUs() > num_cores or p.getGPUs() > num_devices:
+                    raise ValueError(
+                        f"Process '{p.getName()}' requires {p.getCPUs()} CPUs and "
+                        f"{p.getGPUs()} GPUs, but only {num_cores} CPUs and "
+                        f"{num_devices} GPUs are available!"
+                    )
+
+            # There can't be more processes than cores.
+            if batch_size is None:
+                batch_size = num_cores
+        else:
+            resources = None
+
+            if batch_size is None:
+                from multiprocessing import cpu_count
+
+                batch_size = cpu_count()
+
         # Set up the background thread.
         if self._thread is None or not self._thread.is_alive():
             # Flag that the runner is alive.
@@ -578,7 +686,8 @@ class ProcessRunner:
 
             # Create the thread.
             self._thread = _threading.Thread(
-                target=self._run_processes, args=[serial, batch_size, max_retries]
+                target=self._run_processes,
+                args=[serial, batch_size, max_retries, resources],
             )
 
             # Daemonize the thread.
@@ -590,7 +699,9 @@ class ProcessRunner:
         else:
             print("ProcessRunner already started!")
 
-    def _run_processes(self, serial=False, batch_size=None, max_retries=5):
+    def _run_processes(
+        self, serial=False, batch_size=None, max_retries=5, resources=None
+    ):
         """
         Helper function to run all of the processes in a background thread.
 
@@ -612,6 +723,11 @@ class ProcessRunner:
 
         max_retries : int
             How many times to retry a process if it fails.
+
+        resources : dict
+            The cores and GPU devices available to the processes when running
+            in resource-aware mode, as returned by _get_resources. If None,
+            then each process is treated as a single slot.
         """
 
         if self.nProcesses() == 0:
@@ -638,22 +754,24 @@ class ProcessRunner:
         if max_retries < 1:
             raise ValueError("'max_retries' must be > 0.")
 
+        # Reset the state of every process and record the time at which
+        # each entered the queue.
+        for p in self._processes:
+            self._reset_state(p)
+
+        # Discard any stale notifications from a previous run.
+        self._drain_events()
+
         # Run processes in serial.
         if serial:
             for p in self._processes:
                 # Initialise the error state.
                 is_error = True
 
-                # Flag that the process is no longer queued.
-                p._is_queued = False
-
-                # Zero the tally of failed processes.
-                num_failed = 0
-
                 # Retry failed processes up to a maximum of 5 times.
                 while is_error and not self._is_killed:
                     # Start the process and wait for it to finish.
-                    p.start()
+                    self._start_process(p)
                     p.wait()
 
                     # Check the error state.
@@ -661,83 +779,101 @@ class ProcessRunner:
 
                     # Increment the number of failures.
                     if is_error:
-                        num_failed += 1
+                        p._num_failed += 1
 
                         # Maximum retries reached, move to the next process.
-                        if num_failed == max_retries:
+                        if p._num_failed == max_retries:
                             break
 
-        # Run in parallel.
-        else:
-            # First, set all processes as queued and set the number of
-            # failures to zero.
-            for p in self._processes:
-                p._is_queued = True
-                p._is_finished = False
-                p._num_failed = 0
+                        p._num_retries += 1
 
-            # The total number of finished processes.
-            num_finished = 0
+                p._is_finished = True
 
-            # A list to hold the indices of the processes that have been run.
-            # (Not those that are actually still running.)
-            run_idxs = []
+        # Run in parallel. Rather than polling the processes at a fixed
+        # interval, each process is watched by a lightweight thread that
+        # blocks until the process exits and then posts its index to the
+        # event queue. The scheduler sleeps on the queue, so it reacts as
+        # soon as any process finishes.
+        else:
+            # The indices of processes that have been started and whose exit
+            # hasn't yet been handled, mapped to the resources allocated to them.
+            active = {}
 
             # Loop until all processes have finished.
-            while num_finished < self.nProcesses() and not self._is_killed:
-                # Only submit more processes if we're below the batch size.
-                if self.nRunning() < batch_size:
-                    # Loop over all queued processes until we've submitted batch_size.
-                    queued = self.queued()
-                    for idx in queued:
-                        p = self._processes[idx]
-                        p._is_queued = False
-
-                        # Start the process and mark it as no-longer queued.
-                        p.start()
-
-                        # Record that we've run this process.
-                        run_idxs.append(idx)
-
-                        # We've hit the batch size, exit.
-                        if self.nRunning() == batch_size:
-                            break
-
-                # Copy the indices of the run jobs.
-                run_idxs_copy = run_idxs.copy()
+            while not self._is_killed and not all(
+                p._is_finished for p in self._processes
+            ):
+                # Submit queued processes until the batch is full.
+                for idx in self.queued():
+                    if len(active) >= batch_size or self._is_killed:
+                        break
 
-                # Loop over all the jobs that we've run.
-                for idx in run_idxs_copy:
-                    # The process is no longer running.
                     p = self._processes[idx]
-                    if not p.isRunning():
-                        # There was an error.
-                        if p.isError():
-                            # We haven't yet reached the retry limit. Add this
-                            # process back to the queue and delete it from the
-                            # run list.
-                            if p._num_failed < max_retries:
-                                p._is_queued = True
-                                p._num_failed += 1
-                                run_idxs.remove(idx)
-                            else:
-                                # Record the the proceess has finished.
-                                if not p._is_finished:
-                                    p._is_finished = True
-                                    num_finished += 1
-                        else:
-                            # Record the the proceess has finished.
-                            if not p._is_finished:
-                                p._is_finished = True
-                                num_finished += 1
-
-                # Sleep for 5 seconds.
-                _time.sleep(5)
+
+                    # Allocate resources for the process. If it doesn't fit
+                    # then try the next one, so that smaller processes can
+                    # be packed into the remaining resources.
+                    slot = None
+                    if resources is not None:
+                        slot = self._allocate(p, resources)
+                        if slot is None:
+                            continue
+
+                    self._start_process(p, slot)
+                    active[idx] = slot
+
+                    # Start a thread to watch for the process exiting.
+                    watcher = _threading.Thread(
+                        target=self._watch_process, args=[idx, p]
+                    )
+                    watcher.daemon = True
+                    watcher.start()
+
+                # Nothing left to wait for.
+                if len(active) == 0 and self.nQueued() == 0:
+                    break
+
+                # Block until a process exits. The timeout is only a safety net
+                # to catch external changes in state, e.g. processes that have
+                # been restarted by the user.
+                try:
+                    idx = self._events.get(timeout=self._max_wait)
+                except _queue.Empty:
+                    continue
+
+                # A wake-up call, e.g. from killAll or addProcess.
+                if idx is None or idx not in active:
+                    continue
+
+                slot = active.pop(idx)
+                p = self._processes[idx]
+
+                # Return the resources to the pool.
+                if slot is not None:
+                    resources["cores"].extend(slot["cores"])
+                    resources["devices"].extend(slot["devices"])
+
+                # Store the final run time of the process.
+                p.runTime()
+
+                # There was an error.
+                if p.isError() and not self._is_killed:
+                    # We haven't yet reached the retry limit. Add this
+                    # process back to the queue.
+                    if p._num_failed < max_retries:
+                        p._num_failed += 1
+                        p._num_retries += 1
+                        p._is_queued = True
+                        p._queue_start = _timeit.default_timer()
+                        continue
+
+                # Record the the proceess has finished.
+                p._is_finished = True
 
     def wait(self):
         """Wait for any running processes to finish."""
 
-        if self._thread is not None and not self._thread.is_alive():
+        if self._thread is not None and self._thread.is_alive():
             self._thread.join()
         else:
             for p in self._processes:
@@ -785,21 +921,32 @@ class ProcessRunner:
         for p in self._processes:
             p.kill()
 
+        # Wake the scheduler.
+        self._events.put(None)
+
     def restartFailed(self):
         """Restart any jobs that are in an error state."""
 
         for p in self._processes:
             if p.isError():
-                # Reset the process state.
-                p._is_queued = False
-                p._is_error = False
-                p._num_failed = 0
-
                 # Only directly start the process if the runner is not active.
                 # Otherwise, it will be picked up by virtue of its state being
                 # reset to queued.
-                if self._thread is None or not self._thread.is_active():
+                if self._thread is None or not self._thread.is_alive():
+                    # Reset the process state.
+                    p._is_queued = False
+                    p._is_error = False
+                    p._num_failed = 0
                     p.start()
+                else:
+                    num_retries = p._num_retries
+                    self._reset_state(p)
+                    p._num_retries = num_retries
+
+                p._num_retries += 1
+
+        # Wake the scheduler.
+        self._events.put(None)
 
     def runTime(self):
         """
@@ -819,6 +966,257 @@ class ProcessRunner:
 
         return run_time
 
+    def queueTime(self):
+        """
+        Return the time that each process has spent waiting in the queue,
+        including any time spent waiting to be retried.
+
+        Returns
+        -------
+
+        queue_time : [ BioSimSpace.Types.Time ]
+            A list containing the queue time of each process.
+        """
+
+        queue_time = []
+
+        for p in self._processes:
+            wait = p._queue_time
+            if p._is_queued and p._queue_start is not None:
+                wait += _timeit.default_timer() - p._queue_start
+            queue_time.append((wait / 60) * _Units.Time.minute)
+
+        return queue_time
+
+    def retries(self):
+        """
+        Return the number of times that each process has been retried
+        after failing.
+
+        Returns
+        -------
+
+        retries : [ int ]
+            A list containing the number of retries for each process.
+        """
+        return [p._num_retries for p in self._processes]
+
+    def _reset_state(self, process):
+        """
+        Internal helper function to reset the runner state of a process
+        and mark it as queued.
+
+        Parameters
+        ----------
+
+        process : :class:`Process <BioSimSpace.Process>`
+            The process.
+        """
+        process._is_queued = True
+        process._is_finished = False
+        process._num_failed = 0
+        process._num_retries = 0
+        process._queue_start = _timeit.default_timer()
+        process._queue_time = 0.0
+
+    def _start_process(self, process, slot=None):
+        """
+        Internal helper function to start a queued process, recording the
+        time that it spent in the queue.
+
+        Parameters
+        ----------
+
+        process : :class:`Process <BioSimSpace.Process>`
+            The process.
+
+        slot : dict
+            The cores and GPU devices allocated to the process. If None,
+            then the process inherits the resources of the runner.
+        """
+
+        # Accumulate the time spent in the queue.
+        if process._queue_start is not None:
+            process._queue_time += _timeit.default_timer() - process._queue_start
+            process._queue_start = None
+
+        # Mark the process as no-longer queued.
+        process._is_queued = False
+
+        if slot is None:
+            process.start()
+        else:
+            cores = slot["cores"]
+            devices = slot["devices"]
+
+            # Limit the number of threads used by the process.
+            variables = {
+                "OMP_NUM_THREADS": str(len(cores)),
+                "OPENMM_CPU_THREADS": str(len(cores)),
+            }
+
+            # Restrict the GPU devices that are visible to the process. A
+            # process without any devices must not see the GPUs at all, since
+            # some engines will offload work to any device that they find.
+            variables["CUDA_VISIBLE_DEVICES"] = ",".join(devices)
+            variables["OPENCL_VISIBLE_DEVICES"] = ",".join(devices)
+            process._set_visible_devices(devices)
+
+            # The process inherits the environment and CPU affinity from
+            # this thread when it is launched.
+            with _Utils.env(**variables):
+                with _affinity(cores if slot["pin"] else None):
+                    process.start()
+
+    def _get_resources(self, cpus=None, gpus=None):
+        """
+        Internal helper function to work out the cores and GPU devices
+        that are available to the processes.
+
+        Parameters
+        ----------
+
+        cpus : int
+            The number of CPUs. If None, then use the value from the
+            resource manager, or the number of available cores.
+
+        gpus : int
+            The number of GPUs. If None, then use the value from the
+            resource manager, or the number of visible CUDA devices.
+
+        Returns
+        -------
+
+        resources : dict
+            A dictionary containing the list of available core ids, the
+            list of available device ids, and whether cores can be pinned.
+        """
+
+        from ..Gateway import ResourceManager as _ResourceManager
+
+        if cpus is not None:
+            if not type(cpus) is int:
+                raise TypeError("'cpus' must be of type 'int'.")
+            if cpus < 1:
+                raise ValueError("'cpus' must be > 0.")
+        else:
+            cpus = _ResourceManager.getCPUs()
+            if cpus is not None and cpus < 1:
+                raise ValueError(
+                    "The number of CPUs set by the 'ResourceManager' must be > 0."
+                )
+
+        if gpus is not None:
+            if not type(gpus) is int:
+                raise TypeError("'gpus' must be of type 'int'.")
+            if gpus < 0:
+                raise ValueError("'gpus' cannot be negative!")
+        else:
+            gpus = _ResourceManager.getGPUs()
+
+        # Get the cores that this process is allowed to run on.
+        if hasattr(_os, "sched_getaffinity"):
+            cores = sorted(_os.sched_getaffinity(0))
+            can_pin = True
+        else:
+            cores = list(range(_os.cpu_count()))
+            can_pin = False
+
+        if cpus is None:
+            cpus = len(cores)
+
+        # Only pin processes when the budget fits within the available cores.
+        if cpus <= len(cores):
+            cores = cores[:cpus]
+        else:
+            cores = list(range(cpus))
+            can_pin = False
+
+        # Get the visible GPU devices.
+        devices = [
+            x.strip()
+            for x in _os.environ.get("CUDA_VISIBLE_DEVICES", "").split(",")
+            if x.strip() != ""
+        ]
+
+        if gpus is None:
+            gpus = len(devices)
+
+        if gpus <= len(devices):
+            devices = devices[:gpus]
+        else:
+            devices = [str(x) for x in range(gpus)]
+
+        return {"cores": cores, "devices": devices, "pin": can_pin}
+
+    def _allocate(self, process, resources):
+        """
+        Internal helper function to allocate resources to a process.
+
+        Parameters
+        ----------
+
+        process : :class:`Process <BioSimSpace.Process>`
+            The process.
+
+        resources : dict
+            The currently available resources. Allocated resources are
+            removed.
+
+        Returns
+        -------
+
+        slot : dict
+            The cores and devices allocated to the process, or None if
+            the process doesn't fit within the available resources.
+        """
+
+        num_cpus = process.getCPUs()
+        num_gpus = process.getGPUs()
+
+        if num_cpus > len(resources["cores"]) or num_gpus > len(resources["devices"]):
+            return None
+
+        # Keep the pools sorted so that processes are packed onto
+        # neighbouring cores.
+        resources["cores"].sort()
+        resources["devices"].sort()
+
+        # Allocate the resources.
+        cores = resources["cores"][:num_cpus]
+        devices = resources["devices"][:num_gpus]
+        del resources["cores"][:num_cpus]
+        del resources["devices"][:num_gpus]
+
+        return {"cores": cores, "devices": devices, "pin": resources["pin"]}
+
+    def _watch_process(self, index, process):
+        """
+        Internal helper function to block until a process exits, then
+        notify the scheduler.
+
+        Parameters
+        ----------
+
+        index : int
+            The index of the process.
+
+        process : :class:`Process <BioSimSpace.Process>`
+            The process.
+        """
+        try:
+            process.wait()
+        finally:
+            self._events.put(index)
+
+    def _drain_events(self):
+        """Internal helper function to clear any pending notifications."""
+        while True:
+            try:
+                self._events.get_nowait()
+            except _queue.Empty:
+                break
+
     def _nest_directories(self, processes):
         """
         Helper function to nest processes inside the runner's working
@@ -874,4 +1272,9 @@ class ProcessRunner:
                     )
                 )
 
+        # Preserve any explicit resource requirements.
+        for old, new in zip(processes, new_processes):
+            new._num_cpus = old._num_cpus
+            new._num_gpus = old._num_gpus
+
         return new_processes
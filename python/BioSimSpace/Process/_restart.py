@@ -0,0 +1,363 @@
+######################################################################
+# BioSimSpace: Making biomolecular simulation a breeze!
+#
+# Copyright: 2017-2024
+#
+# Authors: Lester Hedges <lester.hedges@gmail.com>
+#
+# BioSimSpace is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BioSimSpace is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BioSimSpace. If not, see <http://www.gnu.org/licenses/>.
+#####################################################################
+
+"""
+Functionality for reading coordinates, velocities, and box information
+from restart files directly into NumPy arrays. This allows the system of a
+process to be updated without re-parsing a topology that is already held
+in memory.
+"""
+
+__author__ = "Lester Hedges"
+__email__ = "lester.hedges@gmail.com"
+
+__all__ = ["_read_amber_restart", "_read_gro", "_update_from_template"]
+
+import math as _math
+import numpy as _np
+
+from sire.legacy import Maths as _SireMaths
+from sire.legacy import Mol as _SireMol
+from sire.legacy import Units as _SireUnits
+from sire.legacy import Vol as _SireVol
+
+from .._SireWrappers import System as _System
+
+# Conversion factor from AMBER internal velocity units to Angstrom per ps.
+_amber_velocity_scale = 20.455
+
+
+def _read_amber_restart(filename, has_box=None):
+    """
+    Read the coordinates, velocities, and box from an AMBER restart file,
+    in either NetCDF or ASCII format.
+
+    Parameters
+    ----------
+
+    filename : str
+        The path to the restart file.
+
+    has_box : bool
+        Whether the system has a periodic box. This is only used for ASCII
+        files with two atoms, where a box line can't be told apart from a
+        line of velocities. If None, then these files are rejected.
+
+    Returns
+    -------
+
+    coordinates : numpy.ndarray
+        The (atoms, 3) array of coordinates in Angstrom.
+
+    velocities : numpy.ndarray
+        The (atoms, 3) array of velocities in Angstrom per picosecond, or
+        None if the file doesn't contain velocities.
+
+    box : numpy.ndarray
+        The box lengths in Angstrom and angles in degrees, or None if the
+        file doesn't contain box information.
+    """
+
+    with open(filename, "rb") as f:
+        magic = f.read(3)
+
+    if magic == b"CDF":
+        return _read_amber_netcdf(filename)
+    else:
+        return _read_amber_ascii(filename, has_box)
+
+
+def _read_amber_netcdf(filename):
+    """
+    Read an AMBER NetCDF restart file. (See '_read_amber_restart'.)
+    """
+
+    from scipy.io import netcdf_file as _netcdf_file
+
+    with _netcdf_file(filename, "r", mmap=False) as f:
+        variables = f.variables
+
+        coordinates = _np.array(variables["coordinates"].data, dtype=_np.float64)
+
+        velocities = None
+        if "velocities" in variables:
+            var = variables["velocities"]
+            scale = getattr(var, "scale_factor", 1.0)
+            velocities = _np.array(var.data, dtype=_np.float64) * scale
+
+        box = None
+        if "cell_lengths" in variables and "cell_angles" in variables:
+            box = _np.concatenate(
+                [
+                    _np.array(variables["cell_lengths"].data, dtype=_np.float64),
+                    _np.array(variables["cell_angles"].data, dtype=_np.float64),
+                ]
+            )
+
+    return coordinates, velocities, box
+
+
+def _read_amber_ascii(filename, has_box=None):
+    """
+    Read an AMBER ASCII restart file. (See '_read_amber_restart'.)
+    """
+
+    with open(filename, "r") as f:
+        lines = f.read().splitlines()
+
+    num_atoms = int(lines[1].split()[0])
+
+    # Values are written in fixed width fields of 12 characters, six per
+    # line, so may not be separated by whitespace.
+    values = []
+    for line in lines[2:]:
+        line = line.rstrip()
+        values.extend(line[x : x + 12] for x in range(0, len(line), 12))
+    values = _np.array(values, dtype=_np.float64)
+
+    # Work out what the file contains from the total number of values. With
+    # two atoms, a box can't be told apart from velocities.
+    num_values = len(values)
+    num_coords = 3 * num_atoms
+    if num_values == num_coords + 6 and num_values == 2 * num_coords:
+        if has_box is None:
+            raise ValueError(
+                f"Unable to tell whether AMBER restart file '{filename}' "
+                "contains velocities or a box."
+            )
+        has_velocities = not has_box
+        has_box = bool(has_box)
+    elif num_values in [num_coords, num_coords + 6]:
+        has_velocities = False
+        has_box = num_values == num_coords + 6
+    elif num_values in [2 * num_coords, 2 * num_coords + 6]:
+        has_velocities = True
+        has_box = num_values == 2 * num_coords + 6
+    else:
+        raise ValueError(f"Invalid AMBER restart file: '{filename}'")
+
+    coordinates = values[:num_coords].reshape(num_atoms, 3)
+
+    velocities = None
+    if has_velocities:
+        velocities = (
+            values[num_coords : 2 * num_coords].reshape(num_atoms, 3)
+            * _amber_velocity_scale
+        )
+
+    box = None
+    if has_box:
+        box = values[-6:]
+
+    return coordinates, velocities, box
+
+
+def _read_gro(filename):
+    """
+    Read the coordinates, velocities, and box from a GROMACS GRO file.
+
+    Parameters
+    ----------
+
+    filename : str
+        The path to the GRO file.
+
+    Returns
+    -------
+
+    coordinates : numpy.ndarray
+        The (atoms, 3) array of coordinates in Angstrom.
+
+    velocities : numpy.ndarray
+        The (atoms, 3) array of velocities in Angstrom per picosecond, or
+        None if the file doesn't contain velocities.
+
+    box : numpy.ndarray
+        The box lengths in Angstrom and angles in degrees.
+    """
+
+    with open(filename, "r") as f:
+        lines = f.read().splitlines()
+
+    num_atoms = int(lines[1].strip())
+    atom_lines = lines[2 : 2 + num_atoms]
+
+    if len(atom_lines) != num_atoms:
+        raise ValueError(f"Invalid GRO file: '{filename}'")
+
+    # The fields are fixed width, with the width set by the precision. Work
+    # it out from the distance between the first two decimal points.
+    first = atom_lines[0]
+    point = first.index(".", 20)
+    width = first.index(".", point + 1) - point
+
+    # Velocities are only present if the line is long enough.
+    has_velocities = len(first.rstrip()) >= 20 + 6 * width
+
+    num_fields = 6 if has_velocities else 3
+    data = _np.array(
+        [
+            [line[20 + x * width : 20 + (x + 1) * width] for x in range(num_fields)]
+            for line in atom_lines
+        ],
+        dtype=_np.float64,
+    )
+
+    # Convert from nanometers to Angstrom.
+    data *= 10.0
+
+    coordinates = data[:, :3]
+    velocities = data[:, 3:] if has_velocities else None
+
+    # The box is given by the diagonal and, for triclinic boxes, the
+    # off-diagonal elements of the box matrix.
+    values = [float(x) * 10.0 for x in lines[2 + num_atoms].split()]
+    if len(values) == 3:
+        values += [0.0] * 6
+    v1 = _np.array([values[0], values[3], values[4]])
+    v2 = _np.array([values[5], values[1], values[6]])
+    v3 = _np.array([values[7], values[8], values[2]])
+
+    def angle(a, b):
+        cos = _np.dot(a, b) / (_np.linalg.norm(a) * _np.linalg.norm(b))
+        return _math.degrees(_math.acos(max(-1.0, min(1.0, cos))))
+
+    box = _np.array(
+        [
+            _np.linalg.norm(v1),
+            _np.linalg.norm(v2),
+            _np.linalg.norm(v3),
+            angle(v2, v3),
+            angle(v1, v3),
+            angle(v1, v2),
+        ]
+    )
+
+    return coordinates, velocities, box
+
+
+def _update_from_template(
+    template, coordinates, velocities=None, box=None, property_map={}
+):
+    """
+    Create a copy of a template system with its coordinates, velocities,
+    and box replaced. Atoms are assumed to be in the same order as in the
+    template, e.g. because the template was used to write the input files
+    for the process that generated them.
+
+    Parameters
+    ----------
+
+    template : :class:`System <BioSimSpace._SireWrappers.System>`
+        The template system.
+
+    coordinates : numpy.ndarray
+        The (atoms, 3) array of coordinates in Angstrom.
+
+    velocities : numpy.ndarray
+        The (atoms, 3) array of velocities in Angstrom per picosecond. If
+        None, then any existing velocities are removed.
+
+    box : numpy.ndarray
+        The box lengths in Angstrom and angles in degrees. If None, then
+        any existing box is removed.
+
+    property_map : dict
+        A dictionary that maps system "properties" to their user defined
+        values. This allows the user to refer to properties with their
+        own naming scheme, e.g. { "charge" : "my-charge" }
+
+    Returns
+    -------
+
+    system : :class:`System <BioSimSpace._SireWrappers.System>`
+        The updated copy of the template.
+    """
+
+    if len(coordinates) != template.nAtoms():
+        raise ValueError(
+            f"The number of atoms in the frame ({len(coordinates)}) doesn't "
+            f"match the number in the system ({template.nAtoms()})."
+        )
+
+    if velocities is not None and len(velocities) != len(coordinates):
+        raise ValueError("The number of velocities doesn't match the coordinates.")
+
+    # Get the coordinates, velocity, and space property names.
+    coord_prop = property_map.get("coordinates", "coordinates")
+    vel_prop = property_map.get("velocity", "velocity")
+    space_prop = property_map.get("space", "space")
+
+    # Convert the arrays to nested lists of Python floats once, rather than
+    # converting each element individually.
+    coordinates = _np.asarray(coordinates, dtype=_np.float64).tolist()
+    if velocities is not None:
+        velocities = _np.asarray(velocities, dtype=_np.float64).tolist()
+        vel_unit = _SireUnits.angstrom / _SireUnits.picosecond
+
+    # Work on a copy of the template.
+    system = template.copy()._sire_object
+
+    # Set the coordinates and velocities of each molecule from the
+    # appropriate slice of the frame.
+    offset = 0
+    for idx in range(0, system.nMolecules()):
+        mol = system[_SireMol.MolIdx(idx)]
+        num_atoms = mol.nAtoms()
+
+        coords = _SireMol.AtomCoords(mol.info())
+        coords.copyFrom(
+            [_SireMaths.Vector(*c) for c in coordinates[offset : offset + num_atoms]]
+        )
+        edit_mol = mol.edit().setProperty(coord_prop, coords).molecule()
+
+        if velocities is not None:
+            vels = _SireMol.AtomVelocities(mol.info())
+            vels.copyFrom(
+                [
+                    _SireMol.Velocity3D(
+                        v[0] * vel_unit, v[1] * vel_unit, v[2] * vel_unit
+                    )
+                    for v in velocities[offset : offset + num_atoms]
+                ]
+            )
+            edit_mol = edit_mol.setProperty(vel_prop, vels).molecule()
+        elif edit_mol.hasProperty(vel_prop):
+            edit_mol = edit_mol.removeProperty(vel_prop).molecule()
+
+        system.update(edit_mol.commit())
+        offset += num_atoms
+
+    # Set the box. Use a periodic box when the box is orthorhombic, as is
+    # done when parsing the files.
+    if box is not None and all(x > 0 for x in box[:3]):
+        dimensions = [float(x) for x in box[:3]]
+        if all(abs(x - 90.0) < 1e-6 for x in box[3:]):
+            space = _SireVol.PeriodicBox(_SireMaths.Vector(*dimensions))
+        else:
+            degree = _SireUnits.degree
+            angles = [float(x) * degree for x in box[3:]]
+            space = _SireVol.TriclinicBox(*dimensions, *angles)
+        system.setProperty(space_prop, space)
+    elif space_prop in system.propertyKeys():
+        system.removeProperty(space_prop)
+
+    return _System(system)
@@ -31,6 +31,7 @@ from .._Utils import _try_import
 _pygtail = _try_import("pygtail")
 
 import glob as _glob
+import io as _io
 import math as _math
 import os as _os
 import random as _random
@@ -80,6 +81,7 @@ class Somd(_process.Process):
         extra_lines=[],
         extra_args={},
         property_map={},
+        previous_process=None,
         **kwargs,
     ):
         """
@@ -127,6 +129,11 @@ class Somd(_process.Process):
             values. This allows the user to refer to properties with their
             own naming scheme, e.g. { "charge" : "my-charge" }
 
+        previous_process : :class:`Process.Somd <BioSimSpace.Process.Somd>`
+            An optional process for a previous stage in a chain of simulations.
+            If the topology of the system is unchanged, then the topology file
+            from the previous process is re-used rather than being re-written.
+
         kwargs : dict
             Additional keyword arguments.
         """
@@ -142,6 +149,7 @@ class Somd(_process.Process):
             extra_lines=extra_lines,
             extra_args=extra_args,
             property_map=property_map,
+            previous_process=previous_process,
         )
 
         # Catch unsupported protocols.
@@ -310,6 +318,17 @@ class Somd(_process.Process):
     def _setup(self):
         """Setup the input files and working directory ready for simulation."""
 
+        # Fingerprint the topology, along with any settings that affect how
+        # it is written, so that it can be re-used in a chain of processes.
+        if isinstance(self._protocol, _Protocol.FreeEnergy):
+            fingerprint = self._get_topology_fingerprint(
+                self._protocol.getPerturbationType(),
+                self._zero_dummy_dihedrals,
+                self._zero_dummy_impropers,
+            )
+        else:
+            fingerprint = self._get_topology_fingerprint()
+
         # Create the input files...
 
         # First create a copy of the system.
@@ -374,17 +393,26 @@ class Somd(_process.Process):
             else:
                 raise IOError(msg) from None
 
-        # PRM file (topology).
-        try:
-            _IO.saveMolecules(
-                file, system, "prm7", match_water=False, property_map=self._property_map
-            )
-        except Exception as e:
-            msg = "Failed to write system to 'PRM7' format."
-            if _isVerbose():
-                raise IOError(msg) from e
-            else:
-                raise IOError(msg) from None
+        # PRM file (topology). This is re-used from the previous process if
+        # the topology is unchanged.
+        top_files = {"prm7": self._top_file}
+        if not self._reuse_topology(fingerprint, top_files):
+            try:
+                file = _os.path.splitext(self._top_file)[0]
+                _IO.saveMolecules(
+                    file,
+                    system,
+                    "prm7",
+                    match_water=False,
+                    property_map=self._property_map,
+                )
+            except Exception as e:
+                msg = "Failed to write system to 'PRM7' format."
+                if _isVerbose():
+                    raise IOError(msg) from e
+                else:
+                    raise IOError(msg) from None
+            self._store_topology(top_files)
 
         # Warn the user if the simulation is seeded and not running a FreeEnergy
         # protocol.
@@ -538,6 +566,21 @@ class Somd(_process.Process):
 
         return self
 
+    def _infer_gpus(self):
+        """
+        Internal helper function to infer the number of GPUs required by
+        the process from the platform.
+
+        Returns
+        -------
+
+        gpus : int
+            The number of GPUs.
+        """
+        if self._platform.upper() in ["CUDA", "OPENCL"]:
+            return 1
+        return 0
+
     def getSystem(self, block="AUTO"):
         """
         Get the latest molecular system.
@@ -1129,9 +1172,11 @@ def _to_pert_file(
         # Store the updated molecule.
         mol = edit_mol.commit()
 
-    # Now write the perturbation file.
+    # Now write the perturbation file. Records are written to an in-memory
+    # buffer, which is written to disk once complete, so that a partial file
+    # isn't left behind if an error is raised.
 
-    with open(filename, "w") as file:
+    with _io.StringIO() as file:
         # Get the info object for the molecule.
         info = mol.info()
 
@@ -1488,7 +1533,7 @@ def _to_pert_file(
         bonds0 = mol.property("bond0").potentials()
         bonds1 = mol.property("bond1").potentials()
 
-        # Dictionaries to store the BondIDs at lambda = 0 and 1.
+        # Dictionaries mapping the bonds at lambda = 0 and 1 to their index.
         bonds0_idx = {}
         bonds1_idx = {}
 
@@ -1498,11 +1543,9 @@ def _to_pert_file(
             idx0 = info.atomIdx(bond.atom0())
             idx1 = info.atomIdx(bond.atom1())
 
-            # Create the BondID.
-            bond_id = _SireMol.BondID(idx0, idx1)
-
-            # Add to the list of ids.
-            bonds0_idx[bond_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the bond and its mirror.
+            bonds0_idx[_bonded_key(idx0, idx1)] = idx
 
         # Loop over all bonds at lambda = 1.
         for idx, bond in enumerate(bonds1):
@@ -1510,16 +1553,11 @@ def _to_pert_file(
             idx0 = info.atomIdx(bond.atom0())
             idx1 = info.atomIdx(bond.atom1())
 
-            # Create the BondID.
-            bond_id = _SireMol.BondID(idx0, idx1)
+            # Add to the dictionary of ids, using a key that is the same for
+            # the bond and its mirror.
+            bonds1_idx[_bonded_key(idx0, idx1)] = idx
 
-            # Add to the list of ids.
-            if bond_id.mirror() in bonds0_idx:
-                bonds1_idx[bond_id.mirror()] = idx
-            else:
-                bonds1_idx[bond_id] = idx
-
-        # Now work out the BondIDs that are unique at lambda = 0 and 1
+        # Now work out the bonds that are unique at lambda = 0 and 1
         # as well as those that are shared.
         bonds0_unique_idx = {}
         bonds1_unique_idx = {}
@@ -1736,7 +1774,7 @@ def _to_pert_file(
         angles0 = mol.property("angle0").potentials()
         angles1 = mol.property("angle1").potentials()
 
-        # Dictionaries to store the AngleIDs at lambda = 0 and 1.
+        # Dictionaries mapping the angles at lambda = 0 and 1 to their index.
         angles0_idx = {}
         angles1_idx = {}
 
@@ -1747,11 +1785,9 @@ def _to_pert_file(
             idx1 = info.atomIdx(angle.atom1())
             idx2 = info.atomIdx(angle.atom2())
 
-            # Create the AngleID.
-            angle_id = _SireMol.AngleID(idx0, idx1, idx2)
-
-            # Add to the list of ids.
-            angles0_idx[angle_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the angle and its mirror.
+            angles0_idx[_bonded_key(idx0, idx1, idx2)] = idx
 
         # Loop over all angles at lambda = 1.
         for idx, angle in enumerate(angles1):
@@ -1760,16 +1796,11 @@ def _to_pert_file(
             idx1 = info.atomIdx(angle.atom1())
             idx2 = info.atomIdx(angle.atom2())
 
-            # Create the AngleID.
-            angle_id = _SireMol.AngleID(idx0, idx1, idx2)
-
-            # Add to the list of ids.
-            if angle_id.mirror() in angles0_idx:
-                angles1_idx[angle_id.mirror()] = idx
-            else:
-                angles1_idx[angle_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the angle and its mirror.
+            angles1_idx[_bonded_key(idx0, idx1, idx2)] = idx
 
-        # Now work out the AngleIDs that are unique at lambda = 0 and 1
+        # Now work out the angles that are unique at lambda = 0 and 1
         # as well as those that are shared.
         angles0_unique_idx = {}
         angles1_unique_idx = {}
@@ -2070,7 +2101,7 @@ def _to_pert_file(
         dihedrals0 = mol.property("dihedral0").potentials()
         dihedrals1 = mol.property("dihedral1").potentials()
 
-        # Dictionaries to store the DihedralIDs at lambda = 0 and 1.
+        # Dictionaries mapping the dihedrals at lambda = 0 and 1 to their index.
         dihedrals0_idx = {}
         dihedrals1_idx = {}
 
@@ -2082,11 +2113,9 @@ def _to_pert_file(
             idx2 = info.atomIdx(dihedral.atom2())
             idx3 = info.atomIdx(dihedral.atom3())
 
-            # Create the DihedralID.
-            dihedral_id = _SireMol.DihedralID(idx0, idx1, idx2, idx3)
-
-            # Add to the list of ids.
-            dihedrals0_idx[dihedral_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the dihedral and its mirror.
+            dihedrals0_idx[_bonded_key(idx0, idx1, idx2, idx3)] = idx
 
         # Loop over all dihedrals at lambda = 1.
         for idx, dihedral in enumerate(dihedrals1):
@@ -2096,16 +2125,11 @@ def _to_pert_file(
             idx2 = info.atomIdx(dihedral.atom2())
             idx3 = info.atomIdx(dihedral.atom3())
 
-            # Create the DihedralID.
-            dihedral_id = _SireMol.DihedralID(idx0, idx1, idx2, idx3)
+            # Add to the dictionary of ids, using a key that is the same for
+            # the dihedral and its mirror.
+            dihedrals1_idx[_bonded_key(idx0, idx1, idx2, idx3)] = idx
 
-            # Add to the list of ids.
-            if dihedral_id.mirror() in dihedrals0_idx:
-                dihedrals1_idx[dihedral_id.mirror()] = idx
-            else:
-                dihedrals1_idx[dihedral_id] = idx
-
-        # Now work out the DihedralIDs that are unique at lambda = 0 and 1
+        # Now work out the dihedrals that are unique at lambda = 0 and 1
         # as well as those that are shared.
         dihedrals0_unique_idx = {}
         dihedrals1_unique_idx = {}
@@ -2476,6 +2500,10 @@ def _to_pert_file(
         impropers0_idx = {}
         impropers1_idx = {}
 
+        # A dictionary mapping ImproperIDs to the set of atoms that they
+        # contain, used to index the impropers when finding matches.
+        improper_atoms = {}
+
         # Loop over all impropers at lambda = 0.
         for idx, improper in enumerate(impropers0):
             # Get the AtomIdx for the atoms in the improper.
@@ -2489,6 +2517,9 @@ def _to_pert_file(
 
             # Add to the list of ids.
             impropers0_idx[improper_id] = idx
+            improper_atoms[improper_id] = frozenset(
+                x.value() for x in (idx0, idx1, idx2, idx3)
+            )
 
         # Loop over all impropers at lambda = 1.
         for idx, improper in enumerate(impropers1):
@@ -2504,41 +2535,20 @@ def _to_pert_file(
             # Add to the list of ids.
             # You cannot mirror an improper!
             impropers1_idx[improper_id] = idx
+            improper_atoms[improper_id] = frozenset(
+                x.value() for x in (idx0, idx1, idx2, idx3)
+            )
 
         # Now work out the ImproperIDs that are unique at lambda = 0 and 1
         # as well as those that are shared. Note that the ordering of
         # impropers is inconsistent between molecular topology formats so
         # we test all permutations of atom ordering to find matches. This
         # is achieved using the ImproperID.equivalent() method.
-        impropers0_unique_idx = {}
-        impropers1_unique_idx = {}
-        impropers_shared_idx = {}
-
-        # lambda = 0.
-        for idx0 in impropers0_idx.keys():
-            for idx1 in impropers1_idx.keys():
-                if idx0.equivalent(idx1):
-                    impropers_shared_idx[idx0] = (
-                        impropers0_idx[idx0],
-                        impropers1_idx[idx1],
-                    )
-                    break
-            else:
-                impropers0_unique_idx[idx0] = impropers0_idx[idx0]
-
-        # lambda = 1.
-        for idx1 in impropers1_idx.keys():
-            for idx0 in impropers0_idx.keys():
-                if idx1.equivalent(idx0):
-                    # Don't store duplicates.
-                    if not idx0 in impropers_shared_idx.keys():
-                        impropers_shared_idx[idx1] = (
-                            impropers0_idx[idx0],
-                            impropers1_idx[idx1],
-                        )
-                    break
-            else:
-                impropers1_unique_idx[idx1] = impropers1_idx[idx1]
+        (
+            impropers0_unique_idx,
+            impropers1_unique_idx,
+            impropers_shared_idx,
+        ) = _match_impropers(impropers0_idx, impropers1_idx, improper_atoms)
 
         # First create records for the impropers that are unique to lambda = 0 and 1.
 
@@ -2867,6 +2877,10 @@ def _to_pert_file(
         # End molecule record.
         file.write("endmolecule\n")
 
+        # Write the perturbation file.
+        with open(filename, "w") as pert_file:
+            pert_file.write(file.getvalue())
+
     # Finally, convert the molecule to the lambda = 0 state.
 
     # Make the molecule editable.
@@ -2943,6 +2957,101 @@ def _to_pert_file(
     return _Molecule(mol.commit())
 
 
+def _bonded_key(*idxs):
+    """
+    Internal function to create a key for a bond, angle, or dihedral that
+    is the same for the term and its mirror, i.e. with the atoms reversed.
+
+    Parameters
+    ----------
+
+    idxs : [Sire.Mol.AtomIdx]
+        The indices of the atoms in the term.
+
+    Returns
+    -------
+
+    key : (int,)
+        The key.
+    """
+    key = tuple(idx.value() for idx in idxs)
+    return min(key, key[::-1])
+
+
+def _match_impropers(impropers0_idx, impropers1_idx, improper_atoms):
+    """
+    Internal function to work out the impropers that are unique at lambda = 0
+    and 1, as well as those that are shared. Equivalent impropers contain the
+    same atoms, so the impropers are grouped by their atoms and only those
+    within the same group are compared.
+
+    Parameters
+    ----------
+
+    impropers0_idx : dict
+        A dictionary mapping ImproperIDs at lambda = 0 to their index.
+
+    impropers1_idx : dict
+        A dictionary mapping ImproperIDs at lambda = 1 to their index.
+
+    improper_atoms : dict
+        A dictionary mapping ImproperIDs to the set of atoms they contain.
+
+    Returns
+    -------
+
+    impropers0_unique_idx : dict
+        The impropers that are unique to lambda = 0.
+
+    impropers1_unique_idx : dict
+        The impropers that are unique to lambda = 1.
+
+    impropers_shared_idx : dict
+        The impropers that are shared, mapped to their index at lambda = 0
+        and 1.
+    """
+
+    # Group the impropers by their atoms, preserving the original order.
+    groups0 = {}
+    for idx0 in impropers0_idx:
+        groups0.setdefault(improper_atoms[idx0], []).append(idx0)
+    groups1 = {}
+    for idx1 in impropers1_idx:
+        groups1.setdefault(improper_atoms[idx1], []).append(idx1)
+
+    impropers0_unique_idx = {}
+    impropers1_unique_idx = {}
+    impropers_shared_idx = {}
+
+    # lambda = 0.
+    for idx0 in impropers0_idx:
+        for idx1 in groups1.get(improper_atoms[idx0], []):
+            if idx0.equivalent(idx1):
+                impropers_shared_idx[idx0] = (
+                    impropers0_idx[idx0],
+                    impropers1_idx[idx1],
+                )
+                break
+        else:
+            impropers0_unique_idx[idx0] = impropers0_idx[idx0]
+
+    # lambda = 1.
+    for idx1 in impropers1_idx:
+        for idx0 in groups0.get(improper_atoms[idx1], []):
+            if idx1.equivalent(idx0):
+                # Don't store duplicates.
+                if not idx0 in impropers_shared_idx:
+                    impropers_shared_idx[idx1] = (
+                        impropers0_idx[idx0],
+                        impropers1_idx[idx1],
+                    )
+                break
+        else:
+            impropers1_unique_idx[idx1] = impropers1_idx[idx1]
+
+    return impropers0_unique_idx, impropers1_unique_idx, impropers_shared_idx
+
+
 def _has_pert_atom(idxs, pert_idxs):
     """
     Internal function to check whether a potential contains perturbed atoms.
@@ -3178,7 +3287,7 @@ def _somd1_compatibility(system):
         bonds0 = mol.property("bond0").potentials()
         bonds1 = mol.property("bond1").potentials()
 
-        # Dictionaries to store the BondIDs at lambda = 0 and 1.
+        # Dictionaries mapping the bonds at lambda = 0 and 1 to their index.
         bonds0_idx = {}
         bonds1_idx = {}
 
@@ -3188,11 +3297,9 @@ def _somd1_compatibility(system):
             idx0 = info.atom_idx(bond.atom0())
             idx1 = info.atom_idx(bond.atom1())
 
-            # Create the BondID.
-            bond_id = _SireMol.BondID(idx0, idx1)
-
-            # Add to the list of ids.
-            bonds0_idx[bond_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the bond and its mirror.
+            bonds0_idx[_bonded_key(idx0, idx1)] = idx
 
         # Loop over all bonds at lambda = 1.
         for idx, bond in enumerate(bonds1):
@@ -3200,16 +3307,11 @@ def _somd1_compatibility(system):
             idx0 = info.atom_idx(bond.atom0())
             idx1 = info.atom_idx(bond.atom1())
 
-            # Create the BondID.
-            bond_id = _SireMol.BondID(idx0, idx1)
-
-            # Add to the list of ids.
-            if bond_id.mirror() in bonds0_idx:
-                bonds1_idx[bond_id.mirror()] = idx
-            else:
-                bonds1_idx[bond_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the bond and its mirror.
+            bonds1_idx[_bonded_key(idx0, idx1)] = idx
 
-        # Now work out the BondIDs that are unique at lambda = 0 and 1
+        # Now work out the bonds that are unique at lambda = 0 and 1
         # as well as those that are shared.
         bonds0_unique_idx = {}
         bonds1_unique_idx = {}
@@ -3272,7 +3374,7 @@ def _somd1_compatibility(system):
         angles0 = mol.property("angle0").potentials()
         angles1 = mol.property("angle1").potentials()
 
-        # Dictionaries to store the AngleIDs at lambda = 0 and 1.
+        # Dictionaries mapping the angles at lambda = 0 and 1 to their index.
         angles0_idx = {}
         angles1_idx = {}
 
@@ -3283,11 +3385,9 @@ def _somd1_compatibility(system):
             idx1 = info.atom_idx(angle.atom1())
             idx2 = info.atom_idx(angle.atom2())
 
-            # Create the AngleID.
-            angle_id = _SireMol.AngleID(idx0, idx1, idx2)
-
-            # Add to the list of ids.
-            angles0_idx[angle_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the angle and its mirror.
+            angles0_idx[_bonded_key(idx0, idx1, idx2)] = idx
 
         # Loop over all angles at lambda = 1.
         for idx, angle in enumerate(angles1):
@@ -3296,16 +3396,11 @@ def _somd1_compatibility(system):
             idx1 = info.atom_idx(angle.atom1())
             idx2 = info.atom_idx(angle.atom2())
 
-            # Create the AngleID.
-            angle_id = _SireMol.AngleID(idx0, idx1, idx2)
+            # Add to the dictionary of ids, using a key that is the same for
+            # the angle and its mirror.
+            angles1_idx[_bonded_key(idx0, idx1, idx2)] = idx
 
-            # Add to the list of ids.
-            if angle_id.mirror() in angles0_idx:
-                angles1_idx[angle_id.mirror()] = idx
-            else:
-                angles1_idx[angle_id] = idx
-
-        # Now work out the AngleIDs that are unique at lambda = 0 and 1
+        # Now work out the angles that are unique at lambda = 0 and 1
         # as well as those that are shared.
         angles0_unique_idx = {}
         angles1_unique_idx = {}
@@ -3377,7 +3472,7 @@ def _somd1_compatibility(system):
         dihedrals0 = mol.property("dihedral0").potentials()
         dihedrals1 = mol.property("dihedral1").potentials()
 
-        # Dictionaries to store the DihedralIDs at lambda = 0 and 1.
+        # Dictionaries mapping the dihedrals at lambda = 0 and 1 to their index.
         dihedrals0_idx = {}
         dihedrals1_idx = {}
 
@@ -3389,11 +3484,9 @@ def _somd1_compatibility(system):
             idx2 = info.atom_idx(dihedral.atom2())
             idx3 = info.atom_idx(dihedral.atom3())
 
-            # Create the DihedralID.
-            dihedral_id = _SireMol.DihedralID(idx0, idx1, idx2, idx3)
-
-            # Add to the list of ids.
-            dihedrals0_idx[dihedral_id] = idx
+            # Add to the dictionary of ids, using a key that is the same for
+            # the dihedral and its mirror.
+            dihedrals0_idx[_bonded_key(idx0, idx1, idx2, idx3)] = idx
 
         # Loop over all dihedrals at lambda = 1.
         for idx, dihedral in enumerate(dihedrals1):
@@ -3403,16 +3496,11 @@ def _somd1_compatibility(system):
             idx2 = info.atom_idx(dihedral.atom2())
             idx3 = info.atom_idx(dihedral.atom3())
 
-            # Create the DihedralID.
-            dihedral_id = _SireMol.DihedralID(idx0, idx1, idx2, idx3)
+            # Add to the dictionary of ids, using a key that is the same for
+            # the dihedral and its mirror.
+            dihedrals1_idx[_bonded_key(idx0, idx1, idx2, idx3)] = idx
 
-            # Add to the list of ids.
-            if dihedral_id.mirror() in dihedrals0_idx:
-                dihedrals1_idx[dihedral_id.mirror()] = idx
-            else:
-                dihedrals1_idx[dihedral_id] = idx
-
-        # Now work out the DihedralIDs that are unique at lambda = 0 and 1
+        # Now work out the dihedrals that are unique at lambda = 0 and 1
         # as well as those that are shared.
         dihedrals0_unique_idx = {}
         dihedrals1_unique_idx = {}
@@ -3503,6 +3591,10 @@ def _somd1_compatibility(system):
         impropers0_idx = {}
         impropers1_idx = {}
 
+        # A dictionary mapping ImproperIDs to the set of atoms that they
+        # contain, used to index the impropers when finding matches.
+        improper_atoms = {}
+
         # Loop over all impropers at lambda = 0.
         for idx, improper in enumerate(impropers0):
             # Get the AtomIdx for the atoms in the improper.
@@ -3516,6 +3608,9 @@ def _somd1_compatibility(system):
 
             # Add to the list of ids.
             impropers0_idx[improper_id] = idx
+            improper_atoms[improper_id] = frozenset(
+                x.value() for x in (idx0, idx1, idx2, idx3)
+            )
 
         # Loop over all impropers at lambda = 1.
         for idx, improper in enumerate(impropers1):
@@ -3531,41 +3626,20 @@ def _somd1_compatibility(system):
             # Add to the list of ids.
             # You cannot mirror an improper!
             impropers1_idx[improper_id] = idx
+            improper_atoms[improper_id] = frozenset(
+                x.value() for x in (idx0, idx1, idx2, idx3)
+            )
 
         # Now work out the ImproperIDs that are unique at lambda = 0 and 1
         # as well as those that are shared. Note that the ordering of
         # impropers is inconsistent between molecular topology formats so
         # we test all permutations of atom ordering to find matches. This
         # is achieved using the ImproperID.equivalent() method.
-        impropers0_unique_idx = {}
-        impropers1_unique_idx = {}
-        impropers_shared_idx = {}
-
-        # lambda = 0.
-        for idx0 in impropers0_idx.keys():
-            for idx1 in impropers1_idx.keys():
-                if idx0.equivalent(idx1):
-                    impropers_shared_idx[idx0] = (
-                        impropers0_idx[idx0],
-                        impropers1_idx[idx1],
-                    )
-                    break
-            else:
-                impropers0_unique_idx[idx0] = impropers0_idx[idx0]
-
-        # lambda = 1.
-        for idx1 in impropers1_idx.keys():
-            for idx0 in impropers0_idx.keys():
-                if idx1.equivalent(idx0):
-                    # Don't store duplicates.
-                    if not idx0 in impropers_shared_idx.keys():
-                        impropers_shared_idx[idx1] = (
-                            impropers0_idx[idx0],
-                            impropers1_idx[idx1],
-                        )
-                    break
-            else:
-                impropers1_unique_idx[idx1] = impropers1_idx[idx1]
+        (
+            impropers0_unique_idx,
+            impropers1_unique_idx,
+            impropers_shared_idx,
+        ) = _match_impropers(impropers0_idx, impropers1_idx, improper_atoms)
 
         # Loop over the impropers.
         for idx0, idx1 in impropers_shared_idx.values():
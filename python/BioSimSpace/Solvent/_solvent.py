@@ -41,7 +41,6 @@ from sire.legacy.Vol import TriclinicBox as _TriclinicBox
 
 from sire.legacy.Units import degree as _degree
 
-from .. import _gmx_exe, _gmx_path
 from .. import _isVerbose
 
 from .._Exceptions import MissingSoftwareError as _MissingSoftwareError
@@ -212,6 +211,8 @@ def spc(
         The solvated molecular system.
     """
 
+    from .. import _gmx_exe, _gmx_path
+
     if _gmx_exe is None or _gmx_path is None:
         raise _MissingSoftwareError(
             "'BioSimSpace.Solvent.spc' is not supported. "
@@ -314,6 +315,8 @@ def spce(
         The solvated molecular system.
     """
 
+    from .. import _gmx_exe
+
     if _gmx_exe is None:
         raise _MissingSoftwareError(
             "'BioSimSpace.Solvent.spce' is not supported. "
@@ -416,6 +419,8 @@ def tip3p(
         The solvated molecular system.
     """
 
+    from .. import _gmx_exe
+
     if _gmx_exe is None:
         raise _MissingSoftwareError(
             "'BioSimSpace.Solvent.tip3p' is not supported. "
@@ -518,6 +523,8 @@ def tip4p(
         The solvated molecular system.
     """
 
+    from .. import _gmx_exe
+
     if _gmx_exe is None:
         raise _MissingSoftwareError(
             "'BioSimSpace.Solvent.tip4p' is not supported. "
@@ -620,6 +627,8 @@ def tip5p(
         The solvated molecular system.
     """
 
+    from .. import _gmx_exe
+
     if _gmx_exe is None:
         raise _MissingSoftwareError(
             "'BioSimSpace.Solvent.tip5p' is not supported. "
@@ -954,6 +963,8 @@ def _solvate(
         The solvated system.
     """
 
+    from .. import _gmx_exe
+
     if molecule is not None:
         # Get the axis aligned bounding box.
         aabox_min, aabox_max = molecule.getAxisAlignedBoundingBox()
@@ -26,12 +26,13 @@ __email__ = "lester.hedges@gmail.com"
 
 __all__ = ["getFrame", "Trajectory", "backends"]
 
-from .._Utils import _try_import, _have_imported
+from .._Utils import _lazy_import, _have_imported
 
-_mdanalysis = _try_import("MDAnalysis")
-_mdtraj = _try_import("mdtraj")
+_mdanalysis = _lazy_import("MDAnalysis")
+_mdtraj = _lazy_import("mdtraj")
 
 import copy as _copy
+import numpy as _np
 import os as _os
 import shutil as _shutil
 import uuid as _uuid
@@ -49,6 +50,8 @@ from sire._load import _resolve_path
 from .. import _isVerbose
 from .._Exceptions import IncompatibleError as _IncompatibleError
 from ..Process._process import Process as _Process
+from ..Process._process import _get_file_stat
+from ..Process._restart import _update_from_template
 from .._SireWrappers import System as _System
 from ..Types import Time as _Time
 
@@ -367,6 +370,10 @@ class Trajectory:
         self._backend = None
         self._system = None
         self._property_map = {}
+        self._is_in_memory = True
+        self._iter_position = 0
+        self._num_atoms = None
+        self._traj_stat = None
 
         # Create a temporary working directory.
         self._work_dir = _Utils.WorkDir()
@@ -491,6 +498,11 @@ class Trajectory:
             _warnings.warn("Invalid trajectory format. Using default (Sire).")
             backend = "SIRE"
 
+        # Record the state of the trajectory file before it is read, so that
+        # we can tell whether a process has written frames since.
+        if self._process is not None:
+            self._traj_stat = _get_file_stat(self._process._traj_file)
+
         # Get the current trajectory.
         self._trajectory = self.getTrajectory(format=backend)
 
@@ -768,6 +780,37 @@ class Trajectory:
                     "Frame index (%d) of of range (-1 to -%d)." % (x, n_frames)
                 )
 
+            # Copy the frame coordinates, velocities, and box directly into
+            # the reference system. This avoids writing the frame to file
+            # and re-parsing it, along with the reference topology.
+            if (
+                self._system is not None
+                and self._backend in ["MDTRAJ", "MDANALYSIS"]
+                and self._is_in_memory
+            ):
+                try:
+                    coordinates, velocities, box = self._get_frame_arrays(x)
+                    new_system = _copy_frame(
+                        self._system,
+                        self._renumbered_system,
+                        self._mapping,
+                        coordinates,
+                        velocities,
+                        box,
+                        self._property_map,
+                    )
+                    frames.append(new_system)
+                    continue
+                except Exception as e:
+                    # Fall back to the file based approach for this, and all
+                    # subsequent, frames.
+                    self._is_in_memory = False
+                    if _isVerbose():
+                        _warnings.warn(
+                            "Unable to copy trajectory frame in memory, "
+                            f"falling back to file-based extraction: {e}"
+                        )
+
             # Write the current frame to file.
 
             pdb_file = _os.path.join(str(self._work_dir), f"{str(_uuid.uuid4())}.pdb")
@@ -922,6 +965,306 @@ class Trajectory:
         # Return the frames.
         return frames
 
+    def iterFrames(self, start=None, stop=None, stride=1, chunk_size=100):
+        """
+        Iterate over the trajectory, yielding the coordinates of the frames
+        in chunks. Only a single chunk of frames is held in memory at any
+        time. The position following the last frame that was read is stored,
+        so that a subsequent call with 'start=None' will only read frames
+        that have been added since, e.g. when the trajectory is bound to a
+        running process.
+
+        Parameters
+        ----------
+
+        start : int
+            The index of the first frame. If None, then iteration resumes
+            from the position following the last frame read by a previous
+            call.
+
+        stop : int
+            The index of the frame at which to stop (exclusive). If None,
+            then all available frames are read.
+
+        stride : int
+            The interval between frames.
+
+        chunk_size : int
+            The maximum number of frames in each chunk.
+
+        Yields
+        ------
+
+        coordinates : numpy.ndarray
+            A (frames, atoms, 3) array of coordinates in Angstrom.
+        """
+
+        if start is None:
+            start = self._iter_position
+        elif not type(start) is int:
+            raise TypeError("'start' must be of type 'int'")
+        elif start < 0:
+            raise ValueError("'start' must be >= 0")
+
+        if stop is not None:
+            if not type(stop) is int:
+                raise TypeError("'stop' must be of type 'int'")
+            elif stop < 0:
+                raise ValueError("'stop' must be >= 0")
+
+        if not type(stride) is int:
+            raise TypeError("'stride' must be of type 'int'")
+        elif stride < 1:
+            raise ValueError("'stride' must be >= 1")
+
+        if not type(chunk_size) is int:
+            raise TypeError("'chunk_size' must be of type 'int'")
+        elif chunk_size < 1:
+            raise ValueError("'chunk_size' must be >= 1")
+
+        chunk = []
+        for index, coordinates in self._iter_frame_arrays(
+            start, stop, stride, chunk_size
+        ):
+            chunk.append(coordinates)
+
+            if len(chunk) == chunk_size:
+                # Store the read position before handing the chunk over, since
+                # the caller might not resume the generator.
+                self._iter_position = index + stride
+                yield _np.array(chunk)
+                chunk = []
+
+        if len(chunk) > 0:
+            self._iter_position = index + stride
+            yield _np.array(chunk)
+
+    def _iter_frame_arrays(self, start, stop, stride, chunk_size):
+        """
+        Internal generator to read the coordinates of trajectory frames one
+        at a time.
+
+        Parameters
+        ----------
+
+        start : int
+            The index of the first frame.
+
+        stop : int
+            The index of the frame at which to stop (exclusive), or None to
+            read all available frames.
+
+        stride : int
+            The interval between frames.
+
+        chunk_size : int
+            The number of frames to read from disk at once, where supported
+            by the backend.
+
+        Yields
+        ------
+
+        index : int
+            The index of the frame.
+
+        coordinates : numpy.ndarray
+            The (atoms, 3) array of coordinates in Angstrom.
+        """
+
+        # Whether frames are still being added to the trajectory.
+        is_growing = self._process is not None and self._process.isRunning()
+
+        if is_growing:
+            self._traj_file = self._process._traj_file
+            if not _os.path.isfile(self._traj_file):
+                return
+        else:
+            self._refresh_trajectory()
+            if self._trajectory is None:
+                return
+
+        if self._backend == "MDTRAJ":
+            # Use the coordinates that are already in memory.
+            if not is_growing:
+                xyz = self._trajectory.xyz
+                if stop is None or stop > len(xyz):
+                    stop = len(xyz)
+                for index in range(start, stop, stride):
+                    yield index, 10 * xyz[index]
+                return
+
+            # Otherwise, stream the frames from the file so that the whole
+            # trajectory isn't reloaded each time frames are added.
+            if self._trajectory is not None:
+                topology = self._trajectory.topology
+            elif self._top_file is not None and _os.path.isfile(self._top_file):
+                topology = self._top_file
+            else:
+                return
+
+            index = start
+            for traj in _mdtraj.iterload(
+                self._traj_file,
+                top=topology,
+                chunk=chunk_size,
+                stride=stride,
+                skip=start,
+            ):
+                for xyz in traj.xyz:
+                    if stop is not None and index >= stop:
+                        return
+                    yield index, 10 * xyz
+                    index += stride
+
+        elif self._backend == "MDANALYSIS":
+            # Open a new reader for the trajectory file of a running process,
+            # so that the frame count includes any frames added since the
+            # trajectory was loaded, without re-parsing the topology.
+            if is_growing:
+                reader = _mdanalysis.coordinates.core.reader(self._traj_file)
+            else:
+                reader = self._trajectory.trajectory
+
+            n_frames = reader.n_frames
+            if stop is None or stop > n_frames:
+                stop = n_frames
+
+            try:
+                for index, frame in zip(
+                    range(start, stop, stride), reader[start:stop:stride]
+                ):
+                    yield index, frame.positions.copy()
+            finally:
+                if is_growing:
+                    reader.close()
+                else:
+                    # Rewind the trajectory.
+                    reader.rewind()
+
+        else:
+            # Sire has no streaming reader, so reload the trajectory, but
+            # only if the file has changed since it was last read.
+            if is_growing:
+                self._refresh_trajectory()
+                if self._trajectory is None:
+                    return
+
+            n_frames = len(self._trajectory)
+            if stop is None or stop > n_frames:
+                stop = n_frames
+
+            coord_prop = self._property_map.get("coordinates", "coordinates")
+
+            for index in range(start, stop, stride):
+                system = self._trajectory[index].current()._system
+                coordinates = []
+                for idx in range(0, system.nMolecules()):
+                    mol = system[_SireMol.MolIdx(idx)]
+                    coordinates.extend(
+                        [v.x(), v.y(), v.z()]
+                        for v in mol.property(coord_prop).toVector()
+                    )
+                yield index, _np.array(coordinates)
+
+    def _refresh_trajectory(self):
+        """
+        Internal helper function to reload the trajectory of a process if
+        the trajectory file has changed since it was last read.
+        """
+
+        if self._process is None:
+            return
+
+        self._traj_file = self._process._traj_file
+
+        # Record the state of the file before it is read, so that frames
+        # written while reading are picked up next time.
+        stat = _get_file_stat(self._traj_file)
+        if stat is None:
+            return
+
+        if self._trajectory is None or stat != self._traj_stat:
+            self._trajectory = self.getTrajectory(format=self._backend)
+            self._traj_stat = stat
+
+    def _get_num_atoms(self):
+        """
+        Internal helper function to get the number of atoms in each frame.
+        This is cached the first time that it is computed.
+
+        Returns
+        -------
+
+        num_atoms : int
+            The number of atoms.
+        """
+
+        if self._num_atoms is None:
+            if self._trajectory is None:
+                self._trajectory = self.getTrajectory(format=self._backend)
+                if self._trajectory is None:
+                    raise ValueError("There is no trajectory!")
+
+            if self._backend == "MDTRAJ":
+                self._num_atoms = self._trajectory.n_atoms
+            elif self._backend == "MDANALYSIS":
+                self._num_atoms = len(self._trajectory.atoms)
+            else:
+                self._num_atoms = len(self._trajectory.current().atoms())
+
+        return self._num_atoms
+
+    def _get_frame_arrays(self, index):
+        """
+        Internal helper function to extract the coordinates, velocities, and
+        box information for a frame from an MDTraj or MDAnalysis trajectory.
+
+        Parameters
+        ----------
+
+        index : int
+            The index of the frame.
+
+        Returns
+        -------
+
+        coordinates : numpy.ndarray
+            The (atoms, 3) array of coordinates in Angstrom.
+
+        velocities : numpy.ndarray, None
+            The (atoms, 3) array of velocities in Angstrom per picosecond,
+            or None if the frame doesn't contain velocities.
+
+        box : numpy.ndarray, None
+            The box lengths in Angstrom and angles in degrees, or None if
+            the frame doesn't contain box information.
+        """
+
+        if self._backend == "MDTRAJ":
+            # MDTraj uses nanometers and doesn't store velocities.
+            coordinates = 10 * self._trajectory.xyz[index]
+            velocities = None
+            if self._trajectory.unitcell_lengths is None:
+                box = None
+            else:
+                box = _np.concatenate(
+                    (
+                        10 * self._trajectory.unitcell_lengths[index],
+                        self._trajectory.unitcell_angles[index],
+                    )
+                )
+
+        elif self._backend == "MDANALYSIS":
+            frame = self._trajectory.trajectory[index]
+            coordinates = frame.positions
+            velocities = frame.velocities if frame.has_velocities else None
+            box = frame.dimensions
+
+        else:
+            raise ValueError(f"Unsupported backend: {self._backend}")
+
+        return coordinates, velocities, box
+
     def nFrames(self):
         """
         Return the current number of trajectory frames.
@@ -994,14 +1337,25 @@ class Trajectory:
             if not all(type(x) is int for x in atoms):
                 raise TypeError("'atom' indices must be of type 'int'")
             # Make sure the atom index is within range.
-            num_atoms = self.getFrames()[0].nAtoms()
+            num_atoms = self._get_num_atoms()
             for atom in atoms:
                 if atom < 0 or atom >= num_atoms:
                     raise ValueError(
                         f"Atom index {atom} out of range [0, {num_atoms})."
                     )
+            atoms = list(atoms)
+
+        # Convert negative frame indices.
+        if frame < 0:
+            frame += self.nFrames()
 
         if self._backend == "SIRE":
+            # Sire computes the RMSD natively, so there's no need to copy the
+            # coordinates of every frame.
+            self._refresh_trajectory()
+            if self._trajectory is None:
+                raise ValueError("There is no trajectory!")
+
             # Get the reference.
             if atoms is not None:
                 reference = self._trajectory.current().atoms()[atoms]
@@ -1012,48 +1366,139 @@ class Trajectory:
             rmsd = self._trajectory.rmsd(reference=reference, frame=frame)
 
             # Convert to BioSimSpace units.
-            rmsd = [(_Units.Length.angstrom * x.value()).nanometers() for x in rmsd]
+            return [(_Units.Length.angstrom * x.value()).nanometers() for x in rmsd]
 
-        elif self._backend == "MDTRAJ":
-            try:
-                rmsd = _mdtraj.rmsd(
-                    self._trajectory,
-                    self._trajectory,
-                    frame=frame,
-                    atom_indices=atoms,
-                )
-            except Exception as e:
-                msg = "Atom indices not found in the system."
-                if _isVerbose():
-                    raise ValueError(msg) from e
-                else:
-                    raise ValueError(msg) from None
+        # Get the coordinates of the reference frame.
+        _, reference = next(self._iter_frame_arrays(frame, frame + 1, 1, 1))
+        if atoms is not None:
+            reference = reference[atoms]
+
+        # Compute the RMSD for chunks of frames.
+        chunk_size = 100
+        rmsd = []
+        chunk = []
+        for _, coordinates in self._iter_frame_arrays(0, None, 1, chunk_size):
+            chunk.append(coordinates if atoms is None else coordinates[atoms])
+            if len(chunk) == chunk_size:
+                rmsd.extend(_kabsch_rmsd(_np.array(chunk), reference))
+                chunk = []
+        if len(chunk) > 0:
+            rmsd.extend(_kabsch_rmsd(_np.array(chunk), reference))
+
+        # Convert to BioSimSpace units.
+        rmsd = [(_Units.Length.angstrom * float(x)).nanometers() for x in rmsd]
 
-            # Convert to a list and add units.
-            rmsd = [_Units.Length.nanometer * float(x) for x in rmsd]
+        # Return the RMSD result.
+        return rmsd
 
-        else:
-            _rms = _try_import("MDAnalysis.analysis.rms")
 
-            # Create the atom selection.
-            if atoms is None:
-                select = "all"
-            else:
-                select = "bynum " + " ".join([str(x + 1) for x in atoms])
+def _kabsch_rmsd(coordinates, reference):
+    """
+    Internal helper function to compute the RMSD between each frame in a
+    batch and a reference, following optimal superposition using the
+    Kabsch algorithm.
 
-            # Instantiate the RMSD object.
-            R = _rms.RMSD(self._trajectory, self._trajectory, select, ref_frame=frame)
+    Parameters
+    ----------
 
-            # Run the analysis.
-            R.run()
+    coordinates : numpy.ndarray
+        A (frames, atoms, 3) array of coordinates.
 
-            # Get the RMSD results.
-            results = R.results.rmsd
+    reference : numpy.ndarray
+        An (atoms, 3) array of reference coordinates.
 
-            rmsd = [_Units.Length.nanometer * float(x[-1] / 10) for x in results]
+    Returns
+    -------
 
-        # Return the RMSD result.
-        return rmsd
+    rmsd : numpy.ndarray
+        The RMSD of each frame, in the units of the coordinates.
+    """
+
+    coordinates = _np.asarray(coordinates, dtype=_np.float64)
+    reference = _np.asarray(reference, dtype=_np.float64)
+
+    # Remove the centre of geometry.
+    coordinates = coordinates - coordinates.mean(axis=1, keepdims=True)
+    reference = reference - reference.mean(axis=0)
+
+    # Compute the covariance matrix for each frame and its singular values.
+    covariance = _np.einsum("fai,aj->fij", coordinates, reference)
+    u, sigma, vt = _np.linalg.svd(covariance)
+
+    # Correct for improper rotations, i.e. reflections.
+    sign = _np.sign(_np.linalg.det(u) * _np.linalg.det(vt))
+    sigma[:, -1] *= sign
+
+    # The minimum residual for each frame.
+    residual = (
+        _np.einsum("fai,fai->f", coordinates, coordinates)
+        + _np.sum(reference * reference)
+        - 2 * sigma.sum(axis=1)
+    )
+
+    return _np.sqrt(_np.maximum(residual, 0) / reference.shape[0])
+
+
+def _copy_frame(
+    system, reference, mapping, coordinates, velocities=None, box=None, property_map={}
+):
+    """
+    Internal helper function to copy the coordinates, velocities, and box
+    information for a trajectory frame directly into a system. Atoms in the
+    frame are assumed to be in the same order as in the system.
+
+    Parameters
+    ----------
+
+    system : :class:`System <BioSimSpace._SireWrappers.System>`
+        The BioSimSpace System object to copy the frame into.
+
+    reference : :class:`System <BioSimSpace._SireWrappers.System>`
+        A renumbered copy of the system, used as a template for the frame.
+
+    mapping : dict
+        The molecule mapping between the frame and the system.
+
+    coordinates : numpy.ndarray
+        The (atoms, 3) array of coordinates in Angstrom.
+
+    velocities : numpy.ndarray
+        The (atoms, 3) array of velocities in Angstrom per picosecond.
+
+    box : numpy.ndarray
+        The box lengths in Angstrom and angles in degrees.
+
+    property_map : dict
+        A dictionary that maps system "properties" to their user defined
+        values. This allows the user to refer to properties with their
+        own naming scheme, e.g. { "charge" : "my-charge" }
+
+    Returns
+    -------
+
+    system : :class:`System <BioSimSpace._SireWrappers.System>`
+        A copy of the system with the updated coordinates and velocities.
+    """
+
+    # Copy the frame into the reference system.
+    frame = _update_from_template(
+        reference, coordinates, velocities, property_map=property_map
+    )._sire_object
+
+    # Copy the coordinates and velocities into the system.
+    sire_system, _ = _SireIO.updateCoordinatesAndVelocities(
+        system._sire_object, frame, mapping, False, property_map, {}
+    )
+
+    # Update the box information in the system.
+    if box is not None and all(x > 0 for x in box[:3]):
+        degree = _SireUnits.degree
+        dimensions = [float(x) for x in box[:3]]
+        angles = [float(x) * degree for x in box[3:]]
+        space = _SireVol.TriclinicBox(*dimensions, *angles)
+        sire_system.setProperty(property_map.get("space", "space"), space)
+
+    return _System(sire_system)
 
 
 def _split_molecules(frame, pdb, reference, work_dir, property_map={}):
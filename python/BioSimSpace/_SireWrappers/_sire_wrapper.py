@@ -411,6 +411,10 @@ class SireWrapper:
         filebase : str
             The base name of the binary output file.
         """
+
+        # Import here since Stream is only imported on first use.
+        from ..Stream import save as _save
+
         _save(self, filebase)
 
     def _getSireObject(self):
@@ -480,7 +484,3 @@ class SireWrapper:
 
         # Return the AABox for the coordinates.
         return _SireVol.AABox(coord)
-
-
-# Import at bottom of module to avoid circular dependency.
-from BioSimSpace.Stream import save as _save
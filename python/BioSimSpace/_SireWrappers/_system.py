@@ -69,6 +69,14 @@ class System(_SireWrapper):
             a BioSimSpace Molecules object, or a list of BioSimSpace molecule objects.
         """
 
+        # Initialise the structural fingerprint. This maps molecule numbers
+        # to hashes of their version, which are combined into a single
+        # fingerprint for the system. It is computed on demand, then updated
+        # incrementally when molecules are added, removed, or updated.
+        self._molecule_fingerprints = {}
+        self._fingerprint = None
+        self._fingerprint_version = None
+
         # Check that the system is valid.
 
         # Convert tuple to a list.
@@ -82,6 +90,9 @@ class System(_SireWrapper):
         # Another BioSimSpace System object.
         elif isinstance(system, System):
             super().__init__(system._sire_object)
+            self._molecule_fingerprints = system._molecule_fingerprints.copy()
+            self._fingerprint = system._fingerprint
+            self._fingerprint_version = system._fingerprint_version
 
         # A Sire Molecule object.
         elif isinstance(system, _SireMol.Molecule):
@@ -455,6 +466,11 @@ class System(_SireWrapper):
         if self._sire_object.uid() != other._sire_object.uid():
             return False
 
+        # If the fingerprints match, then the systems contain the same versions
+        # of the same molecules, so are definitely the same.
+        if self._getFingerprint() == other._getFingerprint():
+            return True
+
         # Return False if the systems have a different number of molecules,
         # atoms, or residues.
         if (
@@ -615,6 +631,9 @@ class System(_SireWrapper):
                 "'BioSimSpace._SireWrappers.Molecule' types."
             )
 
+        # Whether the fingerprint can be updated incrementally.
+        is_current = self._isFingerprintCurrent()
+
         # Store the existing number of molecules.
         num_mols = self._sire_object.nMolecules()
 
@@ -704,6 +723,12 @@ class System(_SireWrapper):
                             "Failed to remove 'velocity0' and 'velocity1' property from molecules!"
                         )
 
+                # All molecules have changed.
+                is_current = False
+
+        # Update the fingerprint for the new molecules.
+        self._updateFingerprint([] if is_current else None)
+
     def removeMolecules(self, molecules):
         """
         Remove a molecule, or list of molecules from the system.
@@ -745,6 +770,9 @@ class System(_SireWrapper):
                 "or a list of 'BioSimSpace._SireWrappers.Molecule' types."
             )
 
+        # Whether the fingerprint can be updated incrementally.
+        is_current = self._isFingerprintCurrent()
+
         # Remove the molecules in the system.
         if is_sire_container:
             self._sire_object.remove(molecules._sire_object, _SireMol.MGName("all"))
@@ -758,9 +786,15 @@ class System(_SireWrapper):
         # Update the molecule numbers.
         self._mol_nums = self._sire_object.molNums()
 
+        # Update the fingerprint.
+        self._updateFingerprint([] if is_current else None)
+
     def removeWaterMolecules(self):
         """Remove all of the water molecules from the system."""
 
+        # Whether the fingerprint can be updated incrementally.
+        is_current = self._isFingerprintCurrent()
+
         # Get the list of water molecules.
         waters = self.getWaterMolecules()
 
@@ -773,6 +807,9 @@ class System(_SireWrapper):
         # Update the molecule numbers.
         self._mol_nums = self._sire_object.molNums()
 
+        # Update the fingerprint.
+        self._updateFingerprint([] if is_current else None)
+
     def updateMolecule(self, index, molecule):
         """
         Update the molecule at the given index.
@@ -804,6 +841,9 @@ class System(_SireWrapper):
 
         # The molecule numbers don't match.
         else:
+            # Whether the fingerprint can be updated incrementally.
+            is_current = self._isFingerprintCurrent()
+
             # Create a copy of the system.
             system = self.copy()._sire_object
 
@@ -822,6 +862,9 @@ class System(_SireWrapper):
             # Update the molecule numbers.
             self._mol_nums = self._sire_object.molNums()
 
+            # Update the fingerprint.
+            self._updateFingerprint([] if is_current else None)
+
     def updateMolecules(self, molecules):
         """
         Update a molecule, or list of molecules in the system.
@@ -862,6 +905,9 @@ class System(_SireWrapper):
         # operate on a copy of the system since the original will be destroyed if
         # an exception is thrown.
         for mol in molecules:
+            # Whether the fingerprint can be updated incrementally.
+            is_current = self._isFingerprintCurrent()
+
             # Only try to update the molecule if it exists in the system.
             if _SireMol.MolNum(mol.number()) in self._mol_nums:
                 try:
@@ -896,6 +942,11 @@ class System(_SireWrapper):
             # Update the molecule numbers.
             self._mol_nums = self._sire_object.molNums()
 
+            # Update the fingerprint for this molecule.
+            self._updateFingerprint(
+                [_SireMol.MolNum(mol.number())] if is_current else None
+            )
+
     def getMolecule(self, index):
         """
         Return the molecule at the given index.
@@ -2357,6 +2408,101 @@ class System(_SireWrapper):
 
         raise ValueError("'abs_index' exceeded system atom tally!")
 
+    def _getFingerprint(self):
+        """
+        Internal helper function to return a structural fingerprint for the
+        system. Systems with the same UID and fingerprint contain the same
+        versions of the same molecules, in the same order, along with the
+        same system properties.
+
+        Returns
+        -------
+
+        fingerprint : int
+            The fingerprint.
+        """
+        if not self._isFingerprintCurrent():
+            self._molecule_fingerprints = {}
+            self._updateFingerprint([])
+        return self._fingerprint
+
+    def _isFingerprintCurrent(self):
+        """
+        Internal helper function to check whether the stored fingerprint is
+        up to date, i.e. the system hasn't been modified since it was computed.
+
+        Returns
+        -------
+
+        is_current : bool
+            Whether the fingerprint is current.
+        """
+        if self._fingerprint is None:
+            return False
+
+        # The UID is needed too, since systems with different UIDs can have
+        # the same version.
+        try:
+            version = (self._sire_object.uid(), self._sire_object.version())
+            return version == self._fingerprint_version
+        except:
+            return False
+
+    def _updateFingerprint(self, mol_nums=None):
+        """
+        Internal helper function to update the structural fingerprint.
+
+        Parameters
+        ----------
+
+        mol_nums : [Sire.Mol.MolNum]
+            The numbers of the molecules that have changed. Molecules that
+            have been added or removed are detected automatically. If None,
+            then the fingerprint is invalidated and will be recomputed for
+            all molecules when next needed.
+        """
+
+        if mol_nums is None:
+            self._molecule_fingerprints = {}
+            self._fingerprint = None
+            self._fingerprint_version = None
+            return
+
+        # Hash the molecule number and version of each molecule that has
+        # changed, or is missing.
+        mol_nums = set(mol_nums)
+        for idx, num in enumerate(self._mol_nums):
+            if num in mol_nums or num not in self._molecule_fingerprints:
+                mol = self._sire_object[_SireMol.MolIdx(idx)]
+                self._molecule_fingerprints[num] = hash((num.value(), mol.version()))
+
+        # Remove the entries for molecules that are no longer in the system.
+        if len(self._molecule_fingerprints) > len(self._mol_nums):
+            current = set(self._mol_nums)
+            for num in list(self._molecule_fingerprints):
+                if num not in current:
+                    del self._molecule_fingerprints[num]
+
+        # Hash the system properties, ignoring internal metadata.
+        props = tuple(
+            (prop, str(self._sire_object.property(prop)))
+            for prop in sorted(self._sire_object.propertyKeys())
+            if prop not in ["fileformat", "is_perturbable", "was_perturbable"]
+        )
+
+        # Combine into a single fingerprint, accounting for molecule order.
+        self._fingerprint = hash(
+            (tuple(self._molecule_fingerprints[num] for num in self._mol_nums), props)
+        )
+
+        try:
+            self._fingerprint_version = (
+                self._sire_object.uid(),
+                self._sire_object.version(),
+            )
+        except:
+            self._fingerprint_version = None
+
     def _reset_mappings(self):
         """Internal function to reset index mapping dictionaries."""
 
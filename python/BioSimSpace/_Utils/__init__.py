@@ -37,6 +37,7 @@ Context managers
     :toctree: generated/
 
     cd
+    env
 
 Functions
 =========
@@ -47,11 +48,14 @@ Functions
     command_split
     _module_stub
     _try_import
+    _lazy_import
     _have_imported
     _assert_imported
 """
 
+from ._cache import *
 from ._command_split import *
 from ._contextmanagers import *
+from ._executables import *
 from ._module_stub import *
 from ._workdir import *
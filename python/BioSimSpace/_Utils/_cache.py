@@ -0,0 +1,183 @@
+######################################################################
+# BioSimSpace: Making biomolecular simulation a breeze!
+#
+# Copyright: 2017-2024
+#
+# Authors: Lester Hedges <lester.hedges@gmail.com>
+#
+# BioSimSpace is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BioSimSpace is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BioSimSpace. If not, see <http://www.gnu.org/licenses/>.
+#####################################################################
+
+"""
+Functionality for persistent on-disk caches. Each cache is a JSON
+dictionary that is shared between processes, so it is updated under a
+file lock and written atomically, and failure to read or write it is
+never an error.
+"""
+
+__author__ = "Lester Hedges"
+__email__ = "lester.hedges@gmail.com"
+
+__all__ = ["_cache_file", "_load_cache", "_save_cache"]
+
+import contextlib as _contextlib
+import json as _json
+import os as _os
+import tempfile as _tempfile
+
+try:
+    import fcntl as _fcntl
+except ImportError:
+    # File locking isn't available on Windows. The cache is still written
+    # atomically, so only entries from concurrent updates can be lost.
+    _fcntl = None
+
+
+def _cache_file(env_var, file_name):
+    """
+    Return the path to a cache file. This can be set using the passed
+    environment variable, which can be set to an empty string to disable
+    the cache. Otherwise, the file is placed in the 'biosimspace' directory
+    within $XDG_CACHE_HOME, or ~/.cache if this isn't set.
+
+    Parameters
+    ----------
+
+    env_var : str
+        The name of the environment variable used to set the path.
+
+    file_name : str
+        The name of the cache file in the default cache directory.
+
+    Returns
+    -------
+
+    cache_file : str
+        The path to the cache file, or None if caching is disabled.
+    """
+    cache_file = _os.environ.get(env_var)
+    if cache_file is not None:
+        return cache_file if cache_file != "" else None
+
+    cache_dir = _os.environ.get("XDG_CACHE_HOME")
+    if cache_dir is None:
+        cache_dir = _os.path.join(_os.path.expanduser("~"), ".cache")
+
+    return _os.path.join(cache_dir, "biosimspace", file_name)
+
+
+def _load_cache(cache_file):
+    """
+    Load a cache.
+
+    Parameters
+    ----------
+
+    cache_file : str
+        The path to the cache file. If None, then an empty cache is returned.
+
+    Returns
+    -------
+
+    cache : dict
+        The cached entries.
+    """
+    if cache_file is None:
+        return {}
+
+    try:
+        with open(cache_file, "r") as f:
+            cache = _json.load(f)
+        if isinstance(cache, dict):
+            return cache
+    except (OSError, ValueError):
+        pass
+
+    return {}
+
+
+def _save_cache(cache_file, entries, is_stale=None):
+    """
+    Add entries to a cache. The entries are merged with the current
+    contents of the file, since other processes may have added entries
+    since it was loaded.
+
+    Parameters
+    ----------
+
+    cache_file : str
+        The path to the cache file. If None, then nothing is saved.
+
+    entries : dict
+        The entries to add. These must be serialisable to JSON.
+
+    is_stale : callable
+        An optional function that is passed the key of each existing entry
+        and returns whether it should be removed from the cache.
+    """
+    if cache_file is None:
+        return
+
+    try:
+        cache_dir = _os.path.dirname(_os.path.abspath(cache_file))
+        _os.makedirs(cache_dir, exist_ok=True)
+
+        # Hold the lock while merging, so that entries added by other
+        # processes aren't lost.
+        with _lock_cache(cache_file):
+            cache = _load_cache(cache_file)
+
+            if is_stale is not None:
+                for key in list(cache):
+                    if is_stale(key):
+                        del cache[key]
+
+            cache.update(entries)
+
+            # Write to a temporary file and rename, so that processes reading
+            # the cache never see a partially written file.
+            fd, tmp_file = _tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with _os.fdopen(fd, "w") as f:
+                    _json.dump(cache, f)
+                _os.replace(tmp_file, cache_file)
+            except:
+                _os.remove(tmp_file)
+                raise
+    except OSError:
+        pass
+
+
+@_contextlib.contextmanager
+def _lock_cache(cache_file):
+    """
+    Internal context manager to lock a cache file for updating.
+
+    Parameters
+    ----------
+
+    cache_file : str
+        The path to the cache file.
+    """
+
+    if _fcntl is None:
+        yield
+        return
+
+    with open(cache_file + ".lock", "a") as f:
+        _fcntl.flock(f, _fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            _fcntl.flock(f, _fcntl.LOCK_UN)
@@ -24,7 +24,7 @@
 __author__ = "Lester Hedges"
 __email__ = "lester.hedges@gmail.com"
 
-__all__ = ["cd"]
+__all__ = ["cd", "env"]
 
 from contextlib import contextmanager as _contextmanager
 
@@ -73,3 +73,44 @@ def cd(work_dir):
     # Return to original directory.
     finally:
         _os.chdir(old_dir)
+
+
+@_contextmanager
+def env(**variables):
+    """
+    Execute the context with the given environment variables set. Any
+    existing values are restored on exit. Since the environment is shared
+    by all threads, this is intended for short-lived contexts, such as
+    launching a sub-process that should inherit the variables.
+
+    Parameters
+    ----------
+
+    variables : str
+        The names and values of the environment variables.
+    """
+
+    # Validate the input.
+    for key, value in variables.items():
+        if not isinstance(value, str):
+            raise TypeError(
+                f"The value of environment variable '{key}' must be a 'str'"
+            )
+
+    # Store the current values.
+    old_values = {key: _os.environ.get(key) for key in variables}
+
+    # Set the new values.
+    _os.environ.update(variables)
+
+    # Execute the context.
+    try:
+        yield
+
+    # Restore the original environment.
+    finally:
+        for key, value in old_values.items():
+            if value is None:
+                del _os.environ[key]
+            else:
+                _os.environ[key] = value
@@ -0,0 +1,205 @@
+######################################################################
+# BioSimSpace: Making biomolecular simulation a breeze!
+#
+# Copyright: 2017-2024
+#
+# Authors: Christopher Woods <chryswoods@hey.com>
+#
+# BioSimSpace is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# BioSimSpace is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BioSimSpace. If not, see <http://www.gnu.org/licenses/>.
+#####################################################################
+
+"""
+Functionality for locating external executables. The results of probing
+an executable are cached on disk, keyed on its path, size and modification
+time, so that short-lived processes don't need to run it on import.
+"""
+
+__author__ = "Lester Hedges"
+__email__ = "lester.hedges@gmail.com"
+
+__all__ = ["_find_gromacs", "_gromacs_info"]
+
+import json as _json
+import os as _os
+
+from ._cache import _cache_file, _load_cache, _save_cache
+
+# The version of the cache format. Increment this when the cached data changes.
+_exe_cache_version = 1
+
+
+def _exe_cache_file():
+    """
+    Return the path to the executable cache. This can be set using the
+    BSS_EXE_CACHE environment variable, which can be set to an empty
+    string to disable the cache.
+
+    Returns
+    -------
+
+    cache_file : str
+        The path to the cache file, or None if caching is disabled.
+    """
+    return _cache_file("BSS_EXE_CACHE", "executables.json")
+
+
+def _exe_cache_key(exe):
+    """
+    Return the cache key for an executable. This changes whenever the
+    executable is replaced.
+
+    Parameters
+    ----------
+
+    exe : str
+        The path to the executable.
+
+    Returns
+    -------
+
+    key : str
+        The cache key, or None if the executable doesn't exist.
+    """
+    try:
+        stat = _os.stat(exe)
+    except OSError:
+        return None
+
+    return _json.dumps(
+        [_exe_cache_version, _os.path.realpath(exe), stat.st_size, stat.st_mtime_ns]
+    )
+
+
+def _save_exe_cache(key, value):
+    """
+    Add an entry to the executable cache. Failure to write the cache is
+    not an error.
+
+    Parameters
+    ----------
+
+    key : str
+        The cache key.
+
+    value :
+        The data to cache. This must be serialisable to JSON.
+    """
+    path = _json.loads(key)[1]
+
+    # Remove stale entries for the same executable.
+    def is_stale(old_key):
+        try:
+            return _json.loads(old_key)[1] == path
+        except (ValueError, TypeError, IndexError):
+            return True
+
+    _save_cache(_exe_cache_file(), {key: value}, is_stale)
+
+
+def _find_gromacs():
+    """
+    Find the GROMACS executable. The directory specified by the GROMACSHOME
+    environment variable is searched first, followed by the PATH.
+
+    Returns
+    -------
+
+    exe : str
+        The path to the GROMACS executable, or None if it wasn't found.
+    """
+    from sire.legacy import Base as _SireBase
+
+    exes = []
+    if "GROMACSHOME" in _os.environ:
+        gromacs_home = _os.environ.get("GROMACSHOME")
+        exes = ["%s/bin/gmx" % gromacs_home, "%s/bin/gmx_mpi" % gromacs_home]
+    exes += ["gmx", "gmx_mpi"]
+
+    for exe in exes:
+        try:
+            return _SireBase.findExe(exe).absoluteFilePath()
+        except:
+            pass
+
+    return None
+
+
+def _gromacs_info(exe):
+    """
+    Get the topology directory and version of a GROMACS executable. This
+    runs 'gmx -version' the first time that a particular executable is
+    seen, with the result cached on disk.
+
+    Parameters
+    ----------
+
+    exe : str
+        The path to the GROMACS executable.
+
+    Returns
+    -------
+
+    path : str
+        The path to the GROMACS topology directory, or None if it couldn't
+        be found.
+
+    version : float
+        The GROMACS version, or None if it couldn't be determined.
+    """
+
+    key = _exe_cache_key(exe)
+
+    if key is not None:
+        cached = _load_cache(_exe_cache_file()).get(key)
+        if cached is not None:
+            path, version = cached
+            # Make sure that the topology directory still exists.
+            if path is None or _os.path.isdir(path):
+                return path, version
+
+    import subprocess as _subprocess
+
+    from ._command_split import command_split
+
+    path = None
+    version = None
+
+    # Run gmx -version.
+    proc = _subprocess.run(
+        command_split("%s -version" % exe),
+        shell=False,
+        text=True,
+        stdout=_subprocess.PIPE,
+        stderr=_subprocess.PIPE,
+    )
+
+    if proc.returncode == 0:
+        for line in proc.stdout.split("\n"):
+            # Extract the "Data prefix" from the output.
+            if "Data prefix" in line:
+                path = line.split(":")[1].strip() + "/share/gromacs/top"
+            # Extract the version from the output.
+            elif "GROMACS version" in line:
+                version = float(line.split(":")[1].split("-")[0])
+                break
+
+        # Check that the topology directory exists.
+        if path is not None and not _os.path.isdir(path):
+            path = None
+
+        # Only cache successful probes.
+        if key is not None:
+            _save_exe_cache(key, [path, version])
+
+    return path, version
@@ -30,7 +30,13 @@ has not been installed.
 __author__ = "Christopher Woods"
 __email__ = "chryswoods@hey.com"
 
-__all__ = ["_module_stub", "_try_import", "_assert_imported", "_have_imported"]
+__all__ = [
+    "_module_stub",
+    "_try_import",
+    "_lazy_import",
+    "_assert_imported",
+    "_have_imported",
+]
 
 _failed_modules = {}
 
@@ -135,12 +141,69 @@ def _try_import(name: str, install_command: str = None):
     return m
 
 
+class _LazyModule:
+    """
+    A proxy for a module that is only imported on first use. If the
+    import fails, then the proxy behaves like a _ModuleStub.
+    """
+
+    def __init__(self, name: str, install_command: str):
+        self._name = name
+        self._install_command = install_command
+        self._module = None
+
+    def __repr__(self):
+        return f"<lazymodule '{self._name}'>"
+
+    def _load(self):
+        """Import the module, if it hasn't been already, and return it."""
+        if self._module is None:
+            self._module = _try_import(self._name, self._install_command)
+        return self._module
+
+    def __getattr__(self, key):
+        # Guard against recursion before the constructor has run, e.g.
+        # when copying or unpickling.
+        if key in ("_name", "_install_command", "_module"):
+            raise AttributeError(key)
+        return getattr(self._load(), key)
+
+
+def _lazy_import(name: str, install_command: str = None):
+    """
+    Return a proxy for the module called 'name' that defers importing it
+    until one of its attributes is first accessed. This avoids paying the
+    cost of importing heavy optional dependencies unless they are used.
+    If the import fails, then the proxy behaves like a _ModuleStub.
+
+    Parameters
+    ----------
+
+    name : str
+        The name of the module
+
+    install_command : str (optional)
+        The command used to install the module. If
+        this is not supplied, then it is assumed
+        to be 'conda install {name}'
+
+    Returns
+    -------
+
+    module : _LazyModule
+        A proxy for the module
+    """
+    return _LazyModule(name=name, install_command=install_command)
+
+
 def _assert_imported(module):
     """
     Assert that the passed module has indeed been imported.
     This will raise a ModuleNotFoundError if the module
     has not been imported, and has instead been stubbed.
     """
+    if type(module) == _LazyModule:
+        module = module._load()
     if type(module) == _ModuleStub:
         module.this_will_break()
 
@@ -150,4 +213,6 @@ def _have_imported(module) -> bool:
     Return whether or not the passed module has indeed
     been imported (and thus is not stubbed).
     """
+    if type(module) == _LazyModule:
+        module = module._load()
     return type(module) != _ModuleStub
@@ -154,85 +154,44 @@ if "AMBERHOME" in _environ:
 else:
     _amber_home = None
 
-# Check to see if GROMACS is installed.
-from sire.legacy import Base as _SireBase
-from os import path as _path
-
-# First, let the user tell us where to find GROMACS. This
-# assumes that gromacs is installed in $GROMACSHOME/bin/gmx.
-_gmx_exe = None
-if "GROMACSHOME" in _environ:
-    try:
-        _gmx_exe = _SireBase.findExe(
-            "%s/bin/gmx" % _environ.get("GROMACSHOME")
-        ).absoluteFilePath()
-    except:
-        try:
-            _gmx_exe = _SireBase.findExe(
-                "%s/bin/gmx_mpi" % _environ.get("GROMACSHOME")
-            ).absoluteFilePath()
-        except:
-            pass
-
-if _gmx_exe is None:
-    # The user has not told us where it is, so need to look in $PATH.
-    try:
-        _gmx_exe = _SireBase.findExe("gmx").absoluteFilePath()
-    except:
-        try:
-            _gmx_exe = _SireBase.findExe("gmx_mpi").absoluteFilePath()
-        except:
-            pass
-
 del _environ
-del _SireBase
 
-_gmx_path = None
-_gmx_version = None
+# The GROMACS executable, topology directory, and version are found lazily,
+# on first access, since this requires running 'gmx -version'. The results
+# of probing the executable are cached on disk.
 
-# Try using the GROMACS exe to get the version and data directory.
-if _gmx_exe is not None:
-    import shlex as _shlex
-    import subprocess as _subprocess
+from . import _Utils
 
-    # Generate the shell command. (Run gmx -version.)
-    _command = "%s -version" % _gmx_exe
+# Sub-packages that aren't needed by the rest of BioSimSpace. These are
+# imported on first access.
+_lazy_packages = ["Node", "Parameters", "Stream"]
 
-    from ._Utils import command_split
 
-    # Run the command.
-    _proc = _subprocess.run(
-        command_split(_command),
-        shell=False,
-        text=True,
-        stdout=_subprocess.PIPE,
-        stderr=_subprocess.PIPE,
-    )
+def __getattr__(name):
+    """Lazily find GROMACS and import sub-packages on first access."""
+
+    if name in ("_gmx_exe", "_gmx_path", "_gmx_version"):
+        gmx_exe = _Utils._find_gromacs()
+        if gmx_exe is None:
+            gmx_path, gmx_version = None, None
+        else:
+            gmx_path, gmx_version = _Utils._gromacs_info(gmx_exe)
+
+        # Store the results so that this is only called once.
+        globals().update(_gmx_exe=gmx_exe, _gmx_path=gmx_path, _gmx_version=gmx_version)
+        return globals()[name]
+
+    if name in _lazy_packages:
+        import importlib as _importlib
+
+        return _importlib.import_module("." + name, __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_packages))
 
-    del _command
-    del command_split
-
-    # Get the data prefix.
-    if _proc.returncode == 0:
-        for _line in _proc.stdout.split("\n"):
-            # Extract the "Data prefix" from the output.
-            if "Data prefix" in _line:
-                _gmx_path = _line.split(":")[1].strip() + "/share/gromacs/top"
-            # Extract the version from the output.
-            elif "GROMACS version" in _line:
-                _gmx_version = float(_line.split(":")[1].split("-")[0])
-                break
-        del _line
-
-        # Check that the topology file directory exists.
-        if _gmx_path is not None:
-            if not _path.isdir(_gmx_path):
-                _gmx_path = None
-
-    del _path
-    del _proc
-    del _shlex
-    del _subprocess
 
 from . import Align
 from . import Box
@@ -242,13 +201,10 @@ from . import Gateway
 from . import IO
 from . import Metadynamics
 from . import MD
-from . import Node
 from . import Notebook
-from . import Parameters
 from . import Process
 from . import Protocol
 from . import Solvent
-from . import Stream
 from . import Trajectory
 from . import Types
 from . import Units
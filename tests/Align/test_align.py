@@ -1,5 +1,8 @@
+import json
+import os
 import pytest
 import sys
+import types
 
 from sire.legacy.MM import InternalFF, IntraCLJFF, IntraFF
 from sire.legacy.Mol import AtomIdx, Element, PartialMolecule
@@ -40,6 +43,46 @@ def test_flex_align(system0, system1):
     )
 
 
+@pytest.mark.parametrize("scoring_function", ["rmsd", "rmsd_align"])
+def test_mapping_scores(system0, system1, scoring_function):
+    # Make sure that multiple mappings are returned in order of their score,
+    # and that the scores are consistent with the best match.
+
+    # Extract the molecules.
+    m0 = system0.getMolecules()[0]
+    m1 = system1.getMolecules()[0]
+
+    # Get the best mappings.
+    mappings, scores = BSS.Align.matchAtoms(
+        m0,
+        m1,
+        timeout=BSS.Units.Time.second,
+        scoring_function=scoring_function,
+        matches=5,
+        return_scores=True,
+    )
+
+    assert 0 < len(mappings) <= 5
+    assert len(mappings) == len(scores)
+
+    # The mappings should be unique.
+    assert len(set(tuple(x.items()) for x in mappings)) == len(mappings)
+
+    # The scores should be sorted from best to worst.
+    values = [x.value() for x in scores]
+    assert values == sorted(values)
+
+    # The best mapping should be the same as that for a single match.
+    mapping, score = BSS.Align.matchAtoms(
+        m0,
+        m1,
+        timeout=BSS.Units.Time.second,
+        scoring_function=scoring_function,
+        return_scores=True,
+    )
+    assert score.value() == pytest.approx(values[0])
+
+
 # Parameterise the function with a set of valid atom pre-matches.
 @pytest.mark.skipif(
     sys.platform == "win32", reason="Sire MCS currently not supported on Windows"
@@ -402,6 +445,172 @@ def test_grow_whole_ring(ligands, mapping):
     m2 = BSS.Align.merge(m0, m1, mapping)
 
 
+def test_connectivity_candidates():
+    """Make sure that only pairs of atoms affected by a merge are checked."""
+
+    from BioSimSpace.Align._merge import _connectivity_candidates
+
+    # A six-membered ring with a methyl group on atom 0.
+    ring = [[1, 5, 6], [0, 2], [1, 3], [2, 4], [3, 5], [4, 0], [0]]
+
+    # The merged molecule has an extra atom and the atoms are re-ordered.
+    mapping = [1, 2, 3, 4, 5, 6, 0]
+    merged = [[] for _ in range(8)]
+    for x, bonded in enumerate(ring):
+        merged[mapping[x]] = [mapping[y] for y in bonded]
+
+    # Nothing has changed, so no pairs need to be checked.
+    assert _connectivity_candidates(ring, merged, mapping) == []
+
+    # Open the ring between atoms 4 and 5. All pairs must now be checked,
+    # since the ring status of every ring atom has changed.
+    merged[mapping[4]].remove(mapping[5])
+    merged[mapping[5]].remove(mapping[4])
+    pairs = _connectivity_candidates(ring, merged, mapping)
+    assert (4, 5) in pairs
+    assert len(pairs) == 21
+
+
+def test_merge_ring_opening():
+    """Make sure that opening a ring is still caught by the pruned checks."""
+
+    # Load a ligand containing rings.
+    s0 = BSS.IO.readMolecules([f"{url}/ligand31.prm7.bz2", f"{url}/ligand31.rst7.bz2"])
+    m0 = s0.getMolecules()[0]
+
+    # Find a ring bond.
+    conn = m0._sire_object.property("connectivity")
+    bonds = m0._sire_object.property("bond")
+    info = m0._sire_object.info()
+    for bond in bonds.potentials():
+        idx = info.atomIdx(bond.atom0())
+        idy = info.atomIdx(bond.atom1())
+        if conn.inRing(idx, idy):
+            break
+
+    # Create a copy of the ligand with the ring bond removed.
+    bonds.clear(idx, idy)
+    conn = conn.edit().disconnect(idx, idy).commit()
+    m1 = BSS._SireWrappers.Molecule(
+        m0._sire_object.edit()
+        .setProperty("bond", bonds)
+        .setProperty("connectivity", conn)
+        .molecule()
+        .commit()
+    )
+
+    mapping = {x: x for x in range(m0.nAtoms())}
+
+    # The ring opening must be detected in both directions. (The bond count
+    # check is skipped when ring size changes are allowed.)
+    with pytest.raises(BSS._Exceptions.IncompatibleError, match="opened/closed a ring"):
+        BSS.Align.merge(m0, m1, mapping, allow_ring_size_change=True)
+    with pytest.raises(BSS._Exceptions.IncompatibleError, match="opened/closed a ring"):
+        BSS.Align.merge(m1, m0, mapping, allow_ring_size_change=True)
+
+    # The merge is allowed when ring breaking is.
+    BSS.Align.merge(m0, m1, mapping, allow_ring_breaking=True)
+
+
+def test_lomap_pair_key():
+    """Make sure that the LOMAP cache key for a pair of ligands is symmetric."""
+
+    from BioSimSpace.Align._align import _lomap_pair_key
+
+    # The key doesn't depend on the order of the ligands.
+    key = _lomap_pair_key("options", "a", "b")
+    assert key == _lomap_pair_key("options", "b", "a")
+    assert key != _lomap_pair_key("other", "a", "b")
+
+
+def test_lomap_cache(tmp_path, monkeypatch):
+    """
+    Make sure that LOMAP scores are re-used by later runs without changing
+    the network, and that scores are only cached when the strict and loose
+    scores agree.
+    """
+
+    Chem = pytest.importorskip("rdkit.Chem")
+
+    import BioSimSpace.Align._align as _align
+
+    cache_file = tmp_path / "lomap.json"
+    monkeypatch.setenv("BSS_LOMAP_CACHE", str(cache_file))
+
+    # The strict and loose scores for each pair of ligands. These differ for
+    # the first pair.
+    pair_scores = {
+        ("000.sdf", "001.sdf"): (0.6, 0.4),
+        ("000.sdf", "002.sdf"): (0.8, 0.8),
+        ("000.sdf", "003.sdf"): (0.2, 0.2),
+        ("001.sdf", "002.sdf"): (0.7, 0.7),
+        ("001.sdf", "003.sdf"): (0.9, 0.9),
+        ("002.sdf", "003.sdf"): (0.3, 0.3),
+    }
+
+    # The pairs that were scored, rather than taken from the links file.
+    scored = []
+
+    class DBMolecules:
+        """A stand-in for LOMAP that replays the scores above."""
+
+        def __init__(self, directory, **kwargs):
+            self._output_dir = os.path.dirname(kwargs["name"])
+            self._links = {}
+            if kwargs.get("links_file") is not None:
+                with open(kwargs["links_file"]) as f:
+                    for line in f:
+                        file0, file1, score = line.split()
+                        self._links[(file0, file1)] = float(score)
+
+        def build_matrices(self):
+            lines = [
+                "Index_1, Index_2, Filename_1, Filename_2, Str_sim, "
+                "Eff_sim, Loose_sim, Connect, Intermediate_Ligand"
+            ]
+            for (file0, file1), (strict, loose) in pair_scores.items():
+                if (file0, file1) in self._links:
+                    strict = loose = self._links[(file0, file1)]
+                else:
+                    scored.append((file0, file1))
+                connect = "Yes" if strict > 0.5 else "No"
+                lines.append(
+                    f"{file0[:3]}, {file1[:3]}, {file0}, {file1}, "
+                    f"{strict}, {strict}, {loose}, {connect}, None"
+                )
+            with open(f"{self._output_dir}/lomap_score_with_connection.txt", "w") as f:
+                f.write("\n".join(lines) + "\n")
+            return None, None
+
+        def build_graph(self):
+            return None
+
+    lomap = types.SimpleNamespace(DBMolecules=DBMolecules, __version__="test")
+    monkeypatch.setattr(_align, "_lomap", lomap)
+
+    molecules = [
+        Chem.MolFromSmiles(smiles)
+        for smiles in ["c1ccccc1", "Cc1ccccc1", "Oc1ccccc1", "Nc1ccccc1"]
+    ]
+
+    # All pairs are scored on the first run.
+    edges0, scores0 = BSS.Align.generateNetwork(molecules)
+    assert sorted(scored) == sorted(pair_scores)
+
+    # Only the pairs whose strict and loose scores agree are cached.
+    with open(cache_file) as f:
+        assert len(json.load(f)) == len(pair_scores) - 1
+
+    # Only the pair that wasn't cached is scored on the second run, and the
+    # network is unchanged.
+    scored.clear()
+    edges1, scores1 = BSS.Align.generateNetwork(molecules)
+    assert scored == [("000.sdf", "001.sdf")]
+    assert edges1 == edges0
+    assert scores1 == scores0
+    assert sorted(edges0) == [(0, 1), (0, 2), (1, 2), (1, 3)]
+
+
 def test_hydrogen_mass_repartitioning():
     # Load the ligands.
     s0 = BSS.IO.readMolecules([f"{url}/ligand31.prm7.bz2", f"{url}/ligand31.rst7.bz2"])
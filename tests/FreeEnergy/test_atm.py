@@ -679,3 +679,97 @@ def test_UWHAM():
 
     assert pytest.approx(ddg, rel=1e-3) == known_answer
     assert pytest.approx(ddg_error, rel=1e-3) == known_error
+
+
+def test_UWHAM_warm_start():
+    import numpy as np
+
+    from BioSimSpace.FreeEnergy._ddg import _estimate_f_i, _bootstrap_f_i
+
+    # Generate some synthetic data.
+    rng = np.random.default_rng(42)
+    n_samples = [100] * 5
+    ln_q_array = rng.normal(size=(5, sum(n_samples))) + np.arange(5)[:, None]
+
+    f_i, d_i, weights = _estimate_f_i(ln_q_array, n_samples)
+
+    # Warm-starting from the solution should give the same result.
+    f_i_warm, d_i_warm, _ = _estimate_f_i(ln_q_array, n_samples, initial_f_i=f_i)
+    assert np.allclose(f_i, f_i_warm)
+    assert np.allclose(d_i, d_i_warm)
+
+    # The bootstrap variance should be reproducible for a given seed.
+    ln_q = np.ascontiguousarray(ln_q_array.T)
+    var0 = _bootstrap_f_i(ln_q, n_samples, f_i, 20, max_workers=2, seed=1)
+    var1 = _bootstrap_f_i(ln_q, n_samples, f_i, 20, max_workers=2, seed=1)
+    assert var0 > 0
+    assert var0 == pytest.approx(var1)
+
+
+def test_UWHAM_counts():
+    import numpy as np
+
+    from BioSimSpace.FreeEnergy._ddg import _solve_f_i
+
+    # Generate some synthetic data.
+    rng = np.random.default_rng(42)
+    n_samples = [100] * 5
+    ln_q = rng.normal(size=(sum(n_samples), 5)) + np.arange(5)
+
+    # Resample with replacement from each state.
+    draws = [rng.integers(0, num, num) for num in n_samples]
+    offsets = np.concatenate([[0], np.cumsum(n_samples)[:-1]])
+    index = np.concatenate([offset + x for offset, x in zip(offsets, draws)])
+    counts = np.concatenate(
+        [np.bincount(x, minlength=num) for x, num in zip(draws, n_samples)]
+    ).astype(np.float64)
+
+    # Counting each sample should match solving for the resampled data.
+    f_i0, _, _ = _solve_f_i(ln_q[index], n_samples, compute_variance=False)
+    f_i1, _, _ = _solve_f_i(ln_q, n_samples, compute_variance=False, counts=counts)
+    assert np.allclose(f_i0, f_i1, atol=1e-6)
+
+
+def test_load_uwham_data(tmp_path):
+    import numpy as np
+    import pandas as pd
+
+    from BioSimSpace.FreeEnergy._ddg import _load_uwham_data, _sort_folders
+
+    # Write some synthetic ATM output, with samples from multiple windows
+    # in each file.
+    rng = np.random.default_rng(42)
+    frames = []
+    for x in range(3):
+        folder = tmp_path / f"lambda_{x / 2:.4f}"
+        folder.mkdir()
+        window = rng.integers(0, 3, 50)
+        df = pd.DataFrame(
+            {
+                "window": window,
+                "temperature": 300.0,
+                "pot_en": rng.normal(size=50),
+                "pert_en": rng.normal(size=50),
+                "lambda1": 0.1 * window,
+                "lambda2": 0.2 * window,
+                "alpha": 0.1,
+                "uh": 0.0,
+                "w0": 0.0,
+                "direction": 1,
+            }
+        )
+        df.to_csv(folder / "openmm.csv", index=False)
+        frames.append(df.iloc[5:45])
+
+    # Read the data in small chunks, ignoring rows at the start and end.
+    n_samples, pots, pert_es, params = _load_uwham_data(
+        _sort_folders(str(tmp_path)), 5, 45, chunk_size=7
+    )
+
+    # Compare to grouping the full data set.
+    df = pd.concat(frames)
+    groups = [group for _, group in df.groupby("window", sort=True)]
+    assert n_samples == [len(group) for group in groups]
+    assert np.allclose(pots, np.concatenate([g["pot_en"] for g in groups]))
+    assert np.allclose(pert_es, np.concatenate([g["pert_en"] for g in groups]))
+    assert np.allclose(params["lambda2"], [g["lambda2"].iloc[0] for g in groups])
@@ -1,4 +1,5 @@
 import math
+import pathlib
 import pytest
 import requests
 import tarfile
@@ -54,12 +55,58 @@ def test_setup_somd(perturbable_system):
     free_nrg = BSS.FreeEnergy.Relative(perturbable_system, engine="somd")
 
 
+def test_setup_somd_shared_inputs(perturbable_system, tmp_path):
+    """Test that input files are shared between lambda windows."""
+    free_nrg = BSS.FreeEnergy.Relative(
+        perturbable_system,
+        engine="somd",
+        work_dir=str(tmp_path),
+        setup_only=True,
+        share_inputs=True,
+    )
+
+    lambda_dirs = sorted(tmp_path.glob("lambda_*"))
+    assert len(lambda_dirs) > 1
+
+    for lambda_dir in lambda_dirs:
+        # The shared inputs must resolve to the same file.
+        for name in ["somd.prm7", "somd.rst7", "somd.pert"]:
+            assert (lambda_dir / name).samefile(tmp_path / "shared" / name)
+
+        # Each window has its own config.
+        assert not (tmp_path / "shared" / "somd.cfg").exists()
+        lam = float(lambda_dir.name.split("_")[1])
+        with open(lambda_dir / "somd.cfg") as f:
+            lines = [line for line in f if line.startswith("lambda_val")]
+        assert len(lines) == 1
+        assert math.isclose(float(lines[0].split("=")[1]), lam)
+
+
 @pytest.mark.skipif(has_gromacs is False, reason="Requires GROMACS to be installed.")
 def test_setup_gromacs(perturbable_system):
     """Test setup for a relative alchemical free energy leg using GROMACS."""
     free_nrg = BSS.FreeEnergy.Relative(perturbable_system, engine="gromacs")
 
 
+@pytest.mark.skipif(has_gromacs is False, reason="Requires GROMACS to be installed.")
+def test_setup_gromacs_windows(perturbable_system, tmp_path):
+    """Test that a binary run input file is generated for every lambda window."""
+    free_nrg = BSS.FreeEnergy.Relative(
+        perturbable_system,
+        engine="gromacs",
+        work_dir=str(tmp_path),
+        share_inputs=True,
+    )
+
+    lambda_dirs = sorted(tmp_path.glob("lambda_*"))
+    assert len(lambda_dirs) > 1
+
+    for x, lambda_dir in enumerate(lambda_dirs):
+        assert (lambda_dir / "gromacs.tpr").is_file()
+        with open(lambda_dir / "gromacs.mdp") as f:
+            assert f"init-lambda-state = {x}\n" in f.read()
+
+
 @pytest.mark.skipif(
     has_alchemlyb is False, reason="Requires alchemlyb to be installed."
 )
@@ -83,3 +130,108 @@ def test_analysis(fep_output, engine, estimator, expected_results):
     assert math.isclose(
         delta_g[0].value(), expected_results[engine][estimator], rel_tol=1e-4
     )
+
+
+@pytest.mark.skipif(
+    has_alchemlyb is False, reason="Requires alchemlyb to be installed."
+)
+@pytest.mark.parametrize("engine", ["amber", "gromacs", "somd"])
+def test_analysis_cache(fep_output, engine):
+    """Test that extracted data is cached and re-used by the analysis."""
+
+    path = f"{fep_output.name}/fep_output/{engine}/vacuum"
+
+    # Analyse the data twice, the second time using the cache.
+    pmf0, _ = BSS.FreeEnergy.Relative.analyse(path)
+    pmf1, _ = BSS.FreeEnergy.Relative.analyse(path)
+
+    # Make sure that cache files were written.
+    assert len(list(pathlib.Path(path).glob("**/*.mbar.npz"))) > 0
+
+    # Make sure the results are the same.
+    for (lam0, nrg0, err0), (lam1, nrg1, err1) in zip(pmf0, pmf1):
+        assert lam0 == lam1
+        assert math.isclose(nrg0.value(), nrg1.value(), abs_tol=1e-6)
+        assert math.isclose(err0.value(), err1.value(), abs_tol=1e-6)
+
+
+@pytest.mark.skipif(
+    has_alchemlyb is False, reason="Requires alchemlyb to be installed."
+)
+def test_analyse_network(fep_output):
+    """Test that multiple working directories can be analysed in parallel."""
+
+    work_dirs = {
+        leg: f"{fep_output.name}/fep_output/somd/{leg}" for leg in ["free", "vacuum"]
+    }
+
+    # Analyse the legs in parallel.
+    results = BSS.FreeEnergy.Relative.analyseNetwork(work_dirs, max_workers=2)
+
+    assert list(results.index) == ["free", "vacuum"]
+
+    # Make sure the results match a serial analysis of each leg.
+    for leg, work_dir in work_dirs.items():
+        pmf, overlap = BSS.FreeEnergy.Relative.analyse(work_dir)
+        row = results.loc[leg]
+        assert row["failure"] is None
+        assert math.isclose(
+            row["free_energy"].value(), pmf[-1][1].value(), abs_tol=1e-6
+        )
+        assert math.isclose(row["error"].value(), pmf[-1][2].value(), abs_tol=1e-6)
+        assert row["overlap"].shape == overlap.shape
+
+
+@pytest.mark.skipif(
+    has_alchemlyb is False, reason="Requires alchemlyb to be installed."
+)
+def test_online_estimator(fep_output):
+    """Test that the online estimator matches the analysis of the full data."""
+
+    path = f"{fep_output.name}/fep_output/somd/vacuum"
+
+    estimator = BSS.FreeEnergy.OnlineEstimator(
+        path, "somd", 298 * BSS.Units.Temperature.kelvin
+    )
+
+    # Read all of the data.
+    assert estimator.update() > 0
+
+    # No new data has been written.
+    assert estimator.update() == 0
+
+    # Analyse twice, the second time warm-starting MBAR.
+    pmf0, overlap0 = estimator.analyse()
+    pmf1, overlap1 = estimator.analyse()
+
+    # Compare to the result from the full analysis.
+    pmf, overlap = BSS.FreeEnergy.Relative.analyse(path)
+    assert overlap0.shape == overlap.shape
+    assert math.isclose(
+        pmf0[-1][1].value(), pmf[-1][1].value(), rel_tol=1e-2, abs_tol=1e-2
+    )
+    assert math.isclose(
+        pmf0[-1][1].value(), pmf1[-1][1].value(), rel_tol=1e-4, abs_tol=1e-4
+    )
+
+
+def test_somd_extract_partial(fep_output, tmp_path):
+    """Test that an incomplete final record in a SOMD simfile is ignored."""
+
+    path = f"{fep_output.name}/fep_output/somd/vacuum"
+    simfile = sorted(pathlib.Path(path).glob("**/simfile.dat"))[0]
+
+    with open(simfile, "r") as f:
+        lines = f.readlines()
+
+    # Append part of the final record, as if the file were still being written.
+    partial_file = tmp_path / "simfile.dat"
+    with open(partial_file, "w") as f:
+        f.writelines(lines)
+        f.write(lines[-1][: len(lines[-1]) // 2])
+
+    df0 = BSS.FreeEnergy.Relative._somd_extract(simfile, T=298.0)
+    df1 = BSS.FreeEnergy.Relative._somd_extract(partial_file, T=298.0)
+
+    assert df0.shape == df1.shape
+    assert (df0.values == df1.values).all()
@@ -136,3 +136,78 @@ def test_file_cache_mol_nums():
 
     # The cache shold have two entries.
     assert len(BSS.IO._file_cache._cache) == 2
+
+
+def test_persistent_file_cache(tmp_path):
+    """
+    Make sure that files in the persistent cache are re-used for systems
+    with the same content, even when they have a different UID.
+    """
+
+    cache_dir = tmp_path / "cache"
+
+    # Enable the persistent cache.
+    BSS.IO.enableCache(directory=str(cache_dir))
+
+    try:
+        BSS.IO.clearCache()
+
+        # Load the system and write to PDB format.
+        s0 = BSS.IO.readMolecules(["tests/input/ala.crd", "tests/input/ala.top"])
+        BSS.IO.saveMolecules(f"{tmp_path}/tmp0", s0, "pdb")
+
+        # The file should have been stored in the persistent cache.
+        assert len(BSS.IO._file_cache._cache_entries()) == 1
+
+        # Clear the in-memory cache, as if this were a new process.
+        BSS.IO._file_cache._cache = BSS.IO._file_cache._FixedSizeOrderedDict()
+        BSS.IO._file_cache._molecule_hashes.clear()
+
+        # Re-load the system. This will have a different UID.
+        s1 = BSS.IO.readMolecules(["tests/input/ala.crd", "tests/input/ala.top"])
+        assert s0._sire_object.uid() != s1._sire_object.uid()
+
+        # Write to PDB format. The file should be copied from the persistent
+        # cache and added to the in-memory cache.
+        files = BSS.IO.saveMolecules(f"{tmp_path}/tmp1", s1, "pdb")
+        assert len(BSS.IO._file_cache._cache) == 1
+        assert len(BSS.IO._file_cache._cache_entries()) == 1
+        with open(files[0]) as f0, open(f"{tmp_path}/tmp0.pdb") as f1:
+            assert f0.read() == f1.read()
+
+        # Translate the system. This changes the content, so a new file
+        # should be written.
+        s1.translate(3 * [BSS.Units.Length.angstrom])
+        BSS.IO.saveMolecules(f"{tmp_path}/tmp2", s1, "pdb")
+        assert len(BSS.IO._file_cache._cache_entries()) == 2
+
+    finally:
+        BSS.IO.clearCache()
+        BSS.IO._file_cache._cache_dir = None
+
+
+def test_invalid_cache_size():
+    """Make sure that an invalid cache size doesn't prevent import."""
+
+    import subprocess
+    import sys
+
+    env = os.environ.copy()
+    env["BSS_FILE_CACHE_SIZE"] = "ten"
+
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from BioSimSpace.IO._file_cache import _cache_max_size; "
+            "print(_cache_max_size)",
+        ],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    assert proc.returncode == 0
+    assert float(proc.stdout.split()[-1]) == 10.0
+    assert "BSS_FILE_CACHE_SIZE" in proc.stderr
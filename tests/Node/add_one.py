@@ -0,0 +1,19 @@
+import BioSimSpace as BSS
+
+# A node that is run by test_node to test the pool of worker processes.
+
+node = BSS.Gateway.Node("A node to add one to an integer.")
+
+node.addInput("value", BSS.Gateway.Integer(help="An integer."))
+node.addOutput("result", BSS.Gateway.Integer(help="The integer plus one."))
+node.addOutput(
+    "verbose", BSS.Gateway.Boolean(help="Whether verbose errors were enabled.")
+)
+
+# Change global state, which should be reset by the worker.
+node.setOutput("verbose", BSS._isVerbose())
+BSS.setVerbose(True)
+
+node.setOutput("result", node.getInput("value") + 1)
+
+node.validate()
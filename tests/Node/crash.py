@@ -0,0 +1,5 @@
+import os
+
+# A node that kills the worker process that is running it.
+
+os._exit(1)
@@ -0,0 +1,50 @@
+import pytest
+
+import BioSimSpace as BSS
+
+# Store the directory containing the test nodes.
+node_dir = "tests/Node"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pool():
+    """Run the test nodes using a small pool of worker processes."""
+    old_dir = BSS.Node._node._node_dir
+    BSS.Node.setNodeDirectory(node_dir)
+    BSS.Node.startPool(max_workers=2)
+    yield
+    BSS.Node.stopPool()
+    BSS.Node._node._node_dir = old_dir
+
+
+def test_run_pool():
+    """Make sure that a node can be run in the pool."""
+
+    output = BSS.Node.run("add_one", {"value": 1}, use_pool=True)
+    assert output["result"] == 2
+
+
+def test_submit():
+    """Make sure that nodes can be submitted concurrently from one directory."""
+
+    futures = [BSS.Node.submit("add_one", {"value": x}) for x in range(8)]
+    assert [future.result()["result"] for future in futures] == list(range(1, 9))
+
+
+def test_global_state():
+    """Make sure that global state modified by a node is reset."""
+
+    # The node enables verbose errors after recording whether they were
+    # already enabled. Each worker runs several nodes.
+    futures = [BSS.Node.submit("add_one", {"value": x}) for x in range(8)]
+    assert not any(future.result()["verbose"] for future in futures)
+
+
+def test_broken_pool():
+    """Make sure that the pool is replaced if a worker dies."""
+
+    with pytest.raises(Exception):
+        BSS.Node.submit("crash").result()
+
+    output = BSS.Node.run("add_one", {"value": 41}, use_pool=True)
+    assert output["result"] == 42
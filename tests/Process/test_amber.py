@@ -1,6 +1,7 @@
 from collections import OrderedDict
 
 import math
+import numpy as np
 import pytest
 import shutil
 import socket
@@ -362,6 +363,207 @@ def test_parse_fep_output(perturbable_system, protocol):
         assert len(records_sc1) != 0
 
 
+@pytest.mark.skipif(has_amber is False, reason="Requires AMBER to be installed.")
+def test_parse_output_incremental(perturbable_system):
+    """Make sure that AMBER output is parsed correctly when read in chunks."""
+
+    from sire.legacy.Base import findExe
+
+    # Use the first instance of sander in the path so that we can
+    # test without pmemd.
+    exe = findExe("sander").absoluteFilePath()
+    protocol = BSS.Protocol.FreeEnergy(temperature=298 * BSS.Units.Temperature.kelvin)
+    process = BSS.Process.Amber(perturbable_system.copy(), protocol, exe=exe)
+
+    with open("tests/output/amber_fep.out", "rb") as f:
+        data = f.read()
+
+    # Write the output in two parts, splitting part way through a line.
+    split = len(data) // 2
+    out_file = process.workDir() + "/amber.out"
+    with open(out_file, "wb") as f:
+        f.write(data[:split])
+    process.stdout(0)
+    num_partial = len(process.getRecords()["NSTEP"])
+    with open(out_file, "ab") as f:
+        f.write(data[split:])
+
+    # Get the records for the full file.
+    records = process.getRecords()
+    energies = process.getTotalEnergy(time_series=True)
+
+    assert num_partial < len(records["NSTEP"])
+    assert len(energies) == len(records["NSTEP"])
+    assert all(len(v) == len(records["NSTEP"]) for v in records.values())
+    assert energies[-1].value() == pytest.approx(records["ETOT"][-1])
+
+    # Time series are returned as lists.
+    assert all(isinstance(v, list) for v in records.values())
+    steps = process.getStep(time_series=True)
+    assert isinstance(steps, list)
+    assert all(isinstance(x, int) for x in steps)
+    assert steps == records["NSTEP"]
+
+
+def test_column_dict():
+    """Make sure that records are returned as lists with missing values as None."""
+
+    from BioSimSpace.Process._process import _ColumnDict
+
+    records = _ColumnDict()
+    for x in range(100):
+        records.append("NSTEP", x)
+        records.append("ETOT", "**********" if x == 50 else -x)
+
+    steps = records.tolist("NSTEP")
+    assert steps == list(range(100))
+
+    energies = records.tolist("ETOT")
+    assert energies[50] is None
+    assert energies[51] == -51.0
+
+    copy = records.copy()
+    assert copy == {"NSTEP": steps, "ETOT": energies}
+    copy["NSTEP"].append(100)
+    assert len(records["NSTEP"]) == 100
+
+
+def test_restart_template(system):
+    """Make sure that restart files can be read into a template system."""
+
+    from BioSimSpace.Process._restart import (
+        _read_amber_restart,
+        _update_from_template,
+    )
+
+    coordinates, velocities, box = _read_amber_restart("tests/input/ala.crd")
+
+    assert coordinates.shape == (system.nAtoms(), 3)
+
+    # Shift the coordinates and copy them into the system.
+    new_system = _update_from_template(system, coordinates + 1.0, velocities, box)
+
+    for atom0, atom1 in zip(system.getAtoms(), new_system.getAtoms()):
+        coord0 = atom0.coordinates()
+        coord1 = atom1.coordinates()
+        assert coord1.x().value() == pytest.approx(coord0.x().value() + 1.0)
+        assert coord1.y().value() == pytest.approx(coord0.y().value() + 1.0)
+        assert coord1.z().value() == pytest.approx(coord0.z().value() + 1.0)
+
+    # The box should be unchanged.
+    box0, angles0 = system.getBox()
+    box1, angles1 = new_system.getBox()
+    for x0, x1 in zip(box0 + angles0, box1 + angles1):
+        assert x1.value() == pytest.approx(x0.value(), abs=1e-4)
+
+
+def _write_rst7(path, values, num_atoms):
+    """Write an ASCII restart file, splitting the values into blocks."""
+    lines = ["test", f"{num_atoms:5d}"]
+    for block in values:
+        lines.extend(
+            "".join(f"{x:12.7f}" for x in block[y : y + 6])
+            for y in range(0, len(block), 6)
+        )
+        lines.append("")
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.mark.parametrize("num_atoms", [1, 2, 3, 4])
+@pytest.mark.parametrize("has_velocities", [False, True])
+@pytest.mark.parametrize("has_box", [False, True])
+def test_read_amber_ascii(tmp_path, num_atoms, has_velocities, has_box):
+    """Make sure ASCII restart files are read, with or without a box."""
+
+    from BioSimSpace.Process._restart import (
+        _amber_velocity_scale,
+        _read_amber_restart,
+    )
+
+    coordinates = np.arange(3 * num_atoms, dtype=float) - 10.5
+    velocities = 0.01 * np.arange(3 * num_atoms, dtype=float)
+    box = np.array([30.0, 31.0, 32.0, 90.0, 90.0, 90.0])
+
+    blocks = [coordinates]
+    if has_velocities:
+        blocks.append(velocities)
+    if has_box:
+        blocks.append(box)
+
+    # The blocks are separated by blank lines.
+    rst7 = tmp_path / "test.rst7"
+    _write_rst7(rst7, blocks, num_atoms)
+
+    crd, vel, box_ = _read_amber_restart(str(rst7), has_box)
+
+    assert np.allclose(crd, coordinates.reshape(num_atoms, 3))
+
+    if has_velocities:
+        assert np.allclose(
+            vel, velocities.reshape(num_atoms, 3) * _amber_velocity_scale
+        )
+    else:
+        assert vel is None
+
+    if has_box:
+        assert np.allclose(box_, box)
+    else:
+        assert box_ is None
+
+
+def test_read_amber_ascii_ambiguous(tmp_path):
+    """
+    Make sure that a two atom restart file with a box, but no velocities,
+    is rejected unless we know whether the system has a box.
+    """
+
+    from BioSimSpace.Process._restart import _read_amber_restart
+
+    rst7 = tmp_path / "test.rst7"
+    _write_rst7(rst7, [np.arange(6.0), np.array([30.0, 30.0, 30.0, 90, 90, 90])], 2)
+
+    with pytest.raises(ValueError):
+        _read_amber_restart(str(rst7))
+
+    _, velocities, box = _read_amber_restart(str(rst7), True)
+    assert velocities is None
+    assert np.allclose(box, [30.0, 30.0, 30.0, 90.0, 90.0, 90.0])
+
+    _, velocities, box = _read_amber_restart(str(rst7), False)
+    assert velocities is not None
+    assert box is None
+
+
+@pytest.mark.skipif(has_amber is False, reason="Requires AMBER to be installed.")
+def test_reuse_topology(system):
+    """Make sure that the topology is re-used in a chain of processes."""
+
+    import os
+
+    # Create a short minimisation protocol.
+    protocol = BSS.Protocol.Minimisation(steps=100)
+
+    process0 = BSS.Process.Amber(system, protocol)
+
+    # Make sure that the topology could be fingerprinted.
+    assert process0._topology_fingerprint is not None
+
+    # Only the coordinates have changed, so the topology should be linked.
+    new_system = system.copy()
+    new_system.translate([1, 1, 1])
+    process1 = BSS.Process.Amber(new_system, protocol, previous_process=process0)
+    assert os.path.samefile(process0._top_file, process1._top_file)
+
+    # The coordinates should still be written.
+    with open(process0._rst_file) as f0, open(process1._rst_file) as f1:
+        assert f0.read() != f1.read()
+
+    # Removing the water changes the topology, so it should be re-written.
+    new_system.removeWaterMolecules()
+    process2 = BSS.Process.Amber(new_system, protocol, previous_process=process1)
+    assert not os.path.samefile(process1._top_file, process2._top_file)
+
+
 @pytest.mark.skipif(
     socket.gethostname() != "porridge",
     reason="Local test requiring pmemd installation.",
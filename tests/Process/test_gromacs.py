@@ -221,6 +221,108 @@ class TestGetRecord:
             np.testing.assert_almost_equal(energy / unit, value, decimal=3)
 
 
+def test_edr_reader_incremental(tmp_path):
+    """Make sure that the EDR reader only parses new, complete frames."""
+
+    from BioSimSpace.Process._edr import EdrReader
+
+    with open("tests/output/gromacs.edr", "rb") as f:
+        data = f.read()
+
+    # Write part of the file, splitting part way through a frame.
+    edr_file = str(tmp_path / "gromacs.edr")
+    with open(edr_file, "wb") as f:
+        f.write(data[:10000])
+
+    reader = EdrReader(edr_file)
+    times0, energies0 = reader.read()
+
+    # Append the rest of the file and read the new frames.
+    with open(edr_file, "ab") as f:
+        f.write(data[10000:])
+    times1, energies1 = reader.read()
+
+    # Nothing has changed.
+    times2, energies2 = reader.read()
+
+    assert len(times0) > 0
+    assert len(times0) + len(times1) == 76
+    assert len(times2) == 0
+    assert times1[-1] == pytest.approx(60.0)
+
+    # Check the final bond energy against the value from 'gmx energy'.
+    idx = reader.names().index("Bond")
+    assert energies1[-1, idx] == pytest.approx(214.545654, abs=1e-3)
+    assert energies0.shape[1] == energies1.shape[1] == len(reader.names())
+
+
+@pytest.mark.parametrize("has_velocities", [False, True])
+@pytest.mark.parametrize(
+    "box, lengths, angles",
+    [
+        # Orthorhombic.
+        ("   3.00000   3.10000   3.20000", [30.0, 31.0, 32.0], [90.0, 90.0, 90.0]),
+        # Triclinic, with v1 = (3, 0, 0), v2 = (0, 3, 0), v3 = (1.5, 0, 3).
+        (
+            "   3.00000   3.00000   3.00000   0.00000   0.00000"
+            "   0.00000   0.00000   1.50000   0.00000",
+            [30.0, 30.0, 10 * math.sqrt(11.25)],
+            [90.0, math.degrees(math.acos(1.5 / math.sqrt(11.25))), 90.0],
+        ),
+    ],
+)
+def test_read_gro(tmp_path, has_velocities, box, lengths, angles):
+    """Make sure that coordinates, velocities, and box are read from a GRO file."""
+
+    from BioSimSpace.Process._restart import _read_gro
+
+    coordinates = np.array([[1.0, -2.0, 3.0], [0.123, 0.456, -12.789]])
+    velocities = np.array([[0.1234, -0.5678, 1.0], [-2.5, 0.0, 0.0001]])
+
+    lines = ["test", "    2"]
+    for x, (crd, vel) in enumerate(zip(coordinates, velocities)):
+        line = f"{1:5d}{'MOL':<5s}{'C' + str(x):>5s}{x + 1:5d}"
+        line += "".join(f"{v:8.3f}" for v in crd)
+        if has_velocities:
+            line += "".join(f"{v:8.4f}" for v in vel)
+        lines.append(line)
+    lines.append(box)
+
+    gro = tmp_path / "test.gro"
+    gro.write_text("\n".join(lines) + "\n")
+
+    crd, vel, box = _read_gro(str(gro))
+
+    # Values are converted from nanometers to Angstrom.
+    assert np.allclose(crd, 10 * coordinates)
+    if has_velocities:
+        assert np.allclose(vel, 10 * velocities)
+    else:
+        assert vel is None
+    assert np.allclose(box[:3], lengths)
+    assert np.allclose(box[3:], angles)
+
+
+@pytest.mark.skipif(has_gromacs is False, reason="Requires GROMACS to be installed.")
+def test_visible_devices(system):
+    """Make sure that GPU ids are re-indexed for a restricted set of devices."""
+
+    protocol = BSS.Protocol.Minimisation(steps=100)
+    process = BSS.Process.Gromacs(system, protocol)
+
+    # Ids are mapped to their position within the visible devices.
+    process.setArg("-gpu_id", "31")
+    process.setArg("-gputasks", "3311")
+    process._set_visible_devices(["1", "3"])
+    assert process.getArgs()["-gpu_id"] == "01"
+    assert process.getArgs()["-gputasks"] == "0011"
+
+    # The options are removed if there are too few visible devices.
+    process._set_visible_devices(["3"])
+    assert "-gpu_id" not in process.getArgs()
+    assert "-gputasks" not in process.getArgs()
+
+
 @pytest.mark.skipif(
     has_amber is False or has_gromacs is False or has_openff is False,
     reason="Requires AMBER, GROMACS, and OpenFF to be installed.",
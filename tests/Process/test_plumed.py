@@ -0,0 +1,171 @@
+import math
+import numpy as np
+import os
+import pytest
+import sys
+
+from BioSimSpace.Process._plumed import Plumed, _BiasGrid
+
+# The grid used to generate the reference free-energy surfaces.
+grid_data = [("-pi", "pi", 12), (0.0, 1.2, 6)]
+periodic = [True, False]
+
+# The temperature used to project the reference free-energy surfaces.
+kt = 2.494339
+
+
+@pytest.fixture(scope="module")
+def hills():
+    # Columns: time phi d sigma_phi sigma_d height biasf
+    data = np.loadtxt("tests/input/hills/HILLS", comments="#")
+    return data[:, 1:3], data[:, 3:5], data[:, 5]
+
+
+@pytest.fixture(scope="module")
+def bias_grid(hills):
+    bias_grid = _BiasGrid(grid_data, periodic)
+    bias_grid.addHills(*hills)
+    return bias_grid
+
+
+def test_grid(bias_grid):
+    """Check that the grid matches the one used by PLUMED."""
+
+    phi, d = bias_grid.axes()
+
+    # Periodic components don't include the upper bound.
+    assert len(phi) == 12
+    assert phi[0] == pytest.approx(-math.pi)
+    assert phi[-1] == pytest.approx(math.pi - 2 * math.pi / 12)
+
+    # Non-periodic components include both bounds.
+    assert len(d) == 7
+    assert d[0] == pytest.approx(0.0)
+    assert d[-1] == pytest.approx(1.2)
+
+    assert bias_grid.nHills() == 5
+
+
+def test_free_energy(bias_grid):
+    """Check the full free-energy surface against the reference."""
+
+    ref = np.loadtxt("tests/input/hills/fes.dat", comments="#")
+
+    grid, fes = bias_grid.freeEnergy(bias_grid.bias())
+
+    assert np.allclose(grid[0], ref[:, 0])
+    assert np.allclose(grid[1], ref[:, 1])
+    assert np.allclose(fes, ref[:, 2])
+
+
+@pytest.mark.parametrize("index, name", [(0, "phi"), (1, "d"), (-2, "phi")])
+def test_projection(bias_grid, index, name):
+    """Check the free energy projected onto a single component."""
+
+    ref = np.loadtxt(f"tests/input/hills/fes_{name}.dat", comments="#")
+
+    grid, fes = bias_grid.freeEnergy(bias_grid.bias(), index=index, kt=kt)
+
+    assert len(grid) == 1
+    assert np.allclose(grid[0], ref[:, 0])
+    assert np.allclose(fes, ref[:, 1])
+
+
+def test_periodic():
+    """Check that hills are wrapped across a periodic boundary."""
+
+    bias_grid = _BiasGrid([("-pi", "pi", 36)], [True])
+
+    # Two hills an equal distance either side of the boundary.
+    sigmas = np.array([[0.35], [0.35]])
+    heights = np.array([1.0, 1.0])
+    bias_grid.addHills(np.array([[math.pi - 0.1]]), sigmas[:1], heights[:1])
+    bias = bias_grid.bias().copy()
+    bias_grid.clear()
+    bias_grid.addHills(np.array([[-math.pi + 0.1]]), sigmas[:1], heights[:1])
+
+    # The bias should be mirrored about the boundary, which sits on the
+    # first grid point.
+    assert np.allclose(bias, np.roll(bias_grid.bias()[::-1], 1))
+    assert bias[0] == pytest.approx(bias_grid.bias()[0])
+    assert bias[0] > 0.5
+
+    # The bias should be zero beyond the Gaussian cutoff.
+    assert bias[18] == 0.0
+
+
+def test_non_periodic():
+    """Check that hills aren't wrapped along a non-periodic component."""
+
+    bias_grid = _BiasGrid([(0.0, 1.0, 10)], [False])
+
+    bias_grid.addHills(np.array([[0.95]]), np.array([[0.1]]), np.array([1.5]))
+    bias = bias_grid.bias()
+
+    assert len(bias) == 11
+    assert bias[0] == 0.0
+    assert bias[-1] > 0.0
+    assert np.argmax(bias) in (9, 10)
+
+
+@pytest.mark.parametrize("stride", [1, 2, 5, 10])
+def test_series(hills, stride):
+    """Check that the bias is accumulated every 'stride' hills."""
+
+    centers, sigmas, heights = hills
+
+    bias_grid = _BiasGrid(grid_data, periodic)
+    series = bias_grid.series(centers, sigmas, heights, stride)
+
+    # There is an estimate after every stride, and after the final hill.
+    assert len(series) == math.ceil(len(heights) / stride)
+
+    for x, bias in enumerate(series):
+        end = min((x + 1) * stride, len(heights))
+        ref = _BiasGrid(grid_data, periodic)
+        ref.addHills(centers[:end], sigmas[:end], heights[:end])
+        assert np.allclose(bias, ref.bias())
+
+    # The series shouldn't modify the running bias.
+    assert bias_grid.nHills() == 0
+    assert np.all(bias_grid.bias() == 0.0)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Requires a POSIX shell.")
+def test_partial_hills(tmp_path, monkeypatch):
+    """Make sure that a partially written hill isn't read until it is complete."""
+
+    # Create a fake PLUMED executable so that the interface can be created.
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    exe = bin_dir / "plumed"
+    exe.write_text("#!/bin/sh\necho 2.9\n")
+    exe.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    plumed = Plumed(str(work_dir))
+
+    with open("tests/input/hills/HILLS") as f:
+        lines = f.readlines()
+    header = "".join(line for line in lines if line.startswith("#"))
+    records = [line for line in lines if not line.startswith("#")]
+
+    # Write the header, the first hill, and half of the second.
+    hills_file = work_dir / "HILLS"
+    cut = len(records[1]) - 4
+    with open(hills_file, "w") as f:
+        f.write(header + records[0] + records[1][:cut])
+
+    plumed._update_hills_dict()
+    assert len(plumed._hills_dict["height"]) == 1
+
+    # Complete the second hill.
+    with open(hills_file, "a") as f:
+        f.write(records[1][cut:])
+
+    plumed._update_hills_dict()
+    height = plumed._hills_dict["height"]
+    assert len(height) == 2
+    assert height[1] == float(records[1].split()[5])
@@ -0,0 +1,257 @@
+import json
+import os
+import pytest
+import subprocess
+import sys
+import time
+import timeit
+
+import BioSimSpace as BSS
+
+from BioSimSpace.Process._process import Process
+
+# A script that records when it ran, and the environment and CPU affinity
+# that it inherited, then optionally exits with an error.
+script = """
+import json, os, sys, time
+start = time.time()
+time.sleep(float(sys.argv[2]))
+record = {
+    "start": start,
+    "end": time.time(),
+    "env": {
+        key: os.environ.get(key)
+        for key in ["CUDA_VISIBLE_DEVICES", "OPENCL_VISIBLE_DEVICES", "OMP_NUM_THREADS"]
+    },
+    "affinity": (
+        sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+    ),
+}
+with open(sys.argv[1], "a") as f:
+    f.write(json.dumps(record) + "\\n")
+sys.exit(int(sys.argv[3]))
+"""
+
+
+class _Popen:
+    """Adapts a sub-process to the interface of a Sire process."""
+
+    def __init__(self, args):
+        self._popen = subprocess.Popen(args)
+
+    def isRunning(self):
+        return self._popen.poll() is None
+
+    def isError(self):
+        return self._popen.poll() not in (None, 0)
+
+    def wait(self, max_time=None):
+        try:
+            self._popen.wait(None if max_time is None else max_time / 1000)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def kill(self):
+        self._popen.kill()
+        self._popen.wait()
+
+
+class _StubProcess(Process):
+    """A process that sleeps, failing on its first 'num_failures' runs."""
+
+    def __init__(self, record_file, sleep=0.5, num_failures=0, cpus=1, gpus=0):
+        self._name = os.path.basename(record_file)
+        self._record_file = record_file
+        self._sleep = sleep
+        self._num_failures = num_failures
+        self._num_starts = 0
+        self._process = None
+        self._timer = None
+        self._runtime = None
+        self._is_queued = False
+        self._num_cpus = cpus
+        self._num_gpus = gpus
+
+    def start(self):
+        is_error = self._num_starts < self._num_failures
+        self._num_starts += 1
+        self._timer = timeit.default_timer()
+        self._process = _Popen(
+            [
+                sys.executable,
+                "-c",
+                script,
+                self._record_file,
+                str(self._sleep),
+                str(int(is_error)),
+            ]
+        )
+        return self
+
+    def records(self):
+        with open(self._record_file) as f:
+            return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def stubs(tmp_path):
+    def create(num, **kwargs):
+        return [_StubProcess(str(tmp_path / f"stub{x}"), **kwargs) for x in range(num)]
+
+    return create
+
+
+def test_queue(stubs):
+    """Make sure that queued processes are started as others finish."""
+
+    processes = stubs(3)
+    runner = BSS.Process.ProcessRunner(processes)
+    runner.startAll(batch_size=1)
+
+    # Only one process runs at a time.
+    time.sleep(0.2)
+    assert runner.nRunning() == 1
+    assert runner.nQueued() == 2
+
+    # The time spent in the queue increases while a process is waiting.
+    queue_time = runner.queueTime()[2]
+    time.sleep(0.2)
+    assert runner.queueTime()[2] > queue_time
+
+    runner.wait()
+
+    assert runner.nQueued() == 0
+    assert runner.nError() == 0
+    assert runner.retries() == [0, 0, 0]
+
+    # Each process is started as soon as the previous one has finished,
+    # rather than at the next polling interval.
+    records = [p.records()[0] for p in processes]
+    for prev, next in zip(records, records[1:]):
+        assert next["start"] >= prev["end"]
+        assert next["start"] - prev["end"] < 2.0
+
+    # Later processes spent longer in the queue.
+    queue_time = [t.value() for t in runner.queueTime()]
+    assert queue_time[0] < queue_time[1] < queue_time[2]
+
+
+def test_retries(stubs):
+    """Make sure that failed processes are retried up to the limit."""
+
+    # The first process succeeds on its third attempt, while the second
+    # fails on every attempt.
+    processes = stubs(2, sleep=0.1)
+    processes[0]._num_failures = 2
+    processes[1]._num_failures = 10
+
+    runner = BSS.Process.ProcessRunner(processes)
+    runner.startAll(max_retries=3)
+    runner.wait()
+
+    assert runner.retries() == [2, 3]
+    assert runner.isError() == [False, True]
+    assert len(processes[0].records()) == 3
+    assert len(processes[1].records()) == 4
+
+
+def test_restart_failed(stubs):
+    """Make sure that restarting failed processes counts as a retry."""
+
+    processes = stubs(2, sleep=0.1, num_failures=2)
+    runner = BSS.Process.ProcessRunner(processes)
+
+    # Both processes fail on the retry.
+    runner.startAll(max_retries=1)
+    runner.wait()
+    assert runner.retries() == [1, 1]
+    assert runner.nError() == 2
+
+    # Restarting the processes succeeds.
+    runner.restartFailed()
+    runner.wait()
+    assert runner.retries() == [2, 2]
+    assert runner.nError() == 0
+
+
+def _max_overlap(records):
+    """Return the maximum number of records that ran at the same time."""
+    events = sorted(
+        [(r["start"], 1) for r in records] + [(r["end"], -1) for r in records],
+        key=lambda x: (x[0], x[1]),
+    )
+    num = 0
+    max_num = 0
+    for _, change in events:
+        num += change
+        max_num = max(max_num, num)
+    return max_num
+
+
+def test_resource_aware(stubs, monkeypatch):
+    """Make sure that processes are packed into the CPU and GPU budget."""
+
+    monkeypatch.delenv("CUDA_VISIBLE_DEVICES", raising=False)
+    monkeypatch.setenv("OMP_NUM_THREADS", "8")
+
+    # The first process needs both CPUs, so the others must wait for it.
+    processes = stubs(4, sleep=0.3)
+    processes[0]._num_cpus = 2
+    processes[1]._num_gpus = 1
+
+    runner = BSS.Process.ProcessRunner(processes)
+    runner.startAll(resource_aware=True, cpus=2, gpus=1)
+    runner.wait()
+
+    assert runner.nError() == 0
+
+    records = [p.records()[0] for p in processes]
+
+    # The CPU budget is never exceeded.
+    assert _max_overlap(records) == 2
+    for record in records[1:]:
+        assert record["start"] >= records[0]["end"]
+    assert _max_overlap(records[1:]) == 2
+
+    # Only the process that needs a GPU can see it.
+    for x, record in enumerate(records):
+        device = "0" if x == 1 else ""
+        assert record["env"]["CUDA_VISIBLE_DEVICES"] == device
+        assert record["env"]["OPENCL_VISIBLE_DEVICES"] == device
+
+    # The number of threads matches the allocated CPUs.
+    assert [r["env"]["OMP_NUM_THREADS"] for r in records] == ["2", "1", "1", "1"]
+
+    # Processes are pinned to their own cores when there are enough.
+    if hasattr(os, "sched_getaffinity") and len(os.sched_getaffinity(0)) >= 2:
+        assert len(records[0]["affinity"]) == 2
+        for record in records[1:]:
+            assert len(record["affinity"]) == 1
+
+        # Processes that ran at the same time didn't share a core.
+        for x, r0 in enumerate(records):
+            for r1 in records[x + 1 :]:
+                if r0["start"] < r1["end"] and r1["start"] < r0["end"]:
+                    assert not set(r0["affinity"]) & set(r1["affinity"])
+
+
+def test_resource_budget(stubs, monkeypatch):
+    """Make sure that an invalid resource budget is rejected."""
+
+    processes = stubs(2, sleep=0.1)
+    processes[0]._num_cpus = 2
+    runner = BSS.Process.ProcessRunner(processes)
+
+    # The process doesn't fit within the budget.
+    with pytest.raises(ValueError):
+        runner.startAll(resource_aware=True, cpus=1, gpus=0)
+
+    # A budget with no CPUs is rejected.
+    with pytest.raises(ValueError):
+        runner.startAll(resource_aware=True, cpus=0, gpus=0)
+
+    monkeypatch.setattr(BSS.Gateway.ResourceManager, "_cpus", 0)
+    with pytest.raises(ValueError):
+        runner.startAll(resource_aware=True, gpus=0)
+
+    assert runner.nRunning() == 0
@@ -1,4 +1,5 @@
 import filecmp
+import numpy as np
 import os
 import pytest
 import warnings
@@ -131,6 +132,173 @@ def test_pert_res_num(perturbable_system):
     assert unique1[0] == "perturbed residue number = 2"
 
 
+class _AtomIdx:
+    """A stand-in for a Sire AtomIdx."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def value(self):
+        return self._value
+
+
+class _ImproperID:
+    """
+    A stand-in for a Sire ImproperID. Like Sire, this is hashed by identity
+    and two impropers are equivalent if they have the same first two atoms,
+    with the last two in either order.
+    """
+
+    def __init__(self, *atoms):
+        self.atoms = atoms
+
+    def equivalent(self, other):
+        return self.atoms[:2] == other.atoms[:2] and set(self.atoms[2:]) == set(
+            other.atoms[2:]
+        )
+
+
+def _split_terms(terms0_idx, terms1_idx):
+    """Split terms into those unique to lambda = 0 and 1, and those shared."""
+
+    unique0 = {}
+    unique1 = {}
+    shared = {}
+    for key in terms0_idx:
+        if key not in terms1_idx:
+            unique0[key] = terms0_idx[key]
+        else:
+            shared[key] = (terms0_idx[key], terms1_idx[key])
+    for key in terms1_idx:
+        if key not in terms0_idx:
+            unique1[key] = terms1_idx[key]
+        elif key not in shared:
+            shared[key] = (terms0_idx[key], terms1_idx[key])
+    return unique0, unique1, shared
+
+
+@pytest.mark.parametrize("num_atoms", [2, 3, 4])
+def test_bonded_key(num_atoms):
+    """
+    Make sure that bonded terms are matched to their mirrors in the same way
+    as when they were keyed by their mirror Sire ID.
+    """
+
+    from BioSimSpace.Process._somd import _bonded_key
+
+    random = np.random.default_rng(42)
+
+    # Create random terms at lambda = 0. At lambda = 1, keep some, mirror
+    # some, and add some new ones.
+    terms0 = [tuple(random.choice(20, num_atoms, replace=False)) for _ in range(50)]
+    terms0 = list(dict.fromkeys(t for t in terms0 if t[::-1] not in terms0))
+    terms1 = []
+    for x, term in enumerate(terms0):
+        if x % 3 == 0:
+            terms1.append(term)
+        elif x % 3 == 1:
+            terms1.append(term[::-1])
+    terms1 += [tuple(range(20 + x, 20 + x + num_atoms)) for x in range(5)]
+    random.shuffle(terms1)
+
+    # The previous approach, which checks for the mirror of each term at
+    # lambda = 1 in the terms at lambda = 0.
+    ref0_idx = {term: idx for idx, term in enumerate(terms0)}
+    ref1_idx = {}
+    for idx, term in enumerate(terms1):
+        if term[::-1] in ref0_idx:
+            ref1_idx[term[::-1]] = idx
+        else:
+            ref1_idx[term] = idx
+
+    def key(term):
+        return _bonded_key(*(_AtomIdx(x) for x in term))
+
+    terms0_idx = {key(term): idx for idx, term in enumerate(terms0)}
+    terms1_idx = {key(term): idx for idx, term in enumerate(terms1)}
+
+    # A term and its mirror have the same key.
+    for term in terms0:
+        assert key(term) == key(term[::-1])
+
+    ref = _split_terms(ref0_idx, ref1_idx)
+    new = _split_terms(terms0_idx, terms1_idx)
+
+    # The terms are keyed differently, so compare their indices.
+    for ref_terms, new_terms in zip(ref, new):
+        assert sorted(ref_terms.values()) == sorted(new_terms.values())
+
+    assert len(new[2]) == len(terms1) - 5
+
+
+def test_match_impropers():
+    """
+    Make sure that matching impropers gives the same result as comparing
+    every pair of impropers.
+    """
+
+    from BioSimSpace.Process._somd import _match_impropers
+
+    random = np.random.default_rng(42)
+
+    # Create random impropers at lambda = 0. At lambda = 1, keep some,
+    # add some with the last two atoms swapped, some with the same atoms in
+    # an order that isn't equivalent, and some new ones.
+    impropers0 = []
+    for _ in range(40):
+        impropers0.append(_ImproperID(*random.choice(12, 4, replace=False)))
+    impropers1 = []
+    for x, improper in enumerate(impropers0):
+        a, b, c, d = improper.atoms
+        if x % 4 == 0:
+            impropers1.append(_ImproperID(a, b, c, d))
+        elif x % 4 == 1:
+            impropers1.append(_ImproperID(a, b, d, c))
+        elif x % 4 == 2:
+            impropers1.append(_ImproperID(b, a, c, d))
+    for x in range(5):
+        impropers1.append(_ImproperID(*range(12 + x, 16 + x)))
+    random.shuffle(impropers1)
+
+    impropers0_idx = {improper: idx for idx, improper in enumerate(impropers0)}
+    impropers1_idx = {improper: idx for idx, improper in enumerate(impropers1)}
+    improper_atoms = {
+        improper: frozenset(improper.atoms) for improper in impropers0 + impropers1
+    }
+
+    # The previous approach, which compares every pair of impropers.
+    ref0_unique = {}
+    ref1_unique = {}
+    ref_shared = {}
+    for idx0 in impropers0_idx:
+        for idx1 in impropers1_idx:
+            if idx0.equivalent(idx1):
+                ref_shared[idx0] = (impropers0_idx[idx0], impropers1_idx[idx1])
+                break
+        else:
+            ref0_unique[idx0] = impropers0_idx[idx0]
+    for idx1 in impropers1_idx:
+        for idx0 in impropers0_idx:
+            if idx1.equivalent(idx0):
+                if not idx0 in ref_shared:
+                    ref_shared[idx1] = (impropers0_idx[idx0], impropers1_idx[idx1])
+                break
+        else:
+            ref1_unique[idx1] = impropers1_idx[idx1]
+
+    unique0, unique1, shared = _match_impropers(
+        impropers0_idx, impropers1_idx, improper_atoms
+    )
+
+    assert unique0 == ref0_unique
+    assert unique1 == ref1_unique
+    assert shared == ref_shared
+
+    assert len(shared) > 0
+    assert len(unique0) > 0
+    assert len(unique1) > 5
+
+
 def run_process(system, protocol):
     """Helper function to run various simulation protocols."""
 
@@ -141,6 +141,127 @@ def test_velocities(traj_mdanalysis):
             assert mol._sire_object.hasProperty("velocity")
 
 
+@pytest.mark.skipif(
+    has_mdanalysis is False or has_mdtraj is False,
+    reason="Requires MDAnalysis and mdtraj to be installed.",
+)
+def test_in_memory_frames(system):
+    """Make sure that frames are copied into the reference system without
+    writing any intermediate files.
+    """
+
+    import os
+
+    for backend, topology in [("MDTRAJ", "ala.gro"), ("MDANALYSIS", "ala.tpr")]:
+        traj = BSS.Trajectory.Trajectory(
+            trajectory="tests/input/ala.trr",
+            topology=f"tests/input/{topology}",
+            system=system,
+            backend=backend,
+        )
+
+        frames = traj.getFrames([0, -1])
+
+        assert len(frames) == 2
+        assert os.listdir(str(traj._work_dir)) == []
+        for frame in frames:
+            assert frame.nMolecules() == system.nMolecules()
+            assert frame.nAtoms() == system.nAtoms()
+
+
+@pytest.mark.skipif(
+    has_mdanalysis is False or has_mdtraj is False,
+    reason="Requires MDAnalysis and mdtraj to be installed.",
+)
+@pytest.mark.parametrize(
+    "backend, topology", [("MDTRAJ", "ala.gro"), ("MDANALYSIS", "ala.tpr")]
+)
+def test_in_memory_frames_match(system, backend, topology):
+    """Make sure that frames copied in memory match those extracted via
+    intermediate files, so that the atoms are in the same order.
+    """
+
+    trajs = [
+        BSS.Trajectory.Trajectory(
+            trajectory="tests/input/ala.trr",
+            topology=f"tests/input/{topology}",
+            system=system,
+            backend=backend,
+        )
+        for _ in range(2)
+    ]
+
+    # Force the second trajectory to use the file-based approach.
+    trajs[1]._is_in_memory = False
+
+    frames0 = trajs[0].getFrames([0, -1])
+    frames1 = trajs[1].getFrames([0, -1])
+
+    assert trajs[0]._is_in_memory
+
+    for system0, system1 in zip(frames0, frames1):
+        for mol0, mol1 in zip(system0, system1):
+            for c0, c1 in zip(mol0.coordinates(), mol1.coordinates()):
+                assert c0.x().value() == pytest.approx(c1.x().value(), abs=1e-2)
+                assert c0.y().value() == pytest.approx(c1.y().value(), abs=1e-2)
+                assert c0.z().value() == pytest.approx(c1.z().value(), abs=1e-2)
+
+        box0, angles0 = system0.getBox()
+        box1, angles1 = system1.getBox()
+        for x0, x1 in zip(box0 + angles0, box1 + angles1):
+            assert x0.value() == pytest.approx(x1.value(), abs=1e-2)
+
+
+@pytest.mark.skipif(
+    has_mdanalysis is False or has_mdtraj is False,
+    reason="Requires MDAnalysis and mdtraj to be installed.",
+)
+@pytest.mark.parametrize("backend", ["SIRE", "MDTRAJ", "MDANALYSIS"])
+def test_iter_frames(system, backend):
+    """Make sure that frames can be streamed in chunks, and that iteration
+    resumes from the last frame read.
+    """
+
+    import numpy as np
+
+    traj = BSS.Trajectory.Trajectory(
+        trajectory="tests/input/ala.trr",
+        topology="tests/input/ala.gro",
+        system=system,
+        backend=backend,
+    )
+
+    n_frames = traj.nFrames()
+
+    # Read the first half of the trajectory.
+    chunks = list(traj.iterFrames(stop=n_frames // 2, chunk_size=3))
+    assert all(len(chunk) <= 3 for chunk in chunks)
+    assert chunks[0].shape[1:] == (system.nAtoms(), 3)
+
+    # Read the remainder.
+    chunks.extend(traj.iterFrames())
+    coords = np.concatenate(chunks)
+    assert len(coords) == n_frames
+
+    # Nothing is left to read.
+    assert list(traj.iterFrames()) == []
+
+    # Compare against the coordinates of the final frame.
+    frame = traj.getFrames(-1)[0]
+    ref = np.array(
+        [
+            [c.x().value(), c.y().value(), c.z().value()]
+            for mol in frame
+            for c in mol.coordinates()
+        ]
+    )
+    assert np.allclose(coords[-1], ref, atol=1e-2)
+
+    # Strided iteration.
+    coords = np.concatenate(list(traj.iterFrames(start=0, stride=2)))
+    assert len(coords) == len(range(0, n_frames, 2))
+
+
 @pytest.mark.skipif(
     has_mdanalysis is False or has_mdtraj is False,
     reason="Requires MDAnalysis and mdtraj to be installed.",
@@ -163,6 +284,53 @@ def test_rmsd(traj_sire, traj_mdtraj, traj_mdanalysis):
         assert v0.value() == pytest.approx(v2.value(), abs=1e-2)
 
 
+@pytest.mark.skipif(
+    has_mdanalysis is False or has_mdtraj is False,
+    reason="Requires MDAnalysis and mdtraj to be installed.",
+)
+def test_rmsd_reference(traj_sire, traj_mdtraj, traj_mdanalysis, system):
+    """Make sure that the RMSD of the reference frame is zero and that the
+    atom indices are validated against the cached atom count.
+    """
+
+    for traj in [traj_sire, traj_mdtraj, traj_mdanalysis]:
+        rmsd = traj.rmsd(frame=3, atoms=[0, 1, 2, 3])
+        assert len(rmsd) == traj.nFrames()
+        assert rmsd[3].value() == pytest.approx(0, abs=1e-6)
+        assert traj._num_atoms == system.nAtoms()
+
+        with pytest.raises(ValueError):
+            traj.rmsd(atoms=[system.nAtoms()])
+
+
+@pytest.mark.skipif(has_mdtraj is False, reason="Requires mdtraj to be installed.")
+def test_rmsd_in_memory(traj_mdtraj, monkeypatch):
+    """Make sure that the MDTraj RMSD uses the frames that are in memory."""
+
+    import BioSimSpace.Trajectory._trajectory as _trajectory
+
+    def _iterload(*args, **kwargs):
+        raise AssertionError("The trajectory was re-read from disk.")
+
+    monkeypatch.setattr(_trajectory._mdtraj, "iterload", _iterload)
+
+    rmsd = traj_mdtraj.rmsd(frame=0)
+    assert len(rmsd) == traj_mdtraj.nFrames()
+
+
+def test_rmsd_sire_native(traj_sire, monkeypatch):
+    """Make sure that the Sire RMSD is computed natively."""
+
+    def _iter_frame_arrays(*args, **kwargs):
+        raise AssertionError("The frame coordinates were copied.")
+
+    monkeypatch.setattr(traj_sire, "_iter_frame_arrays", _iter_frame_arrays)
+
+    rmsd = traj_sire.rmsd(frame=0, atoms=[0, 10, 20])
+    assert len(rmsd) == traj_sire.nFrames()
+    assert rmsd[0].value() == pytest.approx(0, abs=1e-6)
+
+
 @pytest.mark.skipif(has_mdtraj is False, reason="Requires mdtraj to be installed.")
 def test_getFrame(system):
     """Regression test to make sure the getFrame function works."""
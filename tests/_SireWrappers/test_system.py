@@ -1,6 +1,7 @@
 import math
 import pytest
 
+from sire.legacy.Base import wrap
 from sire.legacy.Vol import TriclinicBox
 
 import BioSimSpace as BSS
@@ -362,6 +363,42 @@ def test_isSame(system):
     assert other.isSame(system, excluded_properties=["coordinates", "space"])
 
 
+def test_fingerprint(system):
+    # Make sure that the fingerprint is updated when the system changes.
+
+    # Make a copy of the system.
+    other = system.copy()
+
+    # The fingerprints should be the same.
+    assert system._getFingerprint() == other._getFingerprint()
+
+    # Translate the other system.
+    other.translate(3 * [BSS.Units.Length.angstrom])
+    assert system._getFingerprint() != other._getFingerprint()
+
+    # Update a molecule in a new copy of the system.
+    other = system.copy()
+    fingerprint = other._getFingerprint()
+    mol = other[0]
+    mol._sire_object = (
+        mol._sire_object.edit().setProperty("test", wrap(1)).molecule().commit()
+    )
+    other.updateMolecules(mol)
+    assert other._getFingerprint() != fingerprint
+
+    # The incrementally updated fingerprint should match one computed from
+    # scratch.
+    fresh = BSS._SireWrappers.System(other._sire_object)
+    assert other._getFingerprint() == fresh._getFingerprint()
+
+    # Removing and re-adding a molecule changes the ordering, so the
+    # fingerprint should change.
+    other.removeMolecules(mol)
+    assert other._getFingerprint() != fresh._getFingerprint()
+    other.addMolecules(mol)
+    assert other._getFingerprint() != fresh._getFingerprint()
+
+
 @pytest.mark.skipif(
     has_amber is False or has_openff is False,
     reason="Requires AMBER and OpenFF to be installed",
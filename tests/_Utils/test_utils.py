@@ -0,0 +1,136 @@
+import json
+import os
+import pytest
+import sys
+
+from BioSimSpace._Utils import _assert_imported, _have_imported, _lazy_import
+from BioSimSpace._Utils import _cache_file, _load_cache, _save_cache
+from BioSimSpace._Utils._executables import _gromacs_info
+
+
+def test_lazy_import():
+    """Make sure that modules are only imported on first use."""
+
+    # The module isn't imported until an attribute is accessed.
+    module = _lazy_import("json")
+    assert module._module is None
+    assert module.loads("[1, 2]") == [1, 2]
+    assert module._module is not None
+    assert _have_imported(module)
+
+
+def test_lazy_import_stub():
+    """Make sure that a missing module is stubbed."""
+
+    module = _lazy_import("bss_missing_module")
+
+    assert not _have_imported(module)
+
+    with pytest.raises(ModuleNotFoundError):
+        _assert_imported(module)
+
+    with pytest.raises(ModuleNotFoundError):
+        module.some_function()
+
+
+def test_cache(tmp_path, monkeypatch):
+    """Make sure that cache entries are merged and stale entries removed."""
+
+    # The path can be set, or the cache disabled, using the environment.
+    cache_file = str(tmp_path / "cache.json")
+    monkeypatch.setenv("BSS_TEST_CACHE", cache_file)
+    assert _cache_file("BSS_TEST_CACHE", "test.json") == cache_file
+    monkeypatch.setenv("BSS_TEST_CACHE", "")
+    assert _cache_file("BSS_TEST_CACHE", "test.json") is None
+    monkeypatch.delenv("BSS_TEST_CACHE")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert _cache_file("BSS_TEST_CACHE", "test.json") == str(
+        tmp_path / "biosimspace" / "test.json"
+    )
+
+    # A missing or corrupt cache is empty.
+    assert _load_cache(cache_file) == {}
+    assert _load_cache(None) == {}
+    with open(cache_file, "w") as f:
+        f.write("{")
+    assert _load_cache(cache_file) == {}
+
+    # New entries are merged with existing ones.
+    _save_cache(cache_file, {"a": 1, "b": 2})
+    _save_cache(cache_file, {"c": 3})
+    assert _load_cache(cache_file) == {"a": 1, "b": 2, "c": 3}
+
+    # Stale entries are removed.
+    _save_cache(cache_file, {"d": 4}, lambda key: key in ["a", "c"])
+    assert _load_cache(cache_file) == {"b": 2, "d": 4}
+
+    # No temporary files are left behind.
+    assert not [x for x in os.listdir(tmp_path) if x.endswith(".tmp")]
+
+
+def _save_entries(cache_file, worker):
+    for x in range(20):
+        _save_cache(cache_file, {f"{worker}-{x}": x})
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Requires file locking.")
+def test_cache_concurrent(tmp_path):
+    """Make sure that entries saved by concurrent processes aren't lost."""
+
+    import multiprocessing
+
+    cache_file = str(tmp_path / "cache.json")
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_save_entries, args=(cache_file, x)) for x in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(_load_cache(cache_file)) == 80
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Requires a POSIX shell.")
+def test_gromacs_info_cache(tmp_path, monkeypatch):
+    """Make sure that the GROMACS probe is cached until the executable changes."""
+
+    monkeypatch.setenv("BSS_EXE_CACHE", str(tmp_path / "executables.json"))
+
+    # Create a topology directory.
+    top_dir = tmp_path / "share" / "gromacs" / "top"
+    top_dir.mkdir(parents=True)
+
+    # Create a fake GROMACS executable that records each time it is run.
+    count_file = tmp_path / "count.txt"
+    exe = tmp_path / "gmx"
+    exe.write_text(
+        "#!/bin/sh\n"
+        f"echo run >> {count_file}\n"
+        f"echo 'Data prefix:  {tmp_path}'\n"
+        "echo 'GROMACS version:    2023.1'\n"
+    )
+    exe.chmod(0o755)
+
+    def num_runs():
+        return len(count_file.read_text().split())
+
+    # The first call runs the executable.
+    assert _gromacs_info(str(exe)) == (str(top_dir), 2023.1)
+    assert num_runs() == 1
+
+    # The second call uses the cache.
+    assert _gromacs_info(str(exe)) == (str(top_dir), 2023.1)
+    assert num_runs() == 1
+
+    # Changing the modification time invalidates the cache.
+    stat = os.stat(exe)
+    os.utime(exe, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert _gromacs_info(str(exe)) == (str(top_dir), 2023.1)
+    assert num_runs() == 2
+
+    # The stale entry for the old executable is replaced.
+    with open(tmp_path / "executables.json") as f:
+        assert len(json.load(f)) == 1